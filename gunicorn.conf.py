@@ -0,0 +1,8 @@
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shockx.settings')
+
+def child_exit(server, worker):
+    from shockx.metrics import registry
+
+    registry.archive(worker.pid)
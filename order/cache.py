@@ -0,0 +1,38 @@
+from django.core.cache import cache
+
+from product.cache import get_version, get_versions, bump_version
+
+ACCOUNT_PAGE_TIMEOUT = 60 * 10
+
+def user_orders_version_key(user_id):
+    return f'user_orders_version:{user_id}'
+
+def top_of_book_version_key(product_size_id):
+    return f'top_of_book_version:{product_size_id}'
+
+def account_page_key(page, user_id, limit):
+    version = get_version(user_orders_version_key(user_id))
+
+    return f'account_{page}:{user_id}:{version}:{limit}'
+
+def get_account_page(cache_key):
+    entry = cache.get(cache_key)
+
+    if entry is None:
+        return None
+
+    top_of_book_versions, body = entry
+
+    if top_of_book_versions and get_versions(list(top_of_book_versions)) != top_of_book_versions:
+        return None
+
+    return body
+
+def set_account_page(cache_key, product_size_ids, body):
+    version_keys = [top_of_book_version_key(product_size_id) for product_size_id in set(product_size_ids)]
+
+    cache.set(cache_key, (get_versions(version_keys) if version_keys else {}, body), ACCOUNT_PAGE_TIMEOUT)
+
+def bump_order_versions(user_id, product_size_id):
+    bump_version(user_orders_version_key(user_id))
+    bump_version(top_of_book_version_key(product_size_id))
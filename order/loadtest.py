@@ -0,0 +1,149 @@
+import json
+import multiprocessing
+import random
+import time
+from collections        import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import jwt
+from django.db        import connections
+from django.db.models import Count
+from django.test      import Client
+
+from user.models       import User
+from order.models      import Ask, Bid, Order
+from shockx.benchmarks import percentile
+from my_settings       import SECRET_KEY, ALGORITHM
+
+ORDER_STATUS_CURRENT = 'current'
+ORDER_STATUS_PENDING = 'pending'
+OPERATIONS           = ('bid', 'ask', 'instant_buy', 'instant_sell')
+MATCHING_OPERATIONS  = ('instant_buy', 'instant_sell')
+
+def load_targets(hot_sizes):
+    targets = (
+        Ask.objects.filter(order_status__name=ORDER_STATUS_CURRENT)
+        .values('product_size__product_id', 'product_size__size_id')
+        .annotate(orders=Count('id'))
+        .order_by('-orders')[:hot_sizes]
+    )
+
+    return [(target['product_size__product_id'], target['product_size__size_id']) for target in targets]
+
+def load_tokens(users):
+    return [
+        jwt.encode({'id':user_id, 'email':email}, SECRET_KEY, algorithm=ALGORITHM)
+        for user_id, email in User.objects.filter(shippinginformation__isnull=False).distinct().order_by('id').values_list('id', 'email')[:users]
+    ]
+
+def order_request(operation, rng):
+    data = {
+        'name'           : 'load',
+        'country'        : 'Korea',
+        'primaryAddress' : 'Teheran-ro',
+        'city'           : 'Seoul',
+        'postalCode'     : '06000',
+        'phoneNumber'    : '01000000000',
+        'expirationDate' : '30',
+        'price'          : str(rng.randint(100, 500)),
+    }
+
+    if operation == 'bid':
+        return 'buy', dict(data, isBid='1')
+
+    if operation == 'ask':
+        return 'sell', dict(data, isAsk='1')
+
+    if operation == 'instant_buy':
+        return 'buy', dict(data, isBid='0', totalPrice=data['price'])
+
+    return 'sell', dict(data, isAsk='0', totalPrice=data['price'])
+
+def run_worker(worker_id, requests, targets, tokens, mix, seed):
+    rng     = random.Random(seed * 10007 + worker_id)
+    client  = Client(raise_request_exception=False)
+    results = []
+
+    try:
+        for _ in range(requests):
+            operation           = rng.choices(OPERATIONS, mix)[0]
+            product_id, size_id = rng.choice(targets)
+            side, data          = order_request(operation, rng)
+
+            started  = time.perf_counter()
+            response = client.post(
+                f'/order/{side}/{product_id}?size={size_id}',
+                json.dumps(data),
+                content_type       = 'application/json',
+                HTTP_AUTHORIZATION = rng.choice(tokens)
+            )
+            results.append((operation, response.status_code, time.perf_counter() - started))
+
+    finally:
+        connections.close_all()
+
+    return results
+
+def run_load(workers, requests, targets, tokens, mix, seed=0, mode='thread'):
+    connections.close_all()
+
+    if mode == 'process':
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+
+    else:
+        executor = ThreadPoolExecutor(workers)
+
+    started = time.perf_counter()
+
+    with executor:
+        futures = [executor.submit(run_worker, worker_id, requests, targets, tokens, mix, seed) for worker_id in range(workers)]
+        results = [result for future in futures for result in future.result()]
+
+    return results, time.perf_counter() - started
+
+def summarize_load(results, elapsed):
+    by_operation = defaultdict(list)
+
+    for operation, status, latency in results:
+        by_operation[operation].append((status, latency))
+
+    operations = {
+        operation : {
+            'requests' : len(samples),
+            'statuses' : dict(Counter(str(status) for status, latency in samples)),
+            'p50_ms'   : round(percentile([latency for status, latency in samples], 50) * 1000, 3),
+            'p95_ms'   : round(percentile([latency for status, latency in samples], 95) * 1000, 3),
+            'p99_ms'   : round(percentile([latency for status, latency in samples], 99) * 1000, 3),
+        } for operation, samples in by_operation.items()
+    }
+    matches = sum(1 for operation, status, latency in results if operation in MATCHING_OPERATIONS and status == 201)
+
+    return {
+        'requests'       : len(results),
+        'elapsed_s'      : round(elapsed, 3),
+        'requests_per_s' : round(len(results) / elapsed, 1) if elapsed else 0,
+        'matches'        : matches,
+        'matches_per_s'  : round(matches / elapsed, 1) if elapsed else 0,
+        'server_errors'  : sum(1 for operation, status, latency in results if status >= 500),
+        'operations'     : operations,
+    }
+
+def check_invariants():
+    violations = []
+
+    for field in ('ask_id', 'bid_id'):
+        duplicates = Order.objects.exclude(**{field:None}).values(field).annotate(orders=Count('id')).filter(orders__gt=1)
+
+        for duplicate in duplicates:
+            violations.append(f"{field} {duplicate[field]} is paired in {duplicate['orders']} orders")
+
+    for model in (Ask, Bid):
+        name = model.__name__.lower()
+
+        for order_id in model.objects.filter(order__isnull=False, order_status__name=ORDER_STATUS_CURRENT).values_list('id', flat=True):
+            violations.append(f'{name} {order_id} is matched but still current')
+
+        for order_id in model.objects.filter(order__isnull=True, order_status__name=ORDER_STATUS_PENDING).values_list('id', flat=True):
+            violations.append(f'{name} {order_id} is pending without an order')
+
+    return violations
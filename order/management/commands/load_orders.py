@@ -0,0 +1,83 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db                   import connection
+
+from product.seeding   import seed_market
+from order.loadtest    import OPERATIONS, load_targets, load_tokens, run_load, summarize_load, check_invariants
+from shockx.benchmarks import isolated_caches
+
+class Command(BaseCommand):
+    help = (
+        'Place randomized bids, asks and instant buys/sells concurrently against the configured database, '
+        'report latency and throughput, then check matching invariants. Writes to the database, '
+        'but uses a local in-memory cache and no-op CDN purges.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=100, help='requests per worker')
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--hot-sizes', type=int, default=3)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--mix', default='bid=3,ask=3,instant_buy=2,instant_sell=2')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--setup', action='store_true', help='seed a small market with seed_market first')
+        parser.add_argument('--output', default=None)
+
+    def parse_mix(self, mix):
+        try:
+            weights = {operation.strip(): float(weight) for operation, weight in (item.split('=') for item in mix.split(','))}
+
+        except ValueError:
+            raise CommandError('--mix must look like bid=3,ask=3,instant_buy=2,instant_sell=2')
+
+        if set(weights) - set(OPERATIONS):
+            raise CommandError(f'--mix operations must be among {", ".join(OPERATIONS)}')
+
+        return [weights.get(operation, 0) for operation in OPERATIONS]
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+
+        if connection.vendor == 'sqlite' and options['workers'] > 1:
+            self.stderr.write('SQLite serializes writers and ignores select_for_update; running with --workers 1')
+            options['workers'] = 1
+
+        with isolated_caches():
+            if options['setup']:
+                seed_market(products=20, users=options['users'], orders=20000, seed=options['seed'])
+
+            targets = load_targets(options['hot_sizes'])
+            tokens  = load_tokens(options['users'])
+
+            if not targets or not tokens:
+                raise CommandError('no open asks or users with shipping information; run with --setup or seed_market first')
+
+            results, elapsed = run_load(options['workers'], options['requests'], targets, tokens, mix, options['seed'], options['mode'])
+            summary          = summarize_load(results, elapsed)
+            violations       = check_invariants()
+
+        summary['violations'] = violations
+
+        self.stdout.write(
+            f"{summary['requests']} requests in {summary['elapsed_s']:.1f}s ({summary['requests_per_s']} req/s), "
+            f"{summary['matches']} matches ({summary['matches_per_s']} matches/s), {summary['server_errors']} server errors"
+        )
+
+        for operation, result in sorted(summary['operations'].items()):
+            self.stdout.write(
+                f"{operation:<13} p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+                f"p99 {result['p99_ms']:8.2f} ms  statuses {result['statuses']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(summary, f, indent=2, sort_keys=True)
+
+        failures = violations + ([f"{summary['server_errors']} requests failed with a server error"] if summary['server_errors'] else [])
+
+        if failures:
+            raise CommandError('load test failed:\n' + '\n'.join(failures))
+
+        self.stdout.write('invariants hold')
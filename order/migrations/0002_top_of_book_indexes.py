@@ -0,0 +1,21 @@
+# Generated by Django 3.1.6 on 2026-10-19 22:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ask',
+            index=models.Index(fields=['product_size', 'order_status', 'price'], name='asks_top_of_book_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['product_size', 'order_status', 'price'], name='bids_top_of_book_idx'),
+        ),
+    ]
@@ -24,6 +24,9 @@ class Ask(models.Model):
 
     class Meta:
         db_table = 'asks'
+        indexes  = [
+            models.Index(fields=['product_size', 'order_status', 'price'], name='asks_top_of_book_idx'),
+        ]
 
 class Bid(models.Model):
     user                 = models.ForeignKey('user.User', on_delete=models.CASCADE)
@@ -40,6 +43,9 @@ class Bid(models.Model):
 
     class Meta:
         db_table = 'bids'
+        indexes  = [
+            models.Index(fields=['product_size', 'order_status', 'price'], name='bids_top_of_book_idx'),
+        ]
 
 class OrderStatus(models.Model):
     name = models.CharField(max_length=45)
@@ -0,0 +1,14 @@
+from django.db                import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch          import receiver
+
+from order.models import Ask, Bid
+from order.cache  import bump_order_versions
+
+@receiver([post_save, post_delete], sender=Ask)
+@receiver([post_save, post_delete], sender=Bid)
+def order_changed(sender, instance, **kwargs):
+    user_id         = instance.user_id
+    product_size_id = instance.product_size_id
+
+    transaction.on_commit(lambda: bump_order_versions(user_id, product_size_id))
@@ -1,14 +1,21 @@
+import io
 import json
 import jwt
 from datetime import datetime, timedelta
 
 from django.test    import TestCase, Client
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db.models.signals import post_save
 from unittest.mock  import patch, MagicMock
 
 from user.models    import User, ShippingInformation
 from product.models import Product, Size, ProductSize, Image
 from order.models   import Ask, Order, OrderStatus, Bid
 from my_settings    import SECRET_KEY, ALGORITHM
+from shockx.testing import QueryBudgetTestMixin
+from order.loadtest import check_invariants, summarize_load
+from order.views    import claim_order
 
 ORDER_STATUS_CURRENT = 'current'
 ORDER_STATUS_PENDING = 'pending'
@@ -37,7 +44,7 @@ class SellTest(TestCase):
             name = '1'
         )
 
-        product_size = ProductSize.objects.create(
+        cls.product_size = ProductSize.objects.create(
             product = cls.product,
             size    = cls.size
         )
@@ -66,7 +73,7 @@ class SellTest(TestCase):
         )
 
         cls.bid = Bid.objects.create(
-            product_size         = product_size,
+            product_size         = cls.product_size,
             price                = 100.00,
             user                 = user,
             expiration_date      = '2020-03-31',
@@ -75,7 +82,7 @@ class SellTest(TestCase):
         )
 
         Ask.objects.create(
-            product_size         = product_size,
+            product_size         = cls.product_size,
             price                = 100.00,
             user                 = user,
             expiration_date      = '2020-03-31',
@@ -101,7 +108,7 @@ class SellTest(TestCase):
 
         response = client.get(f'/order/sell/{self.product.id}?size={self.size.id}', **headers)
 
-        self.assertEqual(response.json()['data']['product']['id'], 3)
+        self.assertEqual(response.json()['data']['product']['id'], self.product_size.id)
         self.assertEqual(response.json()['data']['product']['name'], "Jordan")
         self.assertEqual(response.json()['data']['product']['lowestAsk'], "100.00")
         self.assertEqual(response.json()['data']['product']['highestBid'], "100.00")
@@ -189,6 +196,81 @@ class SellTest(TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.json(), {'message':'SUCCESS'})
 
+    def test_sell_post_instant_sell_success(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        data = {
+            "isAsk"          : "0",
+            "price"          : "100.00",
+            "name"           : "bongbong",
+            "country"        : "InSideOut",
+            "primaryAddress" : "bongbong_station",
+            "city"           : "dream",
+            "postalCode"     : "123456",
+            "phoneNumber"    : "01012341234",
+            "totalPrice"     : "105.00"
+        }
+
+        response = client.post(f'/order/sell/{self.product.id}?size={self.size.id}',\
+                json.dumps(data), content_type='application/json', **headers)
+
+        bid = Bid.objects.get(id=self.bid.id)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'message':'SUCCESS'})
+        self.assertEqual(bid.order_status, self.order_status_pending)
+        self.assertTrue(bid.order_number.startswith('B'))
+        self.assertEqual(Order.objects.filter(bid=bid).count(), 1)
+
+    def test_claim_order_claims_with_one_update(self):
+        saved = MagicMock()
+        post_save.connect(saved, sender=Bid)
+
+        try:
+            with self.assertNumQueries(3):
+                bid = claim_order(
+                    Bid.objects.filter(order_status=self.order_status_current).order_by('-price', 'id'),
+                    self.order_status_current,
+                    'B',
+                    order_status = self.order_status_pending
+                )
+
+        finally:
+            post_save.disconnect(saved, sender=Bid)
+
+        stored = Bid.objects.get(id=self.bid.id)
+
+        self.assertEqual(bid.id, self.bid.id)
+        self.assertEqual(stored.order_status, self.order_status_pending)
+        self.assertEqual(stored.order_number, bid.order_number)
+        self.assertIsNotNone(stored.matched_at)
+        self.assertEqual(saved.call_args.kwargs['instance'], bid)
+
+    def test_sell_post_bid_does_not_exist(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        data = {
+            "isAsk"          : "0",
+            "price"          : "100.00",
+            "name"           : "bongbong",
+            "country"        : "InSideOut",
+            "primaryAddress" : "bongbong_station",
+            "city"           : "dream",
+            "postalCode"     : "123456",
+            "phoneNumber"    : "01012341234",
+            "totalPrice"     : "105.00"
+        }
+
+        Bid.objects.all().delete()
+        asks = Ask.objects.count()
+
+        response = client.post(f'/order/sell/{self.product.id}?size={self.size.id}',\
+                json.dumps(data), content_type='application/json', **headers)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'message':'BID_DOES_NOT_EXIST'})
+        self.assertEqual(Ask.objects.count(), asks)
+
     def test_sell_post_product_size_does_not_exist1(self): 
         headers = {'HTTP_Authorization':self.token}
 
@@ -665,7 +747,7 @@ class BuyTest(TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json(), {'message':'ASK_DOES_NOT_EXIST'})
         
-class BuyStatusTest(TestCase):
+class BuyStatusTest(QueryBudgetTestMixin, TestCase):
     maxDiff = None
     @classmethod
     def setUpTestData(cls):
@@ -770,6 +852,55 @@ class BuyStatusTest(TestCase):
         ShippingInformation.objects.all().delete()
         Bid.objects.all().delete()
         Ask.objects.all().delete()
+        cache.clear()
+
+    def test_buy_orderstaus_get_query_budget(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        with self.assertNumQueries(3):
+            response = client.get('/order/account/buying', **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_buy_orderstaus_get_cached_first_page(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        client.get('/order/account/buying', **headers)
+
+        with self.assertNumQueries(1):
+            response = client.get('/order/account/buying', **headers)
+
+        self.assertEqual(response.json()['buying']['current'][0]['name'], 'Yordan')
+        self.assertEqual(response.status_code, 200)
+
+    def test_buy_orderstaus_get_cursor_pagination(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        Bid.objects.create(
+            product_size_id         = 1,
+            price                   = 90.00,
+            user_id                 = 1,
+            expiration_date         = '2020-04-30',
+            order_status_id         = 1,
+            shipping_information_id = 1
+        )
+
+        first_page  = client.get('/order/account/buying', {'limit':'1'}, **headers).json()['buying']
+        second_page = client.get('/order/account/buying', {'limit':'1', 'currentCursor':first_page['currentCursor']}, **headers).json()['buying']
+
+        self.assertEqual(first_page['current'][0]['expires'], '2020/04/30')
+        self.assertEqual(second_page['current'][0]['expires'], '2020/03/31')
+        self.assertIsNone(second_page['currentCursor'])
+        self.assertNotIn('pending', second_page)
+
+    def test_buy_orderstaus_get_invalid_cursor(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        response = client.get('/order/account/buying', {'currentCursor':'???'}, **headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_VALUE'})
 
     def test_buy_orderstaus_get_success(self):
         headers = {'HTTP_Authorization':self.token}
@@ -800,14 +931,16 @@ class BuyStatusTest(TestCase):
                             "purchaseDate" : "2020/11/10",
                         }
                     ],
-                    "username" : "shocking"
+                    "username"      : "shocking",
+                    "currentCursor" : None,
+                    "pendingCursor" : None
                 }
             }
                 
             )
         self.assertEqual(response.status_code, 200)
 
-class SellStatusTest(TestCase):
+class SellStatusTest(QueryBudgetTestMixin, TestCase):
     maxDiff = None
     @classmethod
     def setUpTestData(cls):
@@ -927,6 +1060,55 @@ class SellStatusTest(TestCase):
         ShippingInformation.objects.all().delete()
         Bid.objects.all().delete()
         Ask.objects.all().delete()
+        cache.clear()
+
+    def test_sell_orderstaus_get_query_budget(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        with self.assertNumQueries(3):
+            response = client.get('/order/account/selling', **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_sell_orderstaus_get_cached_first_page(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        client.get('/order/account/selling', **headers)
+
+        with self.assertNumQueries(1):
+            response = client.get('/order/account/selling', **headers)
+
+        self.assertEqual(response.json()['selling']['current'][0]['name'], 'Yordan')
+        self.assertEqual(response.status_code, 200)
+
+    def test_sell_orderstaus_get_cursor_pagination(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        Ask.objects.create(
+            product_size_id         = 1,
+            price                   = 90.00,
+            user_id                 = 1,
+            expiration_date         = '2020-04-30',
+            order_status_id         = 1,
+            shipping_information_id = 1
+        )
+
+        first_page  = client.get('/order/account/selling', {'limit':'1'}, **headers).json()['selling']
+        second_page = client.get('/order/account/selling', {'limit':'1', 'currentCursor':first_page['currentCursor']}, **headers).json()['selling']
+
+        self.assertEqual(first_page['current'][0]['expires'], '2020/04/30')
+        self.assertEqual(second_page['current'][0]['expires'], '2020/03/31')
+        self.assertIsNone(second_page['currentCursor'])
+        self.assertNotIn('pending', second_page)
+
+    def test_sell_orderstaus_get_invalid_cursor(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        response = client.get('/order/account/selling', {'currentCursor':'???'}, **headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_VALUE'})
 
     def test_sell_orderstaus_get_success(self):
         headers = {'HTTP_Authorization':self.token}
@@ -957,10 +1139,94 @@ class SellStatusTest(TestCase):
                             "purchaseDate" : "2020/11/10",
                         }
                     ],
-                    "username" : "shocking"
+                    "username"      : "shocking",
+                    "currentCursor" : None,
+                    "pendingCursor" : None
                 }
             }
 
             )
         self.assertEqual(response.status_code, 200)
 
+
+class LoadTestInvariantsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(email='load@shockx.com', name='load')
+
+        product = Product.objects.create(
+            name          = 'Jordan',
+            model_number  = '97silver',
+            ticker_number = '97sv',
+            color         = 'silver bullet',
+            description   = 'Gooood',
+            retail_price  = 30000.00,
+            release_date  = '2020-11-10'
+        )
+        product_size = ProductSize.objects.create(product=product, size=Size.objects.create(name='1'))
+
+        cls.order_status_current = OrderStatus.objects.create(name='current')
+        cls.order_status_pending = OrderStatus.objects.create(name='pending')
+
+        shipping_information = ShippingInformation.objects.create(
+            name            = 'load',
+            country         = 'Korea',
+            primary_address = 'Teheran-ro',
+            city            = 'Seoul',
+            postal_code     = '06000',
+            phone_number    = '01000000000',
+            user            = user
+        )
+
+        cls.orders = {
+            model : [
+                model.objects.create(
+                    product_size         = product_size,
+                    price                = 100.00,
+                    user                 = user,
+                    expiration_date      = '2020-03-31',
+                    order_status         = cls.order_status_pending,
+                    shipping_information = shipping_information
+                ) for _ in range(2)
+            ] for model in (Ask, Bid)
+        }
+
+    def test_check_invariants_success(self):
+        Order.objects.create(ask=self.orders[Ask][0], bid=self.orders[Bid][0])
+        Order.objects.create(ask=self.orders[Ask][1], bid=self.orders[Bid][1])
+
+        self.assertEqual(check_invariants(), [])
+
+    def test_check_invariants_violations(self):
+        ask, other_ask = self.orders[Ask]
+        bid, other_bid = self.orders[Bid]
+
+        Order.objects.create(ask=ask, bid=bid)
+        Order.objects.create(ask=ask, bid=other_bid)
+        Ask.objects.filter(id=other_ask.id).update(order_status=self.order_status_current)
+        Bid.objects.filter(id=other_bid.id).update(order_status=self.order_status_current)
+
+        self.assertEqual(check_invariants(), [
+            f'ask_id {ask.id} is paired in 2 orders',
+            f'bid {other_bid.id} is matched but still current',
+        ])
+
+    @patch('order.management.commands.load_orders.load_tokens', return_value=['token'])
+    @patch('order.management.commands.load_orders.load_targets', return_value=[(1, 1)])
+    @patch('order.management.commands.load_orders.run_load', return_value=([('bid', 201, 0.01), ('ask', 500, 0.02)], 1.0))
+    def test_load_orders_fails_on_server_errors(self, run_load, load_targets, load_tokens):
+        with self.assertRaisesMessage(CommandError, '1 requests failed with a server error'):
+            call_command('load_orders', workers=4, stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertEqual(run_load.call_args[0][0], 1)
+
+    def test_summarize_load(self):
+        results = [('instant_buy', 201, 0.01), ('instant_buy', 404, 0.03), ('bid', 201, 0.02), ('ask', 500, 0.04)]
+
+        summary = summarize_load(results, 2.0)
+
+        self.assertEqual(summary['requests'], 4)
+        self.assertEqual(summary['matches'], 1)
+        self.assertEqual(summary['server_errors'], 1)
+        self.assertEqual(summary['operations']['instant_buy']['statuses'], {'201':1, '404':1})
+        self.assertEqual(summary['operations']['instant_buy']['p99_ms'], 30.0)
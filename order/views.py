@@ -1,27 +1,121 @@
 import json
+from base64   import urlsafe_b64encode, urlsafe_b64decode
 from datetime import datetime, timedelta
 
-from django.http      import JsonResponse
-from django.views     import View
-from django.db        import transaction
-from django.db.models import Prefetch
+from django.views                import View
+from django.db                   import transaction
+from django.db.models            import F, Q, OuterRef, Subquery
+from django.db.models.functions  import Coalesce
+from django.db.models.signals    import post_save
 
 from user.models    import User, ShippingInformation
 from product.models import ProductSize, Product, Size, Image
 from order.models   import Ask, Bid, OrderStatus, Order
-from utils          import login_decorator
+from order.cache    import account_page_key, get_account_page, set_account_page
+from shockx.metrics import order_matches
+from utils          import login_decorator, FastJsonResponse, encode_json, encoded_json_response
 
 ORDER_STATUS_CURRENT = 'current'
 ORDER_STATUS_PENDING = 'pending'
 ORDER_NUMBER_LENGTH  = 5
+MATCH_CANDIDATES     = 5
+
+ACCOUNT_PAGE_LIMIT     = 20
+ACCOUNT_PAGE_MAX_LIMIT = 100
+
+def encode_cursor(order_id):
+    return urlsafe_b64encode(str(order_id).encode()).decode()
+
+def decode_cursor(cursor):
+    return int(urlsafe_b64decode(cursor.encode()).decode())
+
+def parse_account_page(request):
+    limit          = int(request.GET.get('limit', ACCOUNT_PAGE_LIMIT))
+    current_cursor = request.GET.get('currentCursor', None)
+    pending_cursor = request.GET.get('pendingCursor', None)
+
+    if not 0 < limit <= ACCOUNT_PAGE_MAX_LIMIT:
+        raise ValueError
+
+    for cursor in (current_cursor, pending_cursor):
+        if cursor:
+            decode_cursor(cursor)
+
+    return limit, current_cursor, pending_cursor
+
+def paginate_partitions(queryset, cursors, limit):
+    condition = Q()
+
+    for name, cursor in cursors.items():
+        partition = Q(order_status__name=name, id__lt=decode_cursor(cursor)) if cursor else Q(order_status__name=name)
+        boundary  = queryset.filter(partition).order_by('-id').values('id')[limit:limit + 1]
+        condition |= partition & Q(id__gte=Coalesce(Subquery(boundary), 0))
+
+    rows  = list(queryset.filter(condition).annotate(order_status_name=F('order_status__name')).order_by('-id'))
+    pages = {}
+
+    for name in cursors:
+        partition   = [row for row in rows if row.order_status_name == name]
+        pages[name] = partition[:limit], encode_cursor(partition[limit - 1].id) if len(partition) > limit else None
+
+    return pages
+
+def account_page_cursors(first_page, current_cursor, pending_cursor):
+    cursors = {}
+
+    if first_page or current_cursor:
+        cursors[ORDER_STATUS_CURRENT] = current_cursor
+
+    if first_page or pending_cursor:
+        cursors[ORDER_STATUS_PENDING] = pending_cursor
+
+    return cursors
+
+def claim_order(queryset, order_status_current, prefix, **fields):
+    for _ in range(MATCH_CANDIDATES):
+        order = queryset.select_for_update().first()
+
+        if order is None:
+            return None
+
+        matched_at   = datetime.now()
+        order_number = matched_at.strftime(prefix + '%y%m%d' + str(order.id).zfill(ORDER_NUMBER_LENGTH))
+        fields       = dict(fields, matched_at=matched_at, order_number=order_number)
+
+        if queryset.model.objects.filter(id=order.id, order_status=order_status_current).update(**fields):
+            for name, value in fields.items():
+                setattr(order, name, value)
+
+            post_save.send(sender=queryset.model, instance=order, created=False, update_fields=set(fields), raw=False, using=order._state.db)
+
+            return order
+
+    return None
+
+def highest_bid_subquery():
+    return Subquery(
+        Bid.objects.filter(product_size=OuterRef('product_size'), order_status__name=ORDER_STATUS_CURRENT)
+        .order_by('-price')
+        .values('price')[:1]
+    )
+
+def lowest_ask_subquery():
+    return Subquery(
+        Ask.objects.filter(product_size=OuterRef('product_size'), order_status__name=ORDER_STATUS_CURRENT)
+        .order_by('price')
+        .values('price')[:1]
+    )
 
 class BuyView(View):
+    query_budget = {'GET':9, 'POST':21}
+
+    @login_decorator
     def get(self, request, product_id):
         size_id = request.GET.get('size', None)
         user    = request.user
 
         if not ProductSize.objects.filter(product_id=product_id, size_id=size_id).exists():
-            return JsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
+            return FastJsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
 
         ProductSize.objects.select_related('product', 'size').prefetch_related('ask_set', 'bid_set', 'product__image_set')
         
@@ -50,8 +144,9 @@ class BuyView(View):
             'phoneNumber'      : shipping_information.phone_number if shipping_information else None,
         }
        
-        return JsonResponse({'data':{'product':product_detail, 'shippingInfo':shipping_information_detail}}, status=200)
+        return FastJsonResponse({'data':{'product':product_detail, 'shippingInfo':shipping_information_detail}}, status=200)
     
+    @login_decorator
     def post(self, request, product_id):
         try:
             data    = json.loads(request.body)
@@ -59,7 +154,7 @@ class BuyView(View):
             size_id = request.GET.get('size', None)
 
             if not ProductSize.objects.filter(product_id=product_id, size_id=size_id).exists():
-                return JsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
+                return FastJsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
 
             is_bid            = data.get('isBid', None)
             price             = data.get('price', None)
@@ -75,13 +170,13 @@ class BuyView(View):
             total_price       = data.get('totalPrice', None)
 
             if not is_bid:
-                return JsonResponse({'message':'KEY_ERROR'}, status=400)
+                return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
             
             if not (is_bid == '1' or is_bid == '0'):
-                return JsonResponse({'message':'INVALID_VALUE'}, status=400)
+                return FastJsonResponse({'message':'INVALID_VALUE'}, status=400)
             
             if not (name and country and primary_address and city and postal_code and phone_number and price):
-                return JsonResponse({'message':'KEY_ERROR'}, status=400)
+                return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
 
             product_size = ProductSize.objects.get(product_id=product_id, size_id=size_id)
             
@@ -114,7 +209,7 @@ class BuyView(View):
                         shipping_information = shipping_information
                     )
 
-                    return JsonResponse({'message':'SUCCESS'}, status=201)
+                    return FastJsonResponse({'message':'SUCCESS'}, status=201)
                 
                 if not total_price:
                     raise KeyError
@@ -132,34 +227,38 @@ class BuyView(View):
                 bid.order_number = datetime.now().strftime('B' + '%y%m%d' + str(bid.id).zfill(ORDER_NUMBER_LENGTH))
                 bid.save()
 
-                if not product_size.ask_set.filter(order_status__name=ORDER_STATUS_CURRENT).exists():
-                    raise ProductSize.DoesNotExist
-
-                lowest_ask  = product_size.ask_set.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('price').first()
+                lowest_ask = claim_order(
+                    product_size.ask_set.filter(order_status=order_status_current).order_by('price', 'id'),
+                    order_status_current,
+                    'A',
+                    order_status = order_status_pending,
+                    total_price  = total_price
+                )
 
-                lowest_ask.order_status = order_status_pending
-                lowest_ask.total_price  = total_price
-                lowest_ask.order_number = datetime.now().strftime('A' + '%y%m%d' + str(lowest_ask.id).zfill(ORDER_NUMBER_LENGTH))
-                lowest_ask.matched_at   = datetime.now()
-                lowest_ask.save()
+                if not lowest_ask:
+                    raise ProductSize.DoesNotExist
 
                 Order.objects.create(bid=bid, ask=lowest_ask)
+                order_matches.inc(side='buy')
                 
-                return JsonResponse({'message':'SUCCESS'}, status=201)
+                return FastJsonResponse({'message':'SUCCESS'}, status=201)
         
         except KeyError:
-            return JsonResponse({'message':'KEY_ERROR'}, status=400)
+            return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
             
         except ProductSize.DoesNotExist:
-            return JsonResponse({'message':'ASK_DOES_NOT_EXIST'}, status=404)
+            return FastJsonResponse({'message':'ASK_DOES_NOT_EXIST'}, status=404)
 
 class SellView(View):
+    query_budget = {'GET':9, 'POST':21}
+
+    @login_decorator
     def get(self, request, product_id):
         size_id = request.GET.get('size', None)
         user    = request.user
 
         if not ProductSize.objects.filter(product_id=product_id, size_id=size_id).exists():
-            return JsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
+            return FastJsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
 
         ProductSize.objects.select_related('product', 'size').prefetch_related('ask_set', 'bid_set', 'product__image_set')
         
@@ -188,8 +287,9 @@ class SellView(View):
             'phoneNumber'      : shipping_information.phone_number if shipping_information else None,
         }
        
-        return JsonResponse({'data':{'product':product_detail, 'shippingInfo':shipping_information_detail}}, status=200)
+        return FastJsonResponse({'data':{'product':product_detail, 'shippingInfo':shipping_information_detail}}, status=200)
 
+    @login_decorator
     def post(self, request, product_id):
         try: 
             data        = json.loads(request.body)
@@ -197,7 +297,7 @@ class SellView(View):
             size_id     = request.GET.get('size', None)
 
             if not ProductSize.objects.filter(product_id=product_id, size_id=size_id).exists():
-                return JsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
+                return FastJsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
 
 
             is_ask            = data.get('isAsk', None)
@@ -214,13 +314,13 @@ class SellView(View):
             total_price       = data.get('totalPrice', None)
 
             if not is_ask:
-                return JsonResponse({'message':'KEY_ERROR'}, status=400)
+                return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
 
             if not(is_ask == '0' or is_ask == '1'):
-                return JsonResponse({'message':'INVALID_VALUE'})
+                return FastJsonResponse({'message':'INVALID_VALUE'})
 
             if not (name and country and primary_address and city and postal_code and phone_number and price):
-                return JsonResponse({'message':'KEY_ERROR'}, status=400)
+                return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
 
             product_size         = ProductSize.objects.get(product_id = product_id, size_id = size_id)
 
@@ -253,124 +353,173 @@ class SellView(View):
                         shipping_information = shipping_information
                     )
 
-                    return JsonResponse({'message':'SUCCESS'}, status=201)
+                    return FastJsonResponse({'message':'SUCCESS'}, status=201)
             
                 if not total_price:
                     raise KeyError
 
-                    ask = Ask.objects.create(
-                        user                 = user,
-                        product_size         = product_size,
-                        price                = price,
-                        order_status         = order_status_pending,
-                        matched_at           = datetime.now(),
-                        total_price          = total_price,
-                        shipping_information = shipping_information
-                    )
-
-                    ask.order_number = datetime.now().strftime('A' + '%y%m%d' + str(aks.id).zfill(ORDER_NUMBER_LENGTH))
-                    ask.save()
+                ask = Ask.objects.create(
+                    user                 = user,
+                    product_size         = product_size,
+                    price                = price,
+                    order_status         = order_status_pending,
+                    matched_at           = datetime.now(),
+                    total_price          = total_price,
+                    shipping_information = shipping_information
+                )
 
-                    if not product_size.ask_set.filter(order_status__name=ORDER_STATUS_CURRENT).exists():
-                        raise ProductSize.DoesNotExist
+                ask.order_number = datetime.now().strftime('A' + '%y%m%d' + str(ask.id).zfill(ORDER_NUMBER_LENGTH))
+                ask.save()
 
-                    highest_bid = product_size.bid_set.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('-price').first()
+                highest_bid = claim_order(
+                    product_size.bid_set.filter(order_status=order_status_current).order_by('-price', 'id'),
+                    order_status_current,
+                    'B',
+                    order_status = order_status_pending,
+                    total_price  = total_price
+                )
 
-                    highest_bid.order_status = order_status_pending
-                    highest_bid.total_price  = total_price 
-                    highest_bid.order_number = datetime.now().strftime('A' + '%y%m%d' + str(aks.id).zfill(ORDER_NUMBER_LENGTH))
-                    highest_bid.matched_at   = datetime.now()
-                    highest_bid.save()
+                if not highest_bid:
+                    raise Bid.DoesNotExist
 
-                    Order.objects.create(bid=highest_bid, ask=ask)
+                Order.objects.create(bid=highest_bid, ask=ask)
+                order_matches.inc(side='sell')
 
-                    return JsonResponse({'message':'SUCCESS'}, status=201)
+                return FastJsonResponse({'message':'SUCCESS'}, status=201)
 
         except KeyError:
-            return JsonResponse({'message':'KEY_ERROR'}, status=400)
+            return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
         
         except ProductSize.DoesNotExist:
-            return JsonResponse({'message':'ASK_DOES_NOT_EXIST'}, status=404)
+            return FastJsonResponse({'message':'ASK_DOES_NOT_EXIST'}, status=404)
+
+        except Bid.DoesNotExist:
+            return FastJsonResponse({'message':'BID_DOES_NOT_EXIST'}, status=404)
 
 class BuyStatusView(View):
+    query_budget = 3
+
     @login_decorator
     def get(self, request):
         user = request.user
 
-        current_bids = Bid.objects.select_related('product_size__product', 'product_size__size')\
-            .filter(user=user, order_status__name=ORDER_STATUS_CURRENT)\
-            .prefetch_related('product_size__product__image_set',
-                Prefetch('product_size__bid_set', queryset=Bid.objects.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('-price'), to_attr='highest_bid'),
-                Prefetch('product_size__ask_set', queryset=Ask.objects.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('price'), to_attr='lowest_ask')
-            )
-
-        current_list = [{
-            'name'       : bid.product_size.product.name,
-            'size'       : bid.product_size.size.name,
-            'image'      : bid.product_size.product.image_set.all()[0].image_url,
-            'bidPrice'   : int(bid.price),
-            'highestBid' : int(bid.product_size.highest_bid[0].price) if bid.product_size.highest_bid else 0,
-            'lowestAsk'  : int(bid.product_size.lowest_ask[0].price) if bid.product_size.lowest_ask else 0,
-            'expires'    : bid.expiration_date.strftime('%Y/%m/%d')
-            } for bid in current_bids
-        ]
-
-        pending_bids = Bid.objects.select_related('product_size__product', 'product_size__size')\
-            .filter(user=user, order_status__name=ORDER_STATUS_PENDING)\
+        try:
+            limit, current_cursor, pending_cursor = parse_account_page(request)
+
+        except ValueError:
+            return FastJsonResponse({'message':'INVALID_VALUE'}, status=400)
+
+        first_page = not (current_cursor or pending_cursor)
+
+        if first_page:
+            cache_key = account_page_key('buying', user.id, limit)
+            body      = get_account_page(cache_key)
+
+            if body:
+                return encoded_json_response(body)
+
+        bids = Bid.objects.select_related('product_size__product', 'product_size__size')\
+            .filter(user=user)\
+            .annotate(highest_bid=highest_bid_subquery(), lowest_ask=lowest_ask_subquery())\
             .prefetch_related('product_size__product__image_set')
 
-        pending_list = [{
-            'name'         : bid.product_size.product.name,
-            'size'         : bid.product_size.size.name,
-            'image'        : bid.product_size.product.image_set.all()[0].image_url,
-            'price'        : int(bid.price),
-            'orderNumber'  : bid.order_number,
-            'purchaseDate' : bid.matched_at.strftime('%Y/%m/%d'),
-            } for bid in pending_bids
-        ]
+        pages  = paginate_partitions(bids, account_page_cursors(first_page, current_cursor, pending_cursor), limit)
+        buying = {'username':user.name}
+
+        if ORDER_STATUS_CURRENT in pages:
+            current_bids, buying['currentCursor'] = pages[ORDER_STATUS_CURRENT]
+
+            buying['current'] = [{
+                'name'       : bid.product_size.product.name,
+                'size'       : bid.product_size.size.name,
+                'image'      : bid.product_size.product.image_set.all()[0].image_url,
+                'bidPrice'   : int(bid.price),
+                'highestBid' : int(bid.highest_bid) if bid.highest_bid else 0,
+                'lowestAsk'  : int(bid.lowest_ask) if bid.lowest_ask else 0,
+                'expires'    : bid.expiration_date.strftime('%Y/%m/%d')
+                } for bid in current_bids
+            ]
+
+        if ORDER_STATUS_PENDING in pages:
+            pending_bids, buying['pendingCursor'] = pages[ORDER_STATUS_PENDING]
+
+            buying['pending'] = [{
+                'name'         : bid.product_size.product.name,
+                'size'         : bid.product_size.size.name,
+                'image'        : bid.product_size.product.image_set.all()[0].image_url,
+                'price'        : int(bid.price),
+                'orderNumber'  : bid.order_number,
+                'purchaseDate' : bid.matched_at.strftime('%Y/%m/%d'),
+                } for bid in pending_bids
+            ]
+
+        body = encode_json({'buying':buying})
 
-        username = User.objects.get(id=user.id).name
+        if first_page:
+            set_account_page(cache_key, [bid.product_size_id for bid in current_bids], body)
 
-        return JsonResponse({'buying':{'current':current_list, 'pending':pending_list, 'username':username}}, status=200)
+        return encoded_json_response(body)
 
 class SellStatusView(View):
+    query_budget = 3
+
     @login_decorator
     def get(self, request):
         user = request.user
-        
-        current_asks = Ask.objects.select_related('product_size', 'product_size__product', 'product_size__size')\
-            .filter(user=user, order_status__name=ORDER_STATUS_CURRENT)\
-            .prefetch_related('product_size__product__image_set',
-                Prefetch('product_size__bid_set', queryset=Bid.objects.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('-price'), to_attr='highest_bid'),
-                Prefetch('product_size__ask_set', queryset=Ask.objects.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('price'), to_attr='lowest_ask')
-            )
-
-        current_list = [{
-            'name'       : ask.product_size.product.name,
-            'size'       : ask.product_size.size.name,
-            'image'      : ask.product_size.product.image_set.all()[0].image_url,
-            'askPrice'   : int(ask.price),
-            'highestBid' : int(ask.product_size.highest_bid[0].price) if ask.product_size.highest_bid else 0,
-            'lowestAsk'  : int(ask.product_size.lowest_ask[0].price) if ask.product_size.lowest_ask else 0,
-            'expires'    : ask.expiration_date.strftime('%Y/%m/%d')
-            } for ask in current_asks
-        ]
-
-        pending_asks = Ask.objects.select_related('product_size__product', 'product_size__size')\
-            .filter(user=user, order_status__name=ORDER_STATUS_PENDING)\
-            .prefetch_related('product_size__product__image_set')
 
-        pending_list = [{
-            'name'         : ask.product_size.product.name,
-            'size'         : ask.product_size.size.name,
-            'image'        : ask.product_size.product.image_set.all()[0].image_url,
-            'price'        : int(ask.price),
-            'orderNumber'  : ask.order_number,
-            'purchaseDate' : ask.matched_at.strftime('%Y/%m/%d'),
-            } for ask in pending_asks
-        ]
+        try:
+            limit, current_cursor, pending_cursor = parse_account_page(request)
+
+        except ValueError:
+            return FastJsonResponse({'message':'INVALID_VALUE'}, status=400)
+
+        first_page = not (current_cursor or pending_cursor)
 
-        username = User.objects.get(id=user.id).name
+        if first_page:
+            cache_key = account_page_key('selling', user.id, limit)
+            body      = get_account_page(cache_key)
 
-        return JsonResponse({'selling':{'current':current_list, 'pending':pending_list, 'username':username}}, status=200)
+            if body:
+                return encoded_json_response(body)
+
+        asks = Ask.objects.select_related('product_size__product', 'product_size__size')\
+            .filter(user=user)\
+            .annotate(highest_bid=highest_bid_subquery(), lowest_ask=lowest_ask_subquery())\
+            .prefetch_related('product_size__product__image_set')
 
+        pages   = paginate_partitions(asks, account_page_cursors(first_page, current_cursor, pending_cursor), limit)
+        selling = {'username':user.name}
+
+        if ORDER_STATUS_CURRENT in pages:
+            current_asks, selling['currentCursor'] = pages[ORDER_STATUS_CURRENT]
+
+            selling['current'] = [{
+                'name'       : ask.product_size.product.name,
+                'size'       : ask.product_size.size.name,
+                'image'      : ask.product_size.product.image_set.all()[0].image_url,
+                'askPrice'   : int(ask.price),
+                'highestBid' : int(ask.highest_bid) if ask.highest_bid else 0,
+                'lowestAsk'  : int(ask.lowest_ask) if ask.lowest_ask else 0,
+                'expires'    : ask.expiration_date.strftime('%Y/%m/%d')
+                } for ask in current_asks
+            ]
+
+        if ORDER_STATUS_PENDING in pages:
+            pending_asks, selling['pendingCursor'] = pages[ORDER_STATUS_PENDING]
+
+            selling['pending'] = [{
+                'name'         : ask.product_size.product.name,
+                'size'         : ask.product_size.size.name,
+                'image'        : ask.product_size.product.image_set.all()[0].image_url,
+                'price'        : int(ask.price),
+                'orderNumber'  : ask.order_number,
+                'purchaseDate' : ask.matched_at.strftime('%Y/%m/%d'),
+                } for ask in pending_asks
+            ]
+
+        body = encode_json({'selling':selling})
+
+        if first_page:
+            set_account_page(cache_key, [ask.product_size_id for ask in current_asks], body)
+
+        return encoded_json_response(body)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ProductConfig(AppConfig):
     name = 'product'
+
+    def ready(self):
+        import product.signals
@@ -0,0 +1,67 @@
+import time
+
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'catalog_version'
+VERSION_TIMEOUT     = 60 * 60 * 24 * 7
+
+def product_version_key(product_id):
+    return f'product_version:{product_id}'
+
+def product_detail_key(product_id, version):
+    return f'product_detail{product_id}:{version}'
+
+def initial_version():
+    return int(time.time() * 1000)
+
+def get_version(key):
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, initial_version(), timeout=VERSION_TIMEOUT)
+        version = cache.get(key)
+
+    return version
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+
+    except ValueError:
+        cache.add(key, initial_version(), timeout=VERSION_TIMEOUT)
+        return cache.incr(key)
+
+def get_product_version(product_id):
+    return cache.get(product_version_key(product_id))
+
+def create_product_version(product_id):
+    return get_version(product_version_key(product_id))
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+
+    for key in set(keys) - versions.keys():
+        versions[key] = get_version(key)
+
+    return versions
+
+def get_product_versions(product_ids):
+    version_keys = {product_version_key(product_id): product_id for product_id in product_ids}
+    versions     = cache.get_many(list(version_keys))
+
+    return {version_keys[version_key]: version for version_key, version in versions.items()}
+
+def create_product_versions(product_ids):
+    version_keys = {product_version_key(product_id): product_id for product_id in product_ids}
+    versions     = get_versions(list(version_keys))
+
+    return {version_keys[version_key]: version for version_key, version in versions.items()}
+
+def get_catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+def bump_product_versions(product_ids):
+    for product_id in set(product_ids):
+        bump_version(product_version_key(product_id))
+
+    bump_version(CATALOG_VERSION_KEY)
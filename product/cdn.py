@@ -0,0 +1,65 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools          import lru_cache
+
+import requests
+
+from django.conf                 import settings
+from django.utils.cache          import patch_cache_control, patch_vary_headers
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SURROGATE_KEY = 'catalog'
+
+def product_surrogate_key(product_id):
+    return f'product-{product_id}'
+
+def add_edge_cache_headers(response, surrogate_keys, max_age, stale_while_revalidate):
+    response['Surrogate-Key'] = ' '.join(surrogate_keys)
+    patch_cache_control(response, public=True, max_age=max_age, stale_while_revalidate=stale_while_revalidate)
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    return response
+
+class NullPurgeBackend:
+    def purge(self, surrogate_keys):
+        pass
+
+class LocalPurgeBackend:
+    def __init__(self):
+        self.purged = []
+
+    def purge(self, surrogate_keys):
+        self.purged.append(sorted(surrogate_keys))
+
+class HttpPurgeBackend:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix='cdn-purge')
+
+    def send(self, surrogate_keys):
+        try:
+            requests.post(
+                settings.CDN_PURGE_URL,
+                headers = {
+                    'Surrogate-Key' : ' '.join(surrogate_keys),
+                    'Authorization' : f'Bearer {settings.CDN_PURGE_TOKEN}',
+                },
+                timeout = settings.CDN_PURGE_TIMEOUT
+            ).raise_for_status()
+
+        except requests.RequestException as error:
+            logger.warning('CDN purge of %s failed: %s', ' '.join(surrogate_keys), error)
+
+    def purge(self, surrogate_keys):
+        return self.executor.submit(self.send, list(surrogate_keys))
+
+@lru_cache(maxsize=None)
+def load_purge_backend(path):
+    return import_string(path)()
+
+def get_purge_backend():
+    return load_purge_backend(settings.CDN_PURGE_BACKEND)
+
+def purge_surrogate_keys(surrogate_keys):
+    get_purge_backend().purge(surrogate_keys)
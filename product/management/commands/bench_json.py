@@ -0,0 +1,58 @@
+import json
+import timeit
+from datetime import datetime, timedelta
+from decimal  import Decimal
+
+from django.core.management.base  import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from utils import encode_json
+
+class Command(BaseCommand):
+    help = 'Compare DjangoJSONEncoder and orjson encode time on a product detail payload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=1000)
+        parser.add_argument('--number', type=int, default=200)
+
+    def build_payload(self, sales):
+        matched_at = datetime(2021, 1, 1, 12, 30)
+
+        return {'results':{
+            'product_id'     : 1,
+            'product_name'   : 'Jordan 1 Retro High',
+            'product_ticker' : 'AJ1H-BLKRED',
+            'color'          : 'black/red',
+            'description'    : 'benchmark payload',
+            'retail_price'   : Decimal('170.00'),
+            'release_date'   : matched_at,
+            'style'          : '555088-060',
+            'image_url'      : [f'https://images.shockx.com/{index}.jpg' for index in range(5)],
+            'sizes'          : [{
+                'size_id'            : 1,
+                'size_name'          : '270',
+                'last_sale'          : Decimal('310.00'),
+                'lowest_ask'         : Decimal('305.00'),
+                'highest_bid'        : Decimal('290.00'),
+                'total_sales'        : sales,
+                'average_sale_price' : Decimal('301.25'),
+                'sales_history'      : [{
+                    'sale_price' : Decimal(300 + index % 50),
+                    'date_time'  : matched_at - timedelta(hours=index),
+                    } for index in range(sales)
+                ]
+            }]
+        }}
+
+    def handle(self, *args, **options):
+        payload = self.build_payload(options['sales'])
+        number  = options['number']
+
+        encoders = {
+            'DjangoJSONEncoder' : lambda: json.dumps(payload, cls=DjangoJSONEncoder).encode('utf-8'),
+            'orjson'            : lambda: encode_json(payload),
+        }
+
+        for name, encode in encoders.items():
+            elapsed = min(timeit.repeat(encode, number=number, repeat=5)) / number
+            self.stdout.write(f'{name:<18} {elapsed * 1000:8.3f} ms/encode  {len(encode()):>8} bytes')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from product.models import ProductSize
+from product.market import refresh_market_values
+
+class Command(BaseCommand):
+    help = 'Rebuild the product and product size market value summaries from sale history'
+
+    def handle(self, *args, **options):
+        product_size_ids = ProductSize.objects.values_list('id', flat=True)
+
+        for product_size_id in product_size_ids.iterator():
+            refresh_market_values(product_size_id)
+
+        self.stdout.write(f'refreshed {product_size_ids.count()} product sizes')
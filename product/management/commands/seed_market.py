@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product.seeding import seed_market
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible synthetic marketplace (products, users, open and historical asks and bids)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--orders', type=int, default=1000000)
+        parser.add_argument('--history-ratio', type=float, default=0.6)
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['products'] < 1 or options['users'] < 1:
+            raise CommandError('--products and --users must be at least 1')
+
+        if not 0 <= options['history_ratio'] <= 1:
+            raise CommandError('--history-ratio must be between 0 and 1')
+
+        started = time.perf_counter()
+        counts  = seed_market(
+            products      = options['products'],
+            users         = options['users'],
+            orders        = options['orders'],
+            history_ratio = options['history_ratio'],
+            seed          = options['seed'],
+            chunk_size    = options['chunk_size'],
+            log           = lambda message: self.stdout.write(f'{time.perf_counter() - started:7.1f}s {message}')
+        )
+
+        self.stdout.write(
+            f"seeded {counts['products']} products, {counts['users']} users, {counts['sales']} sales and "
+            f"{counts['open_orders']} open orders in {time.perf_counter() - started:.1f}s"
+        )
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.db        import transaction
+from django.db.models import Avg, Count
+from django.utils     import timezone
+
+from product.models import ProductSize, ProductMarketValue, ProductSizeMarketValue
+from order.models   import Ask
+
+ORDER_STATUS_HISTORY = 'history'
+
+def summarize_sales(sales):
+    summary   = sales.aggregate(average_price=Avg('price'), total_sales=Count('id'))
+    last_sale = sales.order_by('-matched_at', '-id').values_list('price', flat=True).first()
+
+    return {
+        'last_sale'     : last_sale,
+        'average_price' : summary['average_price'],
+        'total_sales'   : summary['total_sales'],
+    }
+
+def refresh_market_values(product_size_id, create=True):
+    product_id = ProductSize.objects.filter(id=product_size_id).values_list('product_id', flat=True).first()
+
+    if not product_id:
+        return
+
+    sales        = Ask.objects.filter(order_status__name=ORDER_STATUS_HISTORY)
+    size_summary = summarize_sales(sales.filter(product_size_id=product_size_id))
+    summary      = summarize_sales(sales.filter(product_size__product_id=product_id))
+
+    if not create:
+        ProductSizeMarketValue.objects.filter(product_size_id=product_size_id).update(updated_at=timezone.now(), **size_summary)
+        ProductMarketValue.objects.filter(product_id=product_id).update(updated_at=timezone.now(), **summary)
+        return
+
+    ProductSizeMarketValue.objects.update_or_create(product_size_id=product_size_id, defaults=size_summary)
+    ProductMarketValue.objects.update_or_create(product_id=product_id, defaults=summary)
+
+def record_sale(product_size_id, price):
+    product_id = ProductSize.objects.filter(id=product_size_id).values_list('product_id', flat=True).first()
+
+    if not product_id:
+        return
+
+    price = Decimal(str(price))
+
+    with transaction.atomic():
+        for model, lookup in ((ProductSizeMarketValue, {'product_size_id':product_size_id}), (ProductMarketValue, {'product_id':product_id})):
+            value, created = model.objects.select_for_update().get_or_create(
+                defaults = {'last_sale':price, 'average_price':price, 'total_sales':1},
+                **lookup
+            )
+
+            if created:
+                continue
+
+            value.average_price = ((value.average_price or 0) * value.total_sales + price) / (value.total_sales + 1)
+            value.total_sales  += 1
+            value.last_sale     = price
+            value.save()
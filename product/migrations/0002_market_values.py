@@ -0,0 +1,70 @@
+# Generated by Django 3.1.6 on 2026-10-19 22:27
+
+from django.db import migrations, models
+from django.db.models import Avg, Count
+import django.db.models.deletion
+
+
+def summarize_sales(sales):
+    summary = sales.aggregate(average_price=Avg('price'), total_sales=Count('id'))
+
+    return {
+        'last_sale'     : sales.order_by('-matched_at', '-id').values_list('price', flat=True).first(),
+        'average_price' : summary['average_price'],
+        'total_sales'   : summary['total_sales'],
+    }
+
+
+def backfill_market_values(apps, schema_editor):
+    Ask                    = apps.get_model('order', 'Ask')
+    ProductSize            = apps.get_model('product', 'ProductSize')
+    ProductMarketValue     = apps.get_model('product', 'ProductMarketValue')
+    ProductSizeMarketValue = apps.get_model('product', 'ProductSizeMarketValue')
+
+    sales = Ask.objects.filter(order_status__name='history')
+
+    for product_size in ProductSize.objects.all():
+        ProductSizeMarketValue.objects.create(product_size=product_size, **summarize_sales(sales.filter(product_size=product_size)))
+
+    for product_id in ProductSize.objects.values_list('product_id', flat=True).distinct():
+        ProductMarketValue.objects.create(product_id=product_id, **summarize_sales(sales.filter(product_size__product_id=product_id)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0001_initial'),
+        ('order', '0002_top_of_book_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSizeMarketValue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_sale', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('average_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('total_sales', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product_size', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='market_value', to='product.productsize')),
+            ],
+            options={
+                'db_table': 'product_size_market_values',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductMarketValue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_sale', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('average_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('total_sales', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='market_value', to='product.product')),
+            ],
+            options={
+                'db_table': 'product_market_values',
+            },
+        ),
+        migrations.RunPython(backfill_market_values, migrations.RunPython.noop),
+    ]
@@ -31,3 +31,23 @@ class ProductSize(models.Model):
 
     class Meta:
         db_table = 'product_sizes'
+
+class ProductMarketValue(models.Model):
+    product       = models.OneToOneField('Product', on_delete=models.CASCADE, related_name='market_value')
+    last_sale     = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    average_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    total_sales   = models.IntegerField(default=0)
+    updated_at    = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'product_market_values'
+
+class ProductSizeMarketValue(models.Model):
+    product_size  = models.OneToOneField('ProductSize', on_delete=models.CASCADE, related_name='market_value')
+    last_sale     = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    average_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    total_sales   = models.IntegerField(default=0)
+    updated_at    = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'product_size_market_values'
@@ -0,0 +1,268 @@
+import random
+from collections import defaultdict
+from itertools   import accumulate, product as cartesian_product
+from datetime    import datetime, timedelta
+from decimal     import Decimal
+
+from django.db        import transaction
+from django.db.models import Max
+
+from user.models    import User, ShippingInformation, Portfolio
+from product.models import Product, Image, Size, ProductSize, ProductMarketValue, ProductSizeMarketValue
+from product.cache  import bump_product_versions
+from order.models   import Ask, Bid, Order, OrderStatus
+
+ORDER_STATUS_CURRENT = 'current'
+ORDER_STATUS_PENDING = 'pending'
+ORDER_STATUS_HISTORY = 'history'
+ORDER_NUMBER_LENGTH  = 5
+
+SIZE_NAMES    = [str(size) for size in range(220, 300, 5)]
+BRANDS        = ['Jordan', 'Nike', 'Adidas', 'Yeezy', 'New Balance', 'Converse', 'Vans', 'Asics']
+MODELS        = ['1 Retro High', 'Dunk Low', 'Air Max 90', 'Boost 350', '990v5', 'Chuck 70', 'Old Skool', 'Gel-Lyte III']
+COLORS        = ['black', 'white', 'red', 'blue', 'green', 'grey', 'orange', 'purple']
+RETAIL_PRICES = [Decimal(price) for price in (100, 120, 150, 170, 200, 220, 250, 300)]
+HISTORY_DAYS  = 365
+
+def next_id(model):
+    return (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+def bulk_create(model, objects, chunk_size):
+    batch = []
+
+    for obj in objects:
+        batch.append(obj)
+
+        if len(batch) == chunk_size:
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+
+            batch = []
+
+    if batch:
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+
+def popularity_weights(count, skew=1.1):
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+def order_number(prefix, order_id, matched_at):
+    return matched_at.strftime(prefix + '%y%m%d' + str(order_id).zfill(ORDER_NUMBER_LENGTH))
+
+def seed_market(products=1000, users=10000, orders=1000000, history_ratio=0.6, seed=0, chunk_size=10000, log=None):
+    log      = log or (lambda message: None)
+    rng      = random.Random(seed)
+    now      = datetime.now().replace(microsecond=0)
+    statuses = {
+        name : OrderStatus.objects.get_or_create(name=name)[0]
+        for name in (ORDER_STATUS_CURRENT, ORDER_STATUS_PENDING, ORDER_STATUS_HISTORY)
+    }
+
+    sizes = [Size.objects.get_or_create(name=name)[0] for name in SIZE_NAMES]
+
+    product_start = next_id(Product)
+    product_ids   = list(range(product_start, product_start + products))
+    retail_prices = {}
+
+    def generate_products():
+        for product_id in product_ids:
+            retail_prices[product_id] = rng.choice(RETAIL_PRICES)
+
+            yield Product(
+                id            = product_id,
+                name          = f'{rng.choice(BRANDS)} {rng.choice(MODELS)} {product_id}',
+                model_number  = f'{rng.randint(100000, 999999)}-{rng.randint(100, 999)}',
+                ticker_number = f'SX-{product_id}',
+                color         = rng.choice(COLORS),
+                description   = 'Synthetic product generated by seed_market.',
+                retail_price  = retail_prices[product_id],
+                release_date  = now - timedelta(days=rng.randint(0, 3 * HISTORY_DAYS))
+            )
+
+    bulk_create(Product, generate_products(), chunk_size)
+    bulk_create(Image, (
+        Image(product_id=product_id, image_url=f'https://images.shockx.com/products/{product_id}/{index}.jpg')
+        for product_id in product_ids for index in range(3)
+    ), chunk_size)
+
+    product_size_start = next_id(ProductSize)
+    product_sizes      = [
+        (product_size_start + index, product_id, size.id)
+        for index, (product_id, size) in enumerate(cartesian_product(product_ids, sizes))
+    ]
+
+    bulk_create(ProductSize, (
+        ProductSize(id=product_size_id, product_id=product_id, size_id=size_id)
+        for product_size_id, product_id, size_id in product_sizes
+    ), chunk_size)
+
+    log(f'created {products} products with {len(product_sizes)} sizes')
+
+    user_start = next_id(User)
+    user_ids   = list(range(user_start, user_start + users))
+
+    bulk_create(User, (
+        User(id=user_id, email=f'seed{seed}.user{user_id}@shockx.com', name=f'user{user_id}')
+        for user_id in user_ids
+    ), chunk_size)
+
+    shipping_start = next_id(ShippingInformation)
+    shipping_ids   = {user_id: shipping_start + index for index, user_id in enumerate(user_ids)}
+
+    bulk_create(ShippingInformation, (
+        ShippingInformation(
+            id              = shipping_ids[user_id],
+            user_id         = user_id,
+            name            = f'user{user_id}',
+            country         = 'Korea',
+            primary_address = f'{rng.randint(1, 999)} Teheran-ro',
+            city            = 'Seoul',
+            postal_code     = f'{rng.randint(10000, 99999)}',
+            phone_number    = f'010{rng.randint(10000000, 99999999)}'
+        ) for user_id in user_ids
+    ), chunk_size)
+
+    bulk_create(Portfolio, (
+        Portfolio(
+            user_id         = user_id,
+            product_size_id = product_size[0],
+            purchase_date   = (now - timedelta(days=rng.randint(0, HISTORY_DAYS))).date(),
+            purchase_price  = retail_prices[product_size[1]]
+        ) for user_id in user_ids for product_size in rng.sample(product_sizes, min(rng.randint(0, 5), len(product_sizes)))
+    ), chunk_size)
+
+    log(f'created {users} users')
+
+    ranked       = rng.sample(product_sizes, len(product_sizes))
+    cum_weights  = popularity_weights(len(ranked))
+    market_price = {
+        product_size_id : float(retail_prices[product_id]) * rng.lognormvariate(0.3, 0.4)
+        for product_size_id, product_id, size_id in product_sizes
+    }
+
+    sales        = int(orders * history_ratio) // 2
+    open_orders  = orders - sales * 2
+    ask_start    = next_id(Ask)
+    bid_start    = next_id(Bid)
+    size_summary = defaultdict(lambda: [Decimal(0), 0, None, None])
+
+    def price_around(product_size_id, spread):
+        return Decimal(max(1.0, market_price[product_size_id] * (1 + spread))).quantize(Decimal('1'))
+
+    def generate_sales():
+        for index in range(sales):
+            product_size_id = rng.choices(ranked, cum_weights=cum_weights)[0][0]
+            seller_id       = rng.choice(user_ids)
+            buyer_id        = rng.choice(user_ids)
+            price           = price_around(product_size_id, rng.gauss(0, 0.08))
+            matched_at      = now - timedelta(seconds=rng.randint(0, HISTORY_DAYS * 86400))
+            summary         = size_summary[product_size_id]
+
+            summary[0] += price
+            summary[1] += 1
+
+            if summary[2] is None or matched_at > summary[2]:
+                summary[2], summary[3] = matched_at, price
+
+            yield index, product_size_id, seller_id, buyer_id, price, matched_at
+
+    ask_objects   = []
+    bid_objects   = []
+    order_objects = []
+
+    def flush_sales():
+        with transaction.atomic():
+            Ask.objects.bulk_create(ask_objects)
+            Bid.objects.bulk_create(bid_objects)
+            Order.objects.bulk_create(order_objects)
+
+        ask_objects.clear()
+        bid_objects.clear()
+        order_objects.clear()
+
+    for index, product_size_id, seller_id, buyer_id, price, matched_at in generate_sales():
+        ask_id, bid_id = ask_start + index, bid_start + index
+
+        ask_objects.append(Ask(
+            id                      = ask_id,
+            user_id                 = seller_id,
+            product_size_id         = product_size_id,
+            price                   = price,
+            order_status            = statuses[ORDER_STATUS_HISTORY],
+            matched_at              = matched_at,
+            total_price             = price,
+            order_number            = order_number('A', ask_id, matched_at),
+            shipping_information_id = shipping_ids[seller_id]
+        ))
+        bid_objects.append(Bid(
+            id                      = bid_id,
+            user_id                 = buyer_id,
+            product_size_id         = product_size_id,
+            price                   = price,
+            order_status            = statuses[ORDER_STATUS_HISTORY],
+            matched_at              = matched_at,
+            total_price             = price,
+            order_number            = order_number('B', bid_id, matched_at),
+            shipping_information_id = shipping_ids[buyer_id]
+        ))
+        order_objects.append(Order(ask_id=ask_id, bid_id=bid_id))
+
+        if len(ask_objects) * 2 >= chunk_size:
+            flush_sales()
+
+    if ask_objects:
+        flush_sales()
+
+    log(f'created {sales} historical sales')
+
+    def generate_open_orders(model, side):
+        for index in range(open_orders // 2 if model is Ask else open_orders - open_orders // 2):
+            product_size_id = rng.choices(ranked, cum_weights=cum_weights)[0][0]
+            user_id         = rng.choice(user_ids)
+
+            yield model(
+                product_size_id         = product_size_id,
+                user_id                 = user_id,
+                price                   = price_around(product_size_id, side * abs(rng.gauss(0.05, 0.1))),
+                order_status            = statuses[ORDER_STATUS_CURRENT],
+                expiration_date         = now + timedelta(days=rng.choice((1, 3, 7, 14, 30, 60))),
+                shipping_information_id = shipping_ids[user_id]
+            )
+
+    bulk_create(Ask, generate_open_orders(Ask, 1), chunk_size)
+    bulk_create(Bid, generate_open_orders(Bid, -1), chunk_size)
+
+    log(f'created {open_orders} open asks and bids')
+
+    product_summary = defaultdict(lambda: [Decimal(0), 0, None, None])
+
+    for product_size_id, product_id, size_id in product_sizes:
+        summary = size_summary.get(product_size_id)
+
+        if summary is None:
+            continue
+
+        totals     = product_summary[product_id]
+        totals[0] += summary[0]
+        totals[1] += summary[1]
+
+        if totals[2] is None or summary[2] > totals[2]:
+            totals[2], totals[3] = summary[2], summary[3]
+
+    bulk_create(ProductSizeMarketValue, (
+        ProductSizeMarketValue(product_size_id=product_size_id, last_sale=last_sale, average_price=total / count, total_sales=count)
+        for product_size_id, (total, count, matched_at, last_sale) in size_summary.items()
+    ), chunk_size)
+    bulk_create(ProductMarketValue, (
+        ProductMarketValue(product_id=product_id, last_sale=last_sale, average_price=total / count, total_sales=count)
+        for product_id, (total, count, matched_at, last_sale) in product_summary.items()
+    ), chunk_size)
+
+    bump_product_versions(product_ids)
+
+    return {
+        'products'    : products,
+        'users'       : users,
+        'sales'       : sales,
+        'open_orders' : open_orders,
+    }
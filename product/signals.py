@@ -0,0 +1,60 @@
+from django.db                 import transaction
+from django.db.models.signals  import pre_save, post_save, post_delete
+from django.dispatch           import receiver
+
+from product.models import Product, ProductSize, Image
+from product.cache  import bump_product_versions
+from product.cdn    import purge_surrogate_keys, product_surrogate_key, CATALOG_SURROGATE_KEY
+from product.market import refresh_market_values, record_sale, ORDER_STATUS_HISTORY
+from order.models   import Ask, Bid, OrderStatus
+
+def product_updated(product_id):
+    bump_product_versions([product_id])
+    purge_surrogate_keys([product_surrogate_key(product_id), CATALOG_SURROGATE_KEY])
+
+def on_commit_bump(product_id):
+    if product_id:
+        transaction.on_commit(lambda: product_updated(product_id))
+
+@receiver([post_save, post_delete], sender=Ask)
+@receiver([post_save, post_delete], sender=Bid)
+def order_changed(sender, instance, **kwargs):
+    product_id = ProductSize.objects.filter(id=instance.product_size_id).values_list('product_id', flat=True).first()
+    on_commit_bump(product_id)
+
+@receiver([post_save, post_delete], sender=ProductSize)
+@receiver([post_save, post_delete], sender=Image)
+def product_related_changed(sender, instance, **kwargs):
+    on_commit_bump(instance.product_id)
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    on_commit_bump(instance.id)
+
+def is_sale(ask):
+    if Ask.order_status.is_cached(ask):
+        return ask.order_status.name == ORDER_STATUS_HISTORY
+
+    return OrderStatus.objects.filter(id=ask.order_status_id, name=ORDER_STATUS_HISTORY).exists()
+
+@receiver(pre_save, sender=Ask)
+def sale_saving(sender, instance, **kwargs):
+    instance.was_sale = bool(instance.pk) and is_sale(instance) and Ask.objects.filter(
+        id=instance.pk, order_status__name=ORDER_STATUS_HISTORY
+    ).exists()
+
+@receiver(post_save, sender=Ask)
+def sale_saved(sender, instance, created, **kwargs):
+    if not is_sale(instance):
+        return
+
+    if getattr(instance, 'was_sale', False):
+        refresh_market_values(instance.product_size_id)
+
+    else:
+        record_sale(instance.product_size_id, instance.price)
+
+@receiver(post_delete, sender=Ask)
+def sale_deleted(sender, instance, **kwargs):
+    if is_sale(instance):
+        refresh_market_values(instance.product_size_id, create=False)
@@ -1,16 +1,28 @@
 import json
+import gzip
+from datetime import datetime
+from decimal  import Decimal
+
+import requests
 
 from django.views     import View
 from django.http      import JsonResponse
 from django.db.models import Q, Min, Avg
-from django.test      import TestCase, Client
+from django.test      import TestCase, TransactionTestCase, Client, override_settings
+from django.core.cache import cache
+from unittest.mock     import patch
 
-from .models          import Product, Image, Size, ProductSize 
-from order.models     import Ask, Bid, OrderStatus, ExpirationType
+from .models          import Product, Image, Size, ProductSize, ProductMarketValue, ProductSizeMarketValue
+from .cache           import bump_product_versions, create_product_version, product_version_key, VERSION_TIMEOUT
+from .cdn             import HttpPurgeBackend, load_purge_backend, get_purge_backend
+from .seeding         import seed_market
+from .signals         import is_sale
+from order.models     import Ask, Bid, Order, OrderStatus, ExpirationType
 from user.models      import User, ShippingInformation
+from shockx.testing   import QueryBudgetTestMixin
 
 client = Client()
-class ProductDetailTest(TestCase):
+class ProductDetailTest(QueryBudgetTestMixin, TestCase):
     def setUp(self):
         User.objects.create(
             id              = 1,
@@ -141,6 +153,13 @@ class ProductDetailTest(TestCase):
         Ask.objects.all().delete()
         OrderStatus.objects.all().delete()
         OrderStatus.objects.all().delete()
+        cache.clear()
+
+    def test_product_detail_get_query_budget(self):
+        response = client.get(f'/product/{self.product.id}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
 
     def test_product_detail_get_success(self):
         response = client.get(f'/product/{self.product.id}')
@@ -167,6 +186,90 @@ class ProductDetailTest(TestCase):
         self.assertEqual(response.json()['results']['sizes'][0]['sales_history'][0]['date_time'],'2021-09-18')
         self.assertEqual(response.status_code, 200)
 
+    @patch('utils.GZIP_MIN_LENGTH', 0)
+    def test_product_detail_cached_gzip_get_success(self):
+        client.get(f'/product/{self.product.id}')
+        response = client.get(f'/product/{self.product.id}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content))['results']['product_name'], 'hehe')
+        self.assertEqual(response.status_code, 200)
+
+    @patch('utils.GZIP_MIN_LENGTH', 0)
+    def test_product_detail_cached_identity_get_success(self):
+        client.get(f'/product/{self.product.id}', HTTP_ACCEPT_ENCODING='gzip')
+        response = client.get(f'/product/{self.product.id}', HTTP_ACCEPT_ENCODING='gzip;q=0')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json()['results']['product_name'], 'hehe')
+        self.assertEqual(response.status_code, 200)
+
+    @patch('utils.GZIP_MIN_LENGTH', 0)
+    def test_product_detail_gzip_refused_over_wildcard(self):
+        client.get(f'/product/{self.product.id}', HTTP_ACCEPT_ENCODING='gzip')
+        response = client.get(f'/product/{self.product.id}', HTTP_ACCEPT_ENCODING='*, gzip;q=0')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json()['results']['product_name'], 'hehe')
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_detail_not_modified(self):
+        etag     = client.get(f'/product/{self.product.id}')['ETag']
+        response = client.get(f'/product/{self.product.id}', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_product_detail_version_bump_modified(self):
+        etag = client.get(f'/product/{self.product.id}')['ETag']
+
+        bump_product_versions([self.product.id])
+        response = client.get(f'/product/{self.product.id}', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_detail_edge_cache_headers(self):
+        response = client.get(f'/product/{self.product.id}')
+
+        self.assertEqual(response['Surrogate-Key'], f'product-{self.product.id}')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertIn('stale-while-revalidate=300', response['Cache-Control'])
+
+    def test_product_batch_get_success(self):
+        client.get(f'/product/{self.product.id}')
+
+        response = client.get('/product/batch', {'ids':f'{self.product.id},999'})
+
+        self.assertEqual(list(response.json()['results'].keys()), [str(self.product.id)])
+        self.assertEqual(response.json()['results'][str(self.product.id)]['product_name'], 'hehe')
+        self.assertEqual(response.json()['results'][str(self.product.id)]['sizes'][0]['last_sale'], 463)
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_batch_builds_misses(self):
+        with self.assertNumQueries(6):
+            response = client.get('/product/batch', {'ids':f'{self.product.id}'})
+
+        self.assertEqual(response.json()['results'][str(self.product.id)]['product_ticker'], 'AJ6-BI19')
+        self.assertEqual(client.get(f'/product/{self.product.id}').json(),
+            {'results':response.json()['results'][str(self.product.id)]}
+        )
+
+    def test_product_batch_too_many_ids(self):
+        response = client.get('/product/batch', {'ids':','.join(str(product_id) for product_id in range(51))})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'TOO_MANY_IDS'})
+
+    def test_product_batch_invalid_value(self):
+        response = client.get('/product/batch', {'ids':'1,a'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_VALUE'})
+
     def test_product_detail_not_found(self):
         response = client.get('/product/999')
         self.assertEqual(response.json(),
@@ -176,6 +279,119 @@ class ProductDetailTest(TestCase):
         )
         self.assertEqual(response.status_code, 404)
 
+    def test_sale_recorded_incrementally(self):
+        Ask.objects.create(
+            product_size_id         = 1,
+            price                   = 500,
+            user_id                 = 1,
+            shipping_information_id = 1,
+            order_status            = OrderStatus.objects.get(name='history')
+        )
+
+        market_value = ProductSizeMarketValue.objects.get(product_size_id=1)
+
+        self.assertEqual(market_value.total_sales, 3)
+        self.assertEqual(market_value.last_sale, 500)
+        self.assertEqual(market_value.average_price, Decimal('454.33'))
+        self.assertEqual(ProductMarketValue.objects.get(product_id=1).total_sales, 3)
+
+    def test_matched_ask_completed_as_sale(self):
+        ask = Ask.objects.create(
+            product_size_id         = 1,
+            price                   = 500,
+            user_id                 = 1,
+            shipping_information_id = 1,
+            matched_at              = datetime(2021, 10, 1),
+            order_status            = OrderStatus.objects.get(name='current')
+        )
+
+        ask.order_status = OrderStatus.objects.get(name='history')
+        ask.save()
+        ask.save()
+
+        market_value = ProductSizeMarketValue.objects.get(product_size_id=1)
+
+        self.assertEqual(market_value.total_sales, 3)
+        self.assertEqual(market_value.last_sale, 500)
+
+    def test_is_sale_uses_loaded_status(self):
+        ask = Ask(order_status=OrderStatus.objects.get(name='history'))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(is_sale(ask))
+
+    def test_sale_deleted_updates_timestamp(self):
+        ProductSizeMarketValue.objects.update(updated_at=datetime(2020, 1, 1))
+
+        Ask.objects.get(id=3).delete()
+
+        market_value = ProductSizeMarketValue.objects.get(product_size_id=1)
+
+        self.assertEqual(market_value.total_sales, 1)
+        self.assertGreater(market_value.updated_at, datetime(2020, 1, 1))
+
+    def test_product_version_key_expires(self):
+        with patch('product.cache.cache.add', wraps=cache.add) as add:
+            create_product_version(self.product.id)
+
+        add.assert_called_once_with(product_version_key(self.product.id), add.call_args[0][1], timeout=VERSION_TIMEOUT)
+
+    def test_unknown_product_ids_create_no_version_keys(self):
+        client.get('/product/999')
+        client.get('/product/batch', {'ids':f'{self.product.id},998'})
+
+        self.assertIsNone(cache.get(product_version_key(999)))
+        self.assertIsNone(cache.get(product_version_key(998)))
+        self.assertIsNotNone(cache.get(product_version_key(self.product.id)))
+
+    def test_product_detail_etag_per_encoding(self):
+        identity = client.get(f'/product/{self.product.id}')
+        gzipped  = client.get(f'/product/{self.product.id}', HTTP_ACCEPT_ENCODING='gzip')
+        response = client.get(f'/product/{self.product.id}', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=identity['ETag'])
+
+        self.assertNotEqual(identity['ETag'], gzipped['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+        response = client.get(f'/product/{self.product.id}', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+@override_settings(CDN_PURGE_BACKEND='product.cdn.LocalPurgeBackend')
+class ProductPurgeTest(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        user = User.objects.create(name='purge', email='purge@gmail.com')
+        ShippingInformation.objects.create(name='purge', country='korea', primary_address='a', city='b', postal_code='1', phone_number='010', user=user)
+        Product.objects.create(id=7, name='purge', model_number='p1', ticker_number='P1', color='red', description='purge', retail_price=100, release_date='2020-01-01')
+        Size.objects.create(id=7, name='7')
+        ProductSize.objects.create(id=7, product_id=7, size_id=7)
+        OrderStatus.objects.create(name='current')
+        load_purge_backend.cache_clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_ask_created_purges_product_and_catalog(self):
+        Ask.objects.create(
+            product_size_id      = 7,
+            price                = 120,
+            user                 = User.objects.get(email='purge@gmail.com'),
+            order_status         = OrderStatus.objects.get(name='current'),
+            shipping_information = ShippingInformation.objects.get(name='purge')
+        )
+
+        self.assertEqual(get_purge_backend().purged, [['catalog', 'product-7']])
+
+    @override_settings(CDN_PURGE_URL='https://cdn.example.com/purge', CDN_PURGE_TOKEN='token')
+    def test_http_purge_failure_logged(self):
+        with patch('product.cdn.requests.post', side_effect=requests.ConnectionError('down')):
+            with self.assertLogs('product.cdn', level='WARNING') as logs:
+                HttpPurgeBackend().purge(['catalog']).result()
+
+        self.assertIn('catalog', logs.output[0])
+
 class ProductListTest(TestCase):
     def setUp(self):
         Product.objects.create(
@@ -238,6 +454,7 @@ class ProductListTest(TestCase):
         ShippingInformation.objects.all().delete()
         OrderStatus.objects.all().delete()
         Ask.objects.all().delete()
+        cache.clear()
 
     def test_product_list_all_products_get_success(self):
         client = Client()
@@ -359,7 +576,46 @@ class ProductListTest(TestCase):
                 )
         self.assertEqual(response.status_code, 200)
 
+    def test_product_list_not_modified(self):
+        client   = Client()
+        etag     = client.get('/product', {'limit':'20'})['ETag']
+        response = client.get('/product', {'limit':'20'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
     def test_product_list_all_products_not_found(self):
         client = Client()
         response = client.get('/products', {'limit':'20'})
         self.assertEqual(response.status_code, 404)
+
+class SeedMarketTest(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def seed(self):
+        return seed_market(products=3, users=4, orders=100, history_ratio=0.5, seed=7, chunk_size=16)
+
+    def test_seed_market_counts(self):
+        counts = self.seed()
+
+        self.assertEqual(counts, {'products':3, 'users':4, 'sales':25, 'open_orders':50})
+        self.assertEqual(Ask.objects.count() + Bid.objects.count(), 100)
+        self.assertEqual(Order.objects.count(), 25)
+        self.assertEqual(Image.objects.count(), 9)
+        self.assertEqual(Ask.objects.filter(order_status__name='history').count(), 25)
+        self.assertEqual(
+            sum(ProductSizeMarketValue.objects.values_list('total_sales', flat=True)),
+            sum(ProductMarketValue.objects.values_list('total_sales', flat=True))
+        )
+
+    def test_seed_market_reproducible(self):
+        self.seed()
+        first = list(Ask.objects.order_by('id').values_list('price', flat=True))
+
+        Product.objects.all().delete()
+        User.objects.all().delete()
+
+        self.seed()
+        second = list(Ask.objects.order_by('id').values_list('price', flat=True))
+
+        self.assertEqual(first, second)
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views      import ProductDetailView, ProductListView
+from .views      import ProductDetailView, ProductListView, ProductBatchView
 
 urlpatterns = [
         path('', ProductListView.as_view()),
+        path('/batch', ProductBatchView.as_view()),
         path('/<int:product_id>', ProductDetailView.as_view()),
         ]
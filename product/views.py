@@ -1,17 +1,41 @@
 import json
+from collections import defaultdict
 
-from django.views     import View
-from django.http      import JsonResponse
-from django.db.models import Q, Min, Avg, Prefetch, Case, When
-from django.core.cache import cache
+from django.views       import View
+from django.db.models   import Q, Min, Avg, Prefetch, Case, When
+from django.utils.cache import get_conditional_response
+from django.core.cache  import cache
 
 from product.models import Product, Size, ProductSize
+from product.cache  import (
+    get_product_version, get_product_versions, create_product_version, create_product_versions, get_catalog_version, product_detail_key
+)
+from product.cdn    import add_edge_cache_headers, product_surrogate_key, CATALOG_SURROGATE_KEY
 from order.models   import Ask, Bid
+from shockx.metrics import record_cache
+from utils          import (
+    cached_json_response, cache_json_response, cache_json_bodies, encoded_json_response, encode_json, representation_etag, FastJsonResponse
+)
 
-ORDER_STATUS_CURRENT = 'current'
-ORDER_STATUS_HISTORY = 'history'
+ORDER_STATUS_CURRENT  = 'current'
+ORDER_STATUS_HISTORY  = 'history'
+PRODUCT_BATCH_MAX_IDS = 50
+RESULTS_PREFIX        = b'{"results":'
+RESULTS_SUFFIX        = b'}'
+
+def unwrap_results(body):
+    return body[len(RESULTS_PREFIX):-len(RESULTS_SUFFIX)]
 
 class ProductListView(View):
+    cache_max_age          = 30
+    stale_while_revalidate = 120
+    query_budget           = 3
+
+    def add_cache_headers(self, response, etag):
+        response['ETag'] = etag
+
+        return add_edge_cache_headers(response, [CATALOG_SURROGATE_KEY], self.cache_max_age, self.stale_while_revalidate)
+
     def get(self, request):
         lowest_price  = request.GET.get('lowest', None)
         highest_price = request.GET.get('highest', None)
@@ -19,12 +43,18 @@ class ProductListView(View):
         limit         = int(request.GET.get('limit', 0))
         offset        = int(request.GET.get('offset', 0))
         
-        products = Product.objects.prefetch_related('image_set')
+        version = get_catalog_version()
+        etag    = representation_etag(request, f'catalog-{version}')
 
-        product_list = cache.get(f'product_list')
+        cache_key = f'product_list:{version}:{lowest_price}:{highest_price}:{size}:{limit}:{offset}'
+        response  = get_conditional_response(request, etag=etag) or cached_json_response(request, cache_key)
 
-        if not product_list:
-            cache.set('product_list', products)
+        record_cache('product_list', hits=int(bool(response)), misses=int(not response))
+
+        if response:
+            return self.add_cache_headers(response, etag)
+
+        products = Product.objects.prefetch_related('image_set')
 
         product_condition = Q(productsize__ask__order_status__name=ORDER_STATUS_CURRENT)
 
@@ -53,64 +83,151 @@ class ProductListView(View):
             } for size in Size.objects.all()
         ]
 
-        return JsonResponse({'products':total_products, 'size_categories':size_categories}, status=200)
+        response = cache_json_response(request, cache_key, {'products':total_products, 'size_categories':size_categories})
+
+        return self.add_cache_headers(response, etag)
+
+def build_product_details(product_ids):
+    products      = Product.objects.prefetch_related('image_set').filter(id__in=product_ids)
+    product_sizes = ProductSize.objects.select_related('size')\
+        .filter(product_id__in=product_ids)\
+        .prefetch_related(
+            Prefetch('ask_set', queryset=Ask.objects.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('price'), to_attr='lowest_ask'),
+            Prefetch('bid_set', queryset=Bid.objects.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('-price'), to_attr='highest_bid'),
+            Prefetch('ask_set', queryset=Ask.objects.filter(order_status__name=ORDER_STATUS_HISTORY).order_by('-matched_at'), to_attr='ask_history'),
+        ).annotate(total_avg=Avg(
+            Case(
+                When(
+                    ask__order_status__name=ORDER_STATUS_HISTORY,
+                    then='ask__price'
+                )
+            )
+        )).order_by('product_id', 'id')
+
+    sizes_by_product = defaultdict(list)
+
+    for product_size in product_sizes:
+        sizes_by_product[product_size.product_id].append(product_size)
+
+    product_details = {}
+
+    for product in products:
+        if product.id not in sizes_by_product:
+            continue
+
+        product_detail = {
+            'product_id'     : product.id,
+            'product_name'   : product.name,
+            'product_ticker' : product.ticker_number,
+            'color'          : product.color,
+            'description'    : product.description,
+            'retail_price'   : product.retail_price,
+            'release_date'   : product.release_date.strftime('%Y-%m-%d'),
+            'style'          : product.model_number,
+            'image_url'      : [product_image.image_url for product_image in product.image_set.all()]
+            }
+
+        product_detail['sizes'] = [{
+            'size_id'                 : product_size.size_id,
+            'size_name'               : product_size.size.name,
+            'last_sale'               : int(product_size.ask_history[0].price) if product_size.ask_history else 0,
+            'price_change'            : int(product_size.ask_history[0].price - product_size.ask_history[1].price) if len(product_size.ask_history) > 1 else 0,
+            'price_change_percentage' : int((product_size.ask_history[0].price - product_size.ask_history[1].price) / product_size.ask_history[1].price * 100)\
+                                        if len(product_size.ask_history) > 1 else 0,
+            'lowest_ask'              : int(product_size.lowest_ask[0].price) if product_size.lowest_ask else 0,
+            'highest_bid'             : int(product_size.highest_bid[0].price) if product_size.highest_bid else 0,
+            'total_sales'             : len(product_size.ask_history),
+            'price_premium'           : int((product_size.ask_history[0].price - product.retail_price) / product.retail_price * 100) if product_size.ask_history else 0,
+            'average_sale_price'      : int(product_size.total_avg) if product_size.total_avg else 0,
+            'sales_history': [{
+                'sale_price'     : int(ask.price),
+                'date_time'      : ask.matched_at.strftime('%Y-%m-%d'),
+                'time'           : ask.matched_at.strftime('%H:%m')
+                } for ask in product_size.ask_history
+            ]
+            } for product_size in sizes_by_product[product.id]
+        ]
+
+        product_details[product.id] = product_detail
+
+    return product_details
 
 class ProductDetailView(View):
+    cache_max_age          = 60
+    stale_while_revalidate = 300
+    query_budget           = 6
+
+    def add_cache_headers(self, response, etag, product_id):
+        response['ETag'] = etag
+
+        return add_edge_cache_headers(response, [product_surrogate_key(product_id)], self.cache_max_age, self.stale_while_revalidate)
+
     def get(self, request, product_id):
-        if not ProductSize.objects.filter(product_id=product_id).exists():
-            return JsonResponse({'message':'PRODUCT_DOES_NOT_EXIST'}, status=404)
-        
-        product_detail = cache.get(f'product_detail{product_id}')
+        version  = get_product_version(product_id)
+        etag     = representation_etag(request, f'product-{product_id}-{version}')
+        response = None
+
+        if version is not None:
+            response = get_conditional_response(request, etag=etag) or cached_json_response(request, product_detail_key(product_id, version))
+
+        record_cache('product_detail', hits=int(bool(response)), misses=int(not response))
+
+        if response:
+            return self.add_cache_headers(response, etag, product_id)
+
+        product_detail = build_product_details([product_id]).get(product_id)
+
         if not product_detail:
-            product       = Product.objects.prefetch_related('image_set').get(id=product_id)
-            product_sizes = ProductSize.objects.select_related('size')\
-                .filter(product_id=product_id)\
-                .prefetch_related('product__image_set', 
-                    Prefetch('ask_set', queryset=Ask.objects.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('price'), to_attr='lowest_ask'),
-                    Prefetch('bid_set', queryset=Bid.objects.filter(order_status__name=ORDER_STATUS_CURRENT).order_by('-price'), to_attr='highest_bid'),
-                    Prefetch('ask_set', queryset=Ask.objects.filter(order_status__name=ORDER_STATUS_HISTORY).order_by('-matched_at'), to_attr='ask_history'),
-                ).annotate(total_avg=Avg(
-                    Case(
-                        When(
-                            ask__order_status__name=ORDER_STATUS_HISTORY,
-                            then='ask__price'
-                        )
-                    )
-                ))
-
-            product_detail = {
-                'product_id'     : product.id,
-                'product_name'   : product.name,
-                'product_ticker' : product.ticker_number,
-                'color'          : product.color,
-                'description'    : product.description,
-                'retail_price'   : product.retail_price,
-                'release_date'   : product.release_date.strftime('%Y-%m-%d'),
-                'style'          : product.model_number,
-                'image_url'      : [product_image.image_url for product_image in product.image_set.all()]
-                }
-
-            product_detail['sizes'] = [{
-                'size_id'                 : product_size.size_id,
-                'size_name'               : product_size.size.name,
-                'last_sale'               : int(product_size.ask_history[0].price) if product_size.ask_history else 0,
-                'price_change'            : int(product_size.ask_history[0].price - product_size.ask_history[1].price) if product_size.ask_history else 0,
-                'price_change_percentage' : int((product_size.ask_history[0].price - product_size.ask_history[1].price) / product_size.ask_history[1].price * 100)\
-                                            if product_size.ask_history else 0,
-                'lowest_ask'              : int(product_size.lowest_ask[0].price) if product_size.lowest_ask else 0,
-                'highest_bid'             : int(product_size.highest_bid[0].price) if product_size.highest_bid else 0,
-                'total_sales'             : len(product_size.ask_history),
-                'price_premium'           : int((product_size.ask_history[0].price - product.retail_price) / product.retail_price * 100) if product_size.ask_history else 0,
-                'average_sale_price'      : int(product_size.total_avg) if product_size.total_avg else 0,
-                'sales_history': [{
-                    'sale_price'     : int(ask.price),
-                    'date_time'      : ask.matched_at.strftime('%Y-%m-%d'),
-                    'time'           : ask.matched_at.strftime('%H:%m')
-                    } for ask in product_size.ask_history
-                ]
-                } for product_size in product_sizes
-            ]
+            return FastJsonResponse({'message':'PRODUCT_DOES_NOT_EXIST'}, status=404)
 
-            cache.set(f'product_detail{product_id}', product_detail)
-        
-        return JsonResponse({'results':product_detail}, status=200)
+        version  = create_product_version(product_id)
+        etag     = representation_etag(request, f'product-{product_id}-{version}')
+        response = cache_json_response(request, product_detail_key(product_id, version), {'results':product_detail})
+
+        return self.add_cache_headers(response, etag, product_id)
+
+class ProductBatchView(View):
+    query_budget = 6
+
+    def get(self, request):
+        try:
+            product_ids = list(dict.fromkeys(int(product_id) for product_id in request.GET['ids'].split(',')))
+
+        except KeyError:
+            return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
+
+        except ValueError:
+            return FastJsonResponse({'message':'INVALID_VALUE'}, status=400)
+
+        if len(product_ids) > PRODUCT_BATCH_MAX_IDS:
+            return FastJsonResponse({'message':'TOO_MANY_IDS'}, status=400)
+
+        versions      = get_product_versions(product_ids)
+        cache_keys    = {product_detail_key(product_id, version): product_id for product_id, version in versions.items()}
+        cached        = cache.get_many(cache_keys)
+        detail_bodies = {cache_keys[cache_key]: unwrap_results(body) for cache_key, body in cached.items()}
+
+        missing_ids = [product_id for product_id in product_ids if product_id not in detail_bodies]
+
+        record_cache('product_detail', hits=len(detail_bodies), misses=len(missing_ids))
+
+        if missing_ids:
+            built_bodies = {
+                product_id : encode_json(product_detail)
+                for product_id, product_detail in build_product_details(missing_ids).items()
+            }
+            versions.update(create_product_versions(built_bodies))
+
+            cache_json_bodies({
+                product_detail_key(product_id, versions[product_id]) : RESULTS_PREFIX + body + RESULTS_SUFFIX
+                for product_id, body in built_bodies.items()
+            })
+
+            detail_bodies.update(built_bodies)
+
+        results = b','.join(
+            b'"%d":%s' % (product_id, detail_bodies[product_id])
+            for product_id in product_ids if product_id in detail_bodies
+        )
+
+        return encoded_json_response(RESULTS_PREFIX + b'{' + results + b'}' + RESULTS_SUFFIX)
@@ -0,0 +1,165 @@
+import json
+import math
+import time
+from contextlib import contextmanager
+from datetime   import datetime, timedelta
+
+import jwt
+from django.core.cache import cache
+from django.test       import Client
+from django.test.utils import override_settings
+
+from user.models    import User, Portfolio, ShippingInformation
+from product.models import ProductSize
+from product.cache  import CATALOG_VERSION_KEY, bump_version, bump_product_versions
+from order.models   import Ask, Bid, OrderStatus
+from my_settings    import SECRET_KEY, ALGORITHM
+
+ORDER_STATUS_CURRENT = 'current'
+
+ISOLATED_CACHES = {
+    'default' : {
+        'BACKEND'  : 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION' : 'benchmarks',
+    }
+}
+
+@contextmanager
+def isolated_caches(**overrides):
+    with override_settings(CACHES=ISOLATED_CACHES, CDN_PURGE_BACKEND='product.cdn.NullPurgeBackend', **overrides):
+        cache.clear()
+
+        try:
+            yield
+
+        finally:
+            cache.clear()
+
+def percentile(values, percent):
+    ordered = sorted(values)
+
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+def summarize(timings, queries, statuses):
+    return {
+        'iterations' : len(timings),
+        'p50_ms'     : round(percentile(timings, 50) * 1000, 3),
+        'p95_ms'     : round(percentile(timings, 95) * 1000, 3),
+        'p99_ms'     : round(percentile(timings, 99) * 1000, 3),
+        'queries'    : max(queries),
+        'statuses'   : sorted(set(statuses)),
+    }
+
+def benchmark_context():
+    ask          = Ask.objects.filter(order_status__name=ORDER_STATUS_CURRENT).select_related('product_size').order_by('id').first()
+    product_size = ask.product_size if ask else ProductSize.objects.order_by('id').first()
+    portfolio    = Portfolio.objects.order_by('id').first()
+    user         = portfolio.user if portfolio else User.objects.order_by('id').first()
+
+    return {
+        'product_size_id' : product_size.id,
+        'product_id'      : product_size.product_id,
+        'size_id'         : product_size.size_id,
+        'price'           : int(ask.price) if ask else 200,
+        'user_id'         : user.id,
+        'token'           : jwt.encode({'id':user.id, 'email':user.email}, SECRET_KEY, algorithm=ALGORITHM),
+    }
+
+def restock(model, context):
+    def place():
+        model.objects.create(
+            product_size_id      = context['product_size_id'],
+            user_id              = context['user_id'],
+            price                = context['price'],
+            expiration_date      = datetime.now() + timedelta(days=30),
+            order_status         = OrderStatus.objects.get(name=ORDER_STATUS_CURRENT),
+            shipping_information = ShippingInformation.objects.filter(user_id=context['user_id']).first()
+        )
+
+    return place
+
+def endpoint_cases(context):
+    product_id = context['product_id']
+    size_id    = context['size_id']
+    price      = context['price']
+    shipping   = {
+        'name'           : 'bench',
+        'country'        : 'Korea',
+        'primaryAddress' : 'Teheran-ro',
+        'city'           : 'Seoul',
+        'postalCode'     : '06000',
+        'phoneNumber'    : '01000000000',
+        'expirationDate' : '30',
+    }
+    cold_list   = lambda: bump_version(CATALOG_VERSION_KEY)
+    cold_detail = lambda: bump_product_versions([product_id])
+
+    return [
+        ('product_list_warm',         'get',  '/product', {'limit':'20'}, None),
+        ('product_list_cold',         'get',  '/product', {'limit':'20'}, cold_list),
+        ('product_list_lowest',       'get',  '/product', {'limit':'20', 'lowest':price // 2}, cold_list),
+        ('product_list_highest',      'get',  '/product', {'limit':'20', 'highest':price * 2}, cold_list),
+        ('product_list_size',         'get',  '/product', {'limit':'20', 'size':size_id}, cold_list),
+        ('product_list_all_filters',  'get',  '/product', {'limit':'20', 'lowest':price // 2, 'highest':price * 2, 'size':size_id}, cold_list),
+        ('product_detail_cold',       'get',  f'/product/{product_id}', {}, cold_detail),
+        ('product_detail_warm',       'get',  f'/product/{product_id}', {}, None),
+        ('buy_get',                   'get',  f'/order/buy/{product_id}?size={size_id}', {}, None),
+        ('buy_post_bid',              'post', f'/order/buy/{product_id}?size={size_id}', {**shipping, 'isBid':'1', 'price':price // 2}, None),
+        ('sell_get',                  'get',  f'/order/sell/{product_id}?size={size_id}', {}, None),
+        ('sell_post_ask',             'post', f'/order/sell/{product_id}?size={size_id}', {**shipping, 'isAsk':'1', 'price':price * 2}, None),
+        ('buy_post_instant',          'post', f'/order/buy/{product_id}?size={size_id}', {**shipping, 'isBid':'0', 'price':price, 'totalPrice':price}, restock(Ask, context)),
+        ('sell_post_instant',         'post', f'/order/sell/{product_id}?size={size_id}', {**shipping, 'isAsk':'0', 'price':price, 'totalPrice':price}, restock(Bid, context)),
+        ('account_buying',            'get',  '/order/account/buying', {}, None),
+        ('account_selling',           'get',  '/order/account/selling', {}, None),
+        ('portfolio',                 'get',  '/user/portfolio', {}, None),
+    ]
+
+def run_benchmarks(context, iterations=50, warmup=3, names=None):
+    client  = Client(HTTP_AUTHORIZATION=context['token'])
+    results = {}
+
+    for name, method, path, data, before in endpoint_cases(context):
+        if names and name not in names:
+            continue
+
+        timings, queries, statuses = [], [], []
+
+        def request():
+            if method == 'post':
+                return client.post(path, json.dumps(data), content_type='application/json')
+
+            return client.get(path, data)
+
+        for index in range(warmup + iterations):
+            if before:
+                before()
+
+            started  = time.perf_counter()
+            response = request()
+            elapsed  = time.perf_counter() - started
+
+            if index >= warmup:
+                timings.append(elapsed)
+                queries.append(response.query_stats['count'])
+                statuses.append(response.status_code)
+
+        results[name] = summarize(timings, queries, statuses)
+
+    return results
+
+def compare(results, baseline, threshold=0.2, query_threshold=0, metric='p95_ms', min_delta_ms=1.0):
+    regressions = []
+
+    for name, result in results.items():
+        base = baseline.get(name)
+
+        if base is None:
+            continue
+
+        if result[metric] > base[metric] * (1 + threshold) and result[metric] - base[metric] > min_delta_ms:
+            regressions.append(f'{name}: {metric} {result[metric]:.2f} > {base[metric]:.2f} (+{threshold:.0%} allowed)')
+
+        if result['queries'] > base['queries'] + query_threshold:
+            regressions.append(f"{name}: queries {result['queries']} > {base['queries']}")
+
+    return regressions
@@ -0,0 +1,207 @@
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import random
+import time
+from collections        import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+import requests
+from django.conf            import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from user.models       import User
+from shockx.middleware import AsyncCapableMiddleware
+from shockx.benchmarks import percentile
+from my_settings       import SECRET_KEY, ALGORITHM
+
+logger = logging.getLogger('shockx.capture')
+
+REPLAY_METHODS = ('GET', 'HEAD')
+REPLAY_HEADERS = {'accept_encoding':'Accept-Encoding', 'if_none_match':'If-None-Match'}
+
+def digest(content):
+    return hashlib.sha1(content).hexdigest()[:16] if content else None
+
+def auth_subject(request):
+    token = request.headers.get('Authorization')
+
+    if not token:
+        return None
+
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM).get('id')
+
+    except jwt.exceptions.InvalidTokenError:
+        return None
+
+def content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+
+    except ValueError:
+        return None
+
+def response_checksum(response):
+    if response.streaming:
+        return None
+
+    if response.get('Content-Encoding') == 'gzip':
+        return digest(gzip.decompress(response.content))
+
+    return digest(response.content)
+
+def replay_headers(entry, token):
+    headers = {header:entry.get(field) for field, header in REPLAY_HEADERS.items()}
+
+    return {header:value for header, value in dict(headers, Authorization=token).items() if value}
+
+class TrafficCaptureMiddleware(AsyncCapableMiddleware):
+    def __init__(self, get_response):
+        if not settings.TRAFFIC_CAPTURE_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+
+        super().__init__(get_response)
+
+    def call(self, request):
+        if random.random() >= settings.TRAFFIC_CAPTURE_SAMPLE_RATE:
+            return self.get_response(request)
+
+        timestamp = time.time()
+        body_hash = self.body_hash(request)
+        started   = time.perf_counter()
+        response  = self.get_response(request)
+
+        return self.record(request, response, timestamp, body_hash, time.perf_counter() - started)
+
+    async def acall(self, request):
+        if random.random() >= settings.TRAFFIC_CAPTURE_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        timestamp = time.time()
+        body_hash = self.body_hash(request)
+        started   = time.perf_counter()
+        response  = await self.get_response(request)
+
+        return self.record(request, response, timestamp, body_hash, time.perf_counter() - started)
+
+    def body_hash(self, request):
+        return digest(request.body) if request.method in REPLAY_METHODS else None
+
+    def record(self, request, response, timestamp, body_hash, elapsed):
+        logger.info(json.dumps({
+            'timestamp'       : round(timestamp, 6),
+            'method'          : request.method,
+            'path'            : request.path,
+            'query'           : request.META.get('QUERY_STRING', ''),
+            'content_length'  : content_length(request),
+            'body_hash'       : body_hash,
+            'accept_encoding' : request.headers.get('Accept-Encoding'),
+            'if_none_match'   : request.headers.get('If-None-Match'),
+            'subject'         : auth_subject(request),
+            'view'            : getattr(request, 'view_name', None),
+            'status'          : response.status_code,
+            'duration_ms'     : round(elapsed * 1000, 3),
+            'checksum'        : response_checksum(response),
+        }))
+
+        return response
+
+def read_capture(path):
+    entries = []
+
+    for log_path in glob.glob(f'{path}*'):
+        with open(log_path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+
+                except ValueError:
+                    continue
+
+    return sorted(entries, key=lambda entry: entry['timestamp'])
+
+def subject_tokens(subjects):
+    return {
+        user_id : jwt.encode({'id':user_id, 'email':email}, SECRET_KEY, algorithm=ALGORITHM)
+        for user_id, email in User.objects.filter(id__in=subjects).values_list('id', 'email')
+    }
+
+def client_sender(client):
+    def send(entry, token):
+        headers  = {'HTTP_' + header.upper().replace('-', '_'):value for header, value in replay_headers(entry, token).items()}
+        started  = time.perf_counter()
+        response = client.generic(entry['method'], entry['path'], QUERY_STRING=entry['query'], **headers)
+        elapsed  = (time.perf_counter() - started) * 1000
+
+        return response.status_code, elapsed, response_checksum(response)
+
+    return send
+
+def http_sender(base_url, timeout=30):
+    session = requests.Session()
+
+    def send(entry, token):
+        url      = base_url.rstrip('/') + entry['path'] + (f"?{entry['query']}" if entry['query'] else '')
+        headers  = dict({'Accept-Encoding':'identity'}, **replay_headers(entry, token))
+        started  = time.perf_counter()
+        response = session.request(entry['method'], url, headers=headers, timeout=timeout)
+        elapsed  = (time.perf_counter() - started) * 1000
+
+        return response.status_code, elapsed, digest(response.content)
+
+    return send
+
+def replay(entries, send, speed=1.0, concurrency=8):
+    entries = [entry for entry in entries if entry['method'] in REPLAY_METHODS]
+    tokens  = subject_tokens({entry['subject'] for entry in entries if entry['subject']})
+
+    if not entries:
+        return []
+
+    first   = entries[0]['timestamp']
+    started = time.monotonic()
+
+    def schedule():
+        for entry in entries:
+            if speed:
+                delay = (entry['timestamp'] - first) / speed - (time.monotonic() - started)
+
+                if delay > 0:
+                    time.sleep(delay)
+
+            yield entry, tokens.get(entry['subject'])
+
+    if concurrency <= 1:
+        return [(entry, *send(entry, token)) for entry, token in schedule()]
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        futures = [(entry, executor.submit(send, entry, token)) for entry, token in schedule()]
+
+    return [(entry, *future.result()) for entry, future in futures]
+
+def compare_replay(results):
+    groups = defaultdict(lambda: {'captured':[], 'replayed':[], 'status_mismatches':0, 'checksum_mismatches':0})
+
+    for entry, status, duration_ms, checksum in results:
+        group = groups[entry['view'] or f"{entry['method']} {entry['path']}"]
+
+        group['captured'].append(entry['duration_ms'])
+        group['replayed'].append(duration_ms)
+        group['status_mismatches']   += status != entry['status']
+        group['checksum_mismatches'] += status == entry['status'] and checksum != entry['checksum']
+
+    return {
+        name : {
+            'requests'            : len(group['captured']),
+            'captured_p50_ms'     : round(percentile(group['captured'], 50), 3),
+            'captured_p95_ms'     : round(percentile(group['captured'], 95), 3),
+            'replayed_p50_ms'     : round(percentile(group['replayed'], 50), 3),
+            'replayed_p95_ms'     : round(percentile(group['replayed'], 95), 3),
+            'status_mismatches'   : group['status_mismatches'],
+            'checksum_mismatches' : group['checksum_mismatches'],
+        } for name, group in groups.items()
+    }
@@ -0,0 +1,13 @@
+from django.db.backends.mysql import base
+
+from shockx.db.pool import PooledDatabaseWrapperMixin
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def check_pooled_connection(self, connection):
+        try:
+            connection.ping()
+
+        except base.Database.Error:
+            return False
+
+        return True
@@ -0,0 +1,13 @@
+from django.db.backends.sqlite3 import base
+
+from shockx.db.pool import PooledDatabaseWrapperMixin
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def check_pooled_connection(self, connection):
+        try:
+            connection.execute('SELECT 1')
+
+        except base.Database.Error:
+            return False
+
+        return True
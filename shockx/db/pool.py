@@ -0,0 +1,198 @@
+import threading
+import time
+from abc         import ABC, abstractmethod
+from collections import Counter, deque
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils        import OperationalError
+
+from shockx.metrics import db_connection_events, db_pool_wait, db_pool_connections
+
+POOL_DEFAULT_SIZE    = 10
+POOL_DEFAULT_TIMEOUT = 5
+
+pools            = {}
+pools_lock       = threading.Lock()
+connection_stats = {}
+stats_lock       = threading.Lock()
+
+class PoolTimeout(OperationalError):
+    pass
+
+def get_connection_stats():
+    with stats_lock:
+        return {alias: dict(stats) for alias, stats in connection_stats.items()}
+
+def record(alias, **events):
+    with stats_lock:
+        stats = connection_stats.setdefault(alias, Counter())
+
+        for name, count in events.items():
+            stats[name] += count
+
+    for name, count in events.items():
+        db_connection_events.inc(count, alias=alias, event=name)
+
+def record_wait(alias, waited):
+    with stats_lock:
+        stats = connection_stats.setdefault(alias, Counter())
+
+        stats['pool_waits']     += 1
+        stats['pool_wait_time'] += waited
+
+    db_pool_wait.observe(waited, alias=alias)
+
+class ConnectionPool:
+    def __init__(self, alias, connect, check, max_size=POOL_DEFAULT_SIZE, timeout=POOL_DEFAULT_TIMEOUT):
+        self.alias    = alias
+        self.connect  = connect
+        self.check    = check
+        self.max_size = max_size
+        self.timeout  = timeout
+        self.idle     = deque()
+        self.in_use   = 0
+        self.lock     = threading.Lock()
+        self.slots    = threading.BoundedSemaphore(max_size)
+
+    def report(self, checked_out):
+        with self.lock:
+            self.in_use += checked_out
+            idle, in_use = len(self.idle), self.in_use
+
+        db_pool_connections.set(idle, alias=self.alias, state='idle')
+        db_pool_connections.set(in_use, alias=self.alias, state='in_use')
+
+    def acquire(self):
+        started  = time.monotonic()
+        acquired = self.slots.acquire(timeout=self.timeout)
+
+        record_wait(self.alias, time.monotonic() - started)
+
+        if not acquired:
+            record(self.alias, pool_timeouts=1)
+            raise PoolTimeout(f'No connection available in pool "{self.alias}" after {self.timeout}s')
+
+        try:
+            while True:
+                with self.lock:
+                    connection = self.idle.pop() if self.idle else None
+
+                if connection is None:
+                    connection = self.connect()
+                    record(self.alias, pool_created=1)
+                    self.report(1)
+
+                    return connection
+
+                if self.check(connection):
+                    record(self.alias, pool_reused=1)
+                    self.report(1)
+
+                    return connection
+
+                record(self.alias, pool_discarded=1)
+                self.close(connection)
+
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        try:
+            if discard:
+                record(self.alias, pool_discarded=1)
+                self.close(connection)
+
+            else:
+                with self.lock:
+                    self.idle.append(connection)
+
+        finally:
+            self.slots.release()
+            self.report(-1)
+
+    def close(self, connection):
+        try:
+            connection.close()
+
+        except Exception:
+            pass
+
+def get_pool(alias, connect, check, options):
+    with pools_lock:
+        if alias not in pools:
+            pools[alias] = ConnectionPool(
+                alias,
+                connect,
+                check,
+                max_size = options.get('MAX_SIZE', POOL_DEFAULT_SIZE),
+                timeout  = options.get('TIMEOUT', POOL_DEFAULT_TIMEOUT),
+            )
+
+        return pools[alias]
+
+class PooledDatabaseWrapperMixin(ABC):
+    health_check_done = False
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        if settings_dict.get('POOL') is not None and settings_dict.get('CONN_MAX_AGE'):
+            raise ImproperlyConfigured('DATABASES with POOL must set CONN_MAX_AGE to 0; the pool replaces persistent connections.')
+
+        super().__init__(settings_dict, *args, **kwargs)
+
+    @abstractmethod
+    def check_pooled_connection(self, connection):
+        pass
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get('POOL')
+
+        if options is None:
+            return None
+
+        return get_pool(self.alias, self.connect_new, self.check_pooled_connection, options)
+
+    def connect_new(self):
+        return super().get_new_connection(self.get_connection_params())
+
+    def get_new_connection(self, conn_params):
+        record(self.alias, connects=1)
+
+        if self.pool is None:
+            return super().get_new_connection(conn_params)
+
+        return self.pool.acquire()
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        if self.connection is not None and not self.health_check_done:
+            if self.settings_dict.get('CONN_HEALTH_CHECKS') and not self.in_atomic_block:
+                if self.is_usable():
+                    record(self.alias, reuses=1)
+
+                else:
+                    record(self.alias, health_check_failures=1)
+                    self.close()
+
+            else:
+                record(self.alias, reuses=1)
+
+            self.health_check_done = True
+
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def _close(self):
+        if self.pool is None:
+            return super()._close()
+
+        discard = self.in_atomic_block or self.errors_occurred or self.autocommit != self.settings_dict['AUTOCOMMIT']
+
+        self.pool.release(self.connection, discard=discard)
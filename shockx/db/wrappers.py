@@ -0,0 +1,37 @@
+import functools
+from contextlib import contextmanager
+
+from asgiref.local              import Local
+from django.db                  import connections
+from django.db.backends.signals import connection_created
+from django.dispatch            import receiver
+
+state = Local()
+
+def dispatch(execute, sql, params, many, context):
+    for wrapper in reversed(getattr(state, 'wrappers', ())):
+        execute = functools.partial(wrapper, execute)
+
+    return execute(sql, params, many, context)
+
+def install(connection):
+    if dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch)
+
+@receiver(connection_created)
+def install_on_connect(sender, connection, **kwargs):
+    install(connection)
+
+@contextmanager
+def request_execute_wrapper(wrapper):
+    for connection in connections.all():
+        install(connection)
+
+    previous       = getattr(state, 'wrappers', ())
+    state.wrappers = previous + (wrapper,)
+
+    try:
+        yield
+
+    finally:
+        state.wrappers = previous
@@ -0,0 +1,102 @@
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from shockx.middleware  import AsyncCapableMiddleware
+from shockx.db.wrappers import request_execute_wrapper
+
+logger = logging.getLogger('shockx.sql')
+
+def get_view_name(view_func):
+    view = getattr(view_func, 'view_class', view_func)
+
+    return f'{view.__module__}.{view.__qualname__}'
+
+def get_query_budget(view_func, method):
+    budget = getattr(getattr(view_func, 'view_class', view_func), 'query_budget', None)
+
+    if isinstance(budget, dict):
+        return budget.get(method)
+
+    return budget
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+
+        finally:
+            self.queries.append((sql, repr(params), time.perf_counter() - started))
+
+    def stats(self):
+        statements = Counter((sql, params) for sql, params, duration in self.queries)
+        slowest    = max(self.queries, key=lambda query: query[2], default=(None, None, 0))
+
+        return {
+            'count'        : len(self.queries),
+            'time'         : sum(duration for sql, params, duration in self.queries),
+            'duplicates'   : sum(count - 1 for count in statements.values()),
+            'slowest_sql'  : slowest[0],
+            'slowest_time' : slowest[2],
+        }
+
+class QueryInstrumentationMiddleware(AsyncCapableMiddleware):
+    def call(self, request):
+        recorder = QueryRecorder()
+
+        with request_execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        return self.report(request, response, recorder)
+
+    async def acall(self, request):
+        recorder = QueryRecorder()
+
+        with request_execute_wrapper(recorder):
+            response = await self.get_response(request)
+
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        stats           = recorder.stats()
+        stats['view']   = getattr(request, 'view_name', None)
+        stats['budget'] = getattr(request, 'query_budget', None)
+
+        response.query_stats = stats
+
+        over_budget = stats['budget'] is not None and stats['count'] > stats['budget']
+
+        if settings.DEBUG:
+            response['X-DB-Query-Count'] = stats['count']
+            response['X-DB-Time-Ms']     = f"{stats['time'] * 1000:.2f}"
+            response['X-DB-Duplicates']  = stats['duplicates']
+            response['X-DB-Slowest-Ms']  = f"{stats['slowest_time'] * 1000:.2f}"
+
+            if stats['budget'] is not None:
+                response['X-DB-Query-Budget'] = stats['budget']
+
+        else:
+            logger.info(
+                '%s %s view=%s queries=%d time=%.2fms duplicates=%d slowest=%.2fms',
+                request.method, request.path, stats['view'], stats['count'], stats['time'] * 1000,
+                stats['duplicates'], stats['slowest_time'] * 1000
+            )
+
+        if over_budget:
+            logger.warning(
+                'Query budget exceeded: view=%s queries=%d budget=%d slowest=%s',
+                stats['view'], stats['count'], stats['budget'], stats['slowest_sql']
+            )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_name    = get_view_name(view_func)
+        request.query_budget = get_query_budget(view_func, request.method)
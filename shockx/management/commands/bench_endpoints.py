@@ -0,0 +1,69 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db                   import connection
+from django.test.utils           import setup_test_environment, teardown_test_environment
+
+from product.seeding   import seed_market
+from shockx.benchmarks import benchmark_context, run_benchmarks, compare, isolated_caches
+
+class Command(BaseCommand):
+    help = (
+        'Time every endpoint against a seeded test database and compare with a saved baseline. '
+        'Only the default alias gets a test database, so replica routing is disabled for the run, '
+        'and a local in-memory cache and no-op CDN purges stand in for the configured ones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', action='append', default=None)
+        parser.add_argument('--output', default=None)
+        parser.add_argument('--baseline', default=None)
+        parser.add_argument('--metric', choices=['p50_ms', 'p95_ms', 'p99_ms'], default='p95_ms')
+        parser.add_argument('--threshold', type=float, default=0.2)
+        parser.add_argument('--query-threshold', type=int, default=0)
+        parser.add_argument('--min-delta-ms', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            with isolated_caches(DATABASE_REPLICAS=[]):
+                started = time.perf_counter()
+                seed_market(products=options['products'], users=options['users'], orders=options['orders'], seed=options['seed'])
+                self.stdout.write(f'seeded {options["orders"]} orders in {time.perf_counter() - started:.1f}s')
+
+                results = run_benchmarks(benchmark_context(), options['iterations'], options['warmup'], options['only'])
+
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<26} p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+                f"p99 {result['p99_ms']:8.2f} ms  queries {result['queries']:3d}  status {result['statuses']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                regressions = compare(
+                    results, json.load(f), options['threshold'], options['query_threshold'], options['metric'], options['min_delta_ms']
+                )
+
+            if regressions:
+                raise CommandError('performance regressions:\n' + '\n'.join(regressions))
+
+            self.stdout.write(f'no regressions against {options["baseline"]}')
@@ -0,0 +1,50 @@
+import json
+
+from django.conf                 import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test                 import Client
+
+from shockx.capture import read_capture, replay, compare_replay, client_sender, http_sender
+
+class Command(BaseCommand):
+    help = (
+        'Re-issue captured GET traffic against a target (this process by default, or --target URL) '
+        'and compare latency and response checksums with the capture'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=str(settings.TRAFFIC_CAPTURE_LOG))
+        parser.add_argument('--target', default=None, help='base URL of the build under test, e.g. http://localhost:8000')
+        parser.add_argument('--speed', type=float, default=1.0, help='rate multiplier; 0 replays back to back')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--output', default=None)
+        parser.add_argument('--max-mismatches', type=int, default=None)
+
+    def handle(self, *args, **options):
+        entries = read_capture(options['log'])[:options['limit']]
+
+        if not entries:
+            raise CommandError(f"no captured requests in {options['log']}")
+
+        send    = http_sender(options['target']) if options['target'] else client_sender(Client(raise_request_exception=False))
+        results = replay(entries, send, options['speed'], options['concurrency'])
+        summary = compare_replay(results)
+
+        self.stdout.write(f'replayed {len(results)} of {len(entries)} captured requests (writes are not replayed)')
+
+        for name, result in sorted(summary.items()):
+            self.stdout.write(
+                f"{name:<40} n {result['requests']:5d}  p50 {result['captured_p50_ms']:8.2f} -> {result['replayed_p50_ms']:8.2f} ms  "
+                f"p95 {result['captured_p95_ms']:8.2f} -> {result['replayed_p95_ms']:8.2f} ms  "
+                f"status diff {result['status_mismatches']}  checksum diff {result['checksum_mismatches']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(summary, f, indent=2, sort_keys=True)
+
+        mismatches = sum(result['checksum_mismatches'] + result['status_mismatches'] for result in summary.values())
+
+        if options['max_mismatches'] is not None and mismatches > options['max_mismatches']:
+            raise CommandError(f'{mismatches} responses differ from the capture')
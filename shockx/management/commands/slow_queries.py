@@ -0,0 +1,47 @@
+import glob
+import json
+from collections import defaultdict
+
+from django.conf                 import settings
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Rank slow-query log statement fingerprints by total time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=str(settings.SLOW_QUERY_LOG))
+        parser.add_argument('--limit', type=int, default=20)
+
+    def read_entries(self, path):
+        for log_path in sorted(glob.glob(f'{path}*')):
+            with open(log_path) as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+
+                    except ValueError:
+                        continue
+
+    def handle(self, *args, **options):
+        statements = defaultdict(lambda: {'count':0, 'total_ms':0.0, 'max_ms':0.0, 'views':set(), 'sql':None})
+
+        for entry in self.read_entries(options['log']):
+            statement = statements[entry['fingerprint']]
+
+            statement['count']    += 1
+            statement['total_ms'] += entry['duration_ms']
+            statement['max_ms']    = max(statement['max_ms'], entry['duration_ms'])
+            statement['sql']       = entry['sql']
+
+            if entry.get('view'):
+                statement['views'].add(entry['view'])
+
+        ranked = sorted(statements.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:options['limit']]
+
+        for fingerprint, statement in ranked:
+            self.stdout.write(
+                f"{fingerprint} total={statement['total_ms']:.1f}ms count={statement['count']} "
+                f"avg={statement['total_ms'] / statement['count']:.1f}ms max={statement['max_ms']:.1f}ms "
+                f"views={','.join(sorted(statement['views'])) or '-'}"
+            )
+            self.stdout.write(f"    {statement['sql']}")
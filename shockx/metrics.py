@@ -0,0 +1,264 @@
+import atexit
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from shockx.middleware import AsyncCapableMiddleware
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE    = 'text/plain; version=0.0.4; charset=utf-8'
+ARCHIVE_FILE    = 'archive.json'
+
+class Registry:
+    def __init__(self):
+        self.metrics    = {}
+        self.samples    = defaultdict(float)
+        self.lock       = threading.Lock()
+        self.pid        = None
+        self.flusher    = None
+        self.flushed_at = 0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+        return metric
+
+    def add(self, name, labels, amount):
+        with self.lock:
+            self.samples[(name, labels)] += amount
+
+    def set(self, name, labels, value):
+        with self.lock:
+            self.samples[(name, labels)] = value
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+
+    @property
+    def path(self):
+        if self.pid != os.getpid():
+            self.pid  = os.getpid()
+            self.file = f'{self.pid}-{uuid.uuid4().hex[:8]}.json'
+
+        return os.path.join(settings.METRICS_MULTIPROC_DIR, self.file)
+
+    def flush(self, force=False):
+        if not settings.METRICS_MULTIPROC_DIR:
+            return
+
+        if not force and time.monotonic() - self.flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+
+        path = self.path
+
+        with self.lock:
+            samples = [[name, list(labels), value] for (name, labels), value in self.samples.items()]
+
+        with open(path + '.tmp', 'w') as f:
+            json.dump(samples, f)
+
+        os.replace(path + '.tmp', path)
+
+        self.flushed_at = time.monotonic()
+
+    def start_flusher(self):
+        if not settings.METRICS_MULTIPROC_DIR or self.flusher == os.getpid():
+            return
+
+        self.flusher = os.getpid()
+        threading.Thread(target=self.flush_periodically, name='metrics-flush', daemon=True).start()
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush(force=True)
+
+    def read(self, paths):
+        samples = defaultdict(float)
+
+        for path in paths:
+            try:
+                with open(path) as f:
+                    for name, labels, value in json.load(f):
+                        samples[(name, tuple(tuple(label) for label in labels))] += value
+
+            except (OSError, ValueError):
+                continue
+
+        return samples
+
+    def collect(self):
+        if not settings.METRICS_MULTIPROC_DIR:
+            with self.lock:
+                return dict(self.samples)
+
+        self.flush(force=True)
+
+        return self.read(glob.glob(os.path.join(settings.METRICS_MULTIPROC_DIR, '*.json')))
+
+    def archive(self, pid):
+        if not settings.METRICS_MULTIPROC_DIR:
+            return
+
+        paths = glob.glob(os.path.join(settings.METRICS_MULTIPROC_DIR, f'{pid}-*.json'))
+
+        if not paths:
+            return
+
+        archive = os.path.join(settings.METRICS_MULTIPROC_DIR, ARCHIVE_FILE)
+        gauges  = {metric.name for metric in self.metrics.values() if metric.type == 'gauge'}
+        samples = self.read([archive] + paths)
+
+        with open(archive + '.tmp', 'w') as f:
+            json.dump([[name, list(labels), value] for (name, labels), value in samples.items() if name not in gauges], f)
+
+        os.replace(archive + '.tmp', archive)
+
+        for path in paths:
+            os.remove(path)
+
+    def render(self):
+        samples = self.collect()
+        lines   = []
+
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+
+            for (name, labels), value in sorted(samples.items()):
+                if name in metric.sample_names:
+                    lines.append(f'{name}{format_labels(labels)} {value!r}')
+
+        return '\n'.join(lines) + '\n'
+
+def format_labels(labels):
+    if not labels:
+        return ''
+
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+def label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+registry = Registry()
+
+@atexit.register
+def flush_at_exit():
+    if registry.samples:
+        registry.flush(force=True)
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name          = name
+        self.documentation = documentation
+        self.sample_names  = {name}
+
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        registry.add(self.name, label_key(labels), amount)
+
+class Gauge:
+    type = 'gauge'
+
+    def __init__(self, name, documentation):
+        self.name          = name
+        self.documentation = documentation
+        self.sample_names  = {name}
+
+        registry.register(self)
+
+    def set(self, value, **labels):
+        registry.set(self.name, label_key(labels), value)
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name          = name
+        self.documentation = documentation
+        self.buckets       = buckets
+        self.sample_names  = {f'{name}_bucket', f'{name}_sum', f'{name}_count'}
+
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        key = label_key(labels)
+
+        for bound in self.buckets:
+            registry.add(f'{self.name}_bucket', key + (('le', repr(bound)),), int(value <= bound))
+
+        registry.add(f'{self.name}_bucket', key + (('le', '+Inf'),), 1)
+        registry.add(f'{self.name}_sum', key, value)
+        registry.add(f'{self.name}_count', key, 1)
+
+request_latency = Histogram('http_request_duration_seconds', 'Request latency by view.')
+requests_total  = Counter('http_requests_total', 'Requests by view and status code.')
+db_time         = Histogram('db_query_duration_seconds', 'Total database time per request by view.')
+db_queries      = Counter('db_queries_total', 'Database queries by view.')
+cache_requests  = Counter('cache_requests_total', 'Application cache lookups by cache and result.')
+order_matches   = Counter('order_matches_total', 'Orders matched immediately against the book.')
+
+db_connection_events = Counter('db_connection_events_total', 'Database connects, reuses, health check failures and pool events by alias.')
+db_pool_wait         = Histogram('db_pool_wait_seconds', 'Time spent waiting for a pooled database connection by alias.')
+db_pool_connections  = Gauge('db_pool_connections', 'Pooled database connections in this process by alias and state.')
+
+def record_cache(name, hits=0, misses=0):
+    if hits:
+        cache_requests.inc(hits, cache=name, result='hit')
+
+    if misses:
+        cache_requests.inc(misses, cache=name, result='miss')
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    def call(self, request):
+        started  = time.perf_counter()
+        response = self.get_response(request)
+
+        return self.record(request, response, time.perf_counter() - started)
+
+    async def acall(self, request):
+        started  = time.perf_counter()
+        response = await self.get_response(request)
+
+        return self.record(request, response, time.perf_counter() - started)
+
+    def record(self, request, response, elapsed):
+        view        = getattr(request, 'view_name', None) or 'unmatched'
+        query_stats = getattr(response, 'query_stats', None)
+
+        request_latency.observe(elapsed, view=view, method=request.method)
+        requests_total.inc(view=view, method=request.method, status=response.status_code)
+
+        if query_stats:
+            db_time.observe(query_stats['time'], view=view)
+            db_queries.inc(query_stats['count'], view=view)
+
+        registry.start_flusher()
+
+        return response
+
+def metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+def metrics_view(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
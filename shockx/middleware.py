@@ -0,0 +1,24 @@
+import asyncio
+
+class AsyncCapableMiddleware:
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async     = asyncio.iscoroutinefunction(get_response)
+
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+            if hasattr(self, 'process_view'):
+                self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+
+        return self.call(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return type(self).process_view(self, request, view_func, view_args, view_kwargs)
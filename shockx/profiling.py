@@ -0,0 +1,165 @@
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime    import datetime
+
+from django.conf import settings
+from django.core import signing
+
+from shockx.middleware      import AsyncCapableMiddleware
+from shockx.instrumentation import get_view_name
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_SALT   = 'shockx.profiling'
+
+active_profiler = ContextVar('active_profiler', default=None)
+
+def make_profile_token():
+    return signing.dumps('profile', salt=PROFILE_SALT)
+
+def has_valid_token(request):
+    token = request.headers.get(PROFILE_HEADER)
+
+    if not token:
+        return False
+
+    try:
+        signing.loads(token, salt=PROFILE_SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+
+    except signing.BadSignature:
+        return False
+
+    return True
+
+class StackProfiler:
+    def __init__(self):
+        self.stack  = []
+        self.totals = Counter()
+
+    def frame_name(self, frame, event, arg):
+        if event == 'c_call':
+            return f'{getattr(arg, "__module__", None) or "builtins"}.{getattr(arg, "__qualname__", repr(arg))}'
+
+        code = frame.f_code
+
+        return f'{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}'
+
+    def __call__(self, frame, event, arg):
+        now = time.perf_counter()
+
+        if event in ('call', 'c_call'):
+            self.stack.append([self.frame_name(frame, event, arg), now, 0.0])
+
+        elif self.stack:
+            name, started, children = self.stack.pop()
+            elapsed                 = now - started
+
+            self.totals[tuple(entry[0] for entry in self.stack) + (name,)] += elapsed - children
+
+            if self.stack:
+                self.stack[-1][2] += elapsed
+
+    def runcall(self, func, *args, **kwargs):
+        sys.setprofile(self)
+
+        try:
+            return func(*args, **kwargs)
+
+        finally:
+            sys.setprofile(None)
+
+    def collapsed(self):
+        return ''.join(
+            f'{";".join(path)} {int(seconds * 1000000)}\n'
+            for path, seconds in self.totals.items() if seconds > 0
+        )
+
+def profile_filename(view_name, view_args, view_kwargs):
+    tags = [view_name, *map(str, view_args), *(f'{key}={value}' for key, value in sorted(view_kwargs.items()))]
+    tag  = re.sub(r'[^A-Za-z0-9_.=-]+', '_', '-'.join(tags))
+
+    return f'{tag}-{datetime.now().strftime("%Y%m%dT%H%M%S%f")}-{os.getpid()}.collapsed'
+
+def write_profile(filename, collapsed):
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+
+    with open(os.path.join(settings.PROFILING_DIR, filename), 'w') as f:
+        f.write(collapsed)
+
+    profiles = sorted(
+        (entry for entry in os.scandir(settings.PROFILING_DIR) if entry.name.endswith('.collapsed')),
+        key = lambda entry: entry.stat().st_mtime
+    )
+
+    for entry in profiles[:max(0, len(profiles) - settings.PROFILING_MAX_FILES)]:
+        os.remove(entry.path)
+
+def dispatch_profile(frame, event, arg):
+    profiler = active_profiler.get()
+
+    if profiler is not None and frame.f_code is not ProfilingMiddleware.acall.__code__:
+        profiler(frame, event, arg)
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+
+        self.profiling = 0
+
+    def is_selected(self, request):
+        requested = has_valid_token(request)
+        sampled   = settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE
+
+        return requested, requested or sampled
+
+    def call(self, request):
+        requested, selected = self.is_selected(request)
+
+        if not selected:
+            return self.get_response(request)
+
+        profiler = StackProfiler()
+        response = profiler.runcall(self.get_response, request)
+
+        return self.save(request, response, profiler, requested)
+
+    async def acall(self, request):
+        requested, selected = self.is_selected(request)
+
+        if not selected:
+            return await self.get_response(request)
+
+        profiler = StackProfiler()
+        token    = active_profiler.set(profiler)
+
+        self.profiling += 1
+        sys.setprofile(dispatch_profile)
+
+        try:
+            response = await self.get_response(request)
+
+        finally:
+            active_profiler.reset(token)
+            self.profiling -= 1
+
+            if not self.profiling:
+                sys.setprofile(None)
+
+        return self.save(request, response, profiler, requested)
+
+    def save(self, request, response, profiler, requested):
+        match    = request.resolver_match
+        filename = profile_filename(
+            get_view_name(match.func) if match else 'unmatched', match.args if match else (), match.kwargs if match else {}
+        )
+
+        write_profile(filename, profiler.collapsed())
+
+        if requested:
+            response['X-Profile'] = filename
+
+        return response
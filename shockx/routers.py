@@ -0,0 +1,90 @@
+import hashlib
+import random
+
+from asgiref.local     import Local
+from asgiref.sync      import sync_to_async
+from django.conf       import settings
+from django.core.cache import cache
+from django.db         import DEFAULT_DB_ALIAS, connections
+
+from shockx.middleware import AsyncCapableMiddleware
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+state = Local()
+
+def is_pinned():
+    return getattr(state, 'pinned', False)
+
+def current_replica(replicas):
+    replica = getattr(state, 'replica', None)
+
+    if replica not in replicas:
+        replica = state.replica = random.choice(replicas)
+
+    return replica
+
+def pin_key(authorization):
+    return 'db_pin:' + hashlib.sha1(authorization.encode()).hexdigest()
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+
+        if not replicas or is_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return current_replica(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+class ReplicaPinningMiddleware(AsyncCapableMiddleware):
+    def call(self, request):
+        authorization = request.headers.get('Authorization')
+        is_write      = request.method not in SAFE_METHODS
+
+        state.pinned  = is_write or bool(authorization and cache.get(pin_key(authorization)))
+        state.replica = None
+
+        try:
+            response = self.get_response(request)
+
+        finally:
+            state.pinned  = False
+            state.replica = None
+
+        if is_write and authorization and response.status_code < 400:
+            cache.set(pin_key(authorization), True, settings.DATABASE_PIN_SECONDS)
+
+        return response
+
+    async def acall(self, request):
+        authorization = request.headers.get('Authorization')
+        is_write      = request.method not in SAFE_METHODS
+
+        state.pinned  = is_write or bool(authorization and await sync_to_async(cache.get, thread_sensitive=False)(pin_key(authorization)))
+        state.replica = None
+
+        try:
+            response = await self.get_response(request)
+
+        finally:
+            state.pinned  = False
+            state.replica = None
+
+        if is_write and authorization and response.status_code < 400:
+            await sync_to_async(cache.set, thread_sensitive=False)(pin_key(authorization), True, settings.DATABASE_PIN_SECONDS)
+
+        return response
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'user',
     'product',
     'order',
+    'shockx',
     'corsheaders',
 ]
 
@@ -37,11 +38,17 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'shockx.capture.TrafficCaptureMiddleware',
+    'shockx.metrics.MetricsMiddleware',
+    'shockx.instrumentation.QueryInstrumentationMiddleware',
+    'shockx.slowlog.SlowQueryMiddleware',
+    'shockx.routers.ReplicaPinningMiddleware',
     #'django.middleware.csrf.CsrfViewMiddleware',
     #'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'shockx.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'shockx.urls'
@@ -70,6 +77,23 @@ WSGI_APPLICATION = 'shockx.wsgi.application'
 
 DATABASES = my_settings.DATABASES
 
+POOLED_ENGINES = {
+    'django.db.backends.mysql'   : 'shockx.db.backends.mysql',
+    'django.db.backends.sqlite3' : 'shockx.db.backends.sqlite3',
+}
+
+for database in DATABASES.values():
+    database['ENGINE'] = POOLED_ENGINES.get(database['ENGINE'], database['ENGINE'])
+    database.setdefault('CONN_MAX_AGE', 0 if 'POOL' in database else 60)
+    database.setdefault('CONN_HEALTH_CHECKS', True)
+
+DATABASE_REPLICAS    = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS     = ['shockx.routers.PrimaryReplicaRouter']
+DATABASE_PIN_SECONDS = 5
+
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias].setdefault('TEST', {}).setdefault('MIRROR', 'default')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -147,6 +171,93 @@ CACHES = {
     }
 }
 
+##USER_CACHE
+USER_CACHE_TIMEOUT  = 30
+USER_CACHE_SHARED   = False
+USER_CACHE_MAX_SIZE = 10000
+
+##KAKAO
+KAKAO_PROFILE_URL           = 'https://kapi.kakao.com/v2/user/me'
+KAKAO_CONNECT_TIMEOUT       = 1.0
+KAKAO_READ_TIMEOUT          = 3.0
+KAKAO_RETRIES               = 2
+KAKAO_POOL_SIZE             = 10
+KAKAO_ASYNC_POOL_SIZE       = 100
+KAKAO_BREAKER_THRESHOLD     = 5
+KAKAO_BREAKER_RESET         = 30
+KAKAO_PROFILE_CACHE_TIMEOUT = 60
+
+##CDN
+CDN_PURGE_BACKEND = 'product.cdn.NullPurgeBackend'
+CDN_PURGE_URL     = getattr(my_settings, 'CDN_PURGE_URL', None)
+CDN_PURGE_TOKEN   = getattr(my_settings, 'CDN_PURGE_TOKEN', None)
+CDN_PURGE_TIMEOUT = 3
+
+##METRICS
+METRICS_MULTIPROC_DIR  = None
+METRICS_FLUSH_INTERVAL = 1
+METRICS_ALLOWED_IPS    = ['127.0.0.1']
+METRICS_TOKEN          = getattr(my_settings, 'METRICS_TOKEN', None)
+
+##PROFILING
+PROFILING_SAMPLE_RATE   = 0
+PROFILING_TOKEN_MAX_AGE = 3600
+PROFILING_DIR           = BASE_DIR / 'profiles'
+PROFILING_MAX_FILES     = 200
+
+##SLOW_QUERY_LOG
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_LOG          = BASE_DIR / 'slow_queries.jsonl'
+SLOW_QUERY_LOG_BYTES    = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS  = 5
+
+##TRAFFIC_CAPTURE
+TRAFFIC_CAPTURE_SAMPLE_RATE = 0
+TRAFFIC_CAPTURE_LOG         = BASE_DIR / 'traffic.jsonl'
+TRAFFIC_CAPTURE_LOG_BYTES   = 50 * 1024 * 1024
+TRAFFIC_CAPTURE_LOG_BACKUPS = 5
+
+##SQL_INSTRUMENTATION
+LOGGING = {
+    'disable_existing_loggers': False,
+    'version': 1,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': SLOW_QUERY_LOG_BYTES,
+            'backupCount': SLOW_QUERY_LOG_BACKUPS,
+            'delay': True,
+        },
+        'traffic_capture': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': TRAFFIC_CAPTURE_LOG,
+            'maxBytes': TRAFFIC_CAPTURE_LOG_BYTES,
+            'backupCount': TRAFFIC_CAPTURE_LOG_BACKUPS,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'shockx.slowlog': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'shockx.capture': {
+            'handlers': ['traffic_capture'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'shockx': {
+            'handlers': ['console'],
+            'level': 'WARNING' if DEBUG else 'INFO',
+        },
+    },
+}
+
 # LOGGING = {
 #     'disable_existing_loggers': False,
 #     'version': 1,
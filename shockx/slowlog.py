@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from datetime import datetime
+
+from django.conf import settings
+
+from shockx.middleware  import AsyncCapableMiddleware
+from shockx.db.wrappers import request_execute_wrapper
+
+logger = logging.getLogger('shockx.slowlog')
+
+FINGERPRINT_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?+)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+def normalize_sql(sql):
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+
+    return sql.strip()
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:16]
+
+def redact_params(params, many=False):
+    if params is None:
+        return None
+
+    if many:
+        return f'<{len(params)} rows>'
+
+    if isinstance(params, dict):
+        return {key: f'<{type(value).__name__}>' for key, value in params.items()}
+
+    return [f'<{type(value).__name__}>' for value in params]
+
+class SlowQueryLogger:
+    def __init__(self, request):
+        self.request    = request
+        self.explaining = False
+
+    def explain(self, connection, sql, params):
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return None
+
+        self.explaining = True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+
+                return [list(row) for row in cursor.fetchall()]
+
+        except Exception as error:
+            return f'EXPLAIN failed: {error}'
+
+        finally:
+            self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        result  = execute(sql, params, many, context)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if elapsed >= settings.SLOW_QUERY_THRESHOLD_MS:
+            connection = context['connection']
+
+            logger.warning(json.dumps({
+                'timestamp'   : datetime.now().isoformat(),
+                'alias'       : connection.alias,
+                'view'        : getattr(self.request, 'view_name', None),
+                'path'        : self.request.path,
+                'duration_ms' : round(elapsed, 3),
+                'fingerprint' : fingerprint(sql),
+                'sql'         : normalize_sql(sql),
+                'params'      : redact_params(params, many),
+                'explain'     : None if many else self.explain(connection, sql, params),
+            }, default=str))
+
+        return result
+
+class SlowQueryMiddleware(AsyncCapableMiddleware):
+    def call(self, request):
+        with request_execute_wrapper(SlowQueryLogger(request)):
+            return self.get_response(request)
+
+    async def acall(self, request):
+        with request_execute_wrapper(SlowQueryLogger(request)):
+            return await self.get_response(request)
@@ -0,0 +1,16 @@
+class QueryBudgetTestMixin:
+    def assertWithinQueryBudget(self, response):
+        stats = getattr(response, 'query_stats', None)
+
+        if stats is None:
+            self.fail('Response was not instrumented by QueryInstrumentationMiddleware')
+
+        if stats['budget'] is None:
+            self.fail(f"{stats['view']} does not declare a query_budget")
+
+        self.assertLessEqual(
+            stats['count'],
+            stats['budget'],
+            f"{stats['view']} ran {stats['count']} queries (budget {stats['budget']}, {stats['duplicates']} duplicates); "
+            f"slowest: {stats['slowest_sql']}"
+        )
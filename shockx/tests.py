@@ -0,0 +1,694 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+import jwt
+
+from django.conf       import settings
+from django.test       import SimpleTestCase, TestCase, TransactionTestCase, RequestFactory, Client, AsyncClient, override_settings
+from django.http       import HttpResponse
+from django.core.cache import cache
+from django.db         import transaction, connection, connections
+from django.core.management import call_command
+from django.core.exceptions import MiddlewareNotUsed, ImproperlyConfigured
+from django.db.backends.sqlite3 import base as sqlite3_base
+from django.urls           import ResolverMatch, path
+from django.utils.module_loading import import_string
+
+from .routers    import PrimaryReplicaRouter, ReplicaPinningMiddleware, is_pinned, pin_key, state
+from .db.pool    import ConnectionPool, PoolTimeout, PooledDatabaseWrapperMixin, get_connection_stats, connection_stats
+from .db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from .instrumentation import QueryInstrumentationMiddleware
+from .metrics    import registry, request_latency, cache_requests, record_cache
+from .profiling  import ProfilingMiddleware, StackProfiler, make_profile_token
+from .slowlog    import SlowQueryMiddleware, fingerprint, normalize_sql, redact_params
+from .benchmarks import percentile, compare, benchmark_context, run_benchmarks, isolated_caches
+from .capture    import TrafficCaptureMiddleware, read_capture, replay, compare_replay, client_sender
+from product.seeding import seed_market
+from user.models import User
+from order.models import OrderStatus
+from my_settings import SECRET_KEY, ALGORITHM
+
+ASGI_DELAY = 0.2
+
+async def slow_async_view(request):
+    await asyncio.sleep(ASGI_DELAY)
+
+    return HttpResponse()
+
+urlpatterns = [path('slow', slow_async_view)]
+
+class AsyncMiddlewareTest(TestCase):
+    def test_middleware_async_capable(self):
+        for middleware_path in settings.MIDDLEWARE:
+            with self.subTest(middleware=middleware_path):
+                self.assertTrue(getattr(import_string(middleware_path), 'async_capable', False))
+
+    @override_settings(ROOT_URLCONF='shockx.tests', PROFILING_SAMPLE_RATE=0, TRAFFIC_CAPTURE_SAMPLE_RATE=1)
+    async def test_async_views_run_concurrently(self):
+        client  = AsyncClient()
+        started = time.perf_counter()
+
+        with self.assertLogs('shockx.capture', level='INFO'):
+            responses = await asyncio.gather(*(client.get('/slow') for _ in range(10)))
+
+        self.assertEqual([response.status_code for response in responses], [200] * 10)
+        self.assertLess(time.perf_counter() - started, ASGI_DELAY * 4)
+
+    @override_settings(ROOT_URLCONF='shockx.tests')
+    async def test_async_view_profiled(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILING_DIR=directory):
+            responses = await asyncio.gather(
+                AsyncClient().get('/slow', **{'X-Profile-Token':make_profile_token()}),
+                AsyncClient().get('/slow')
+            )
+
+            with open(os.path.join(directory, responses[0]['X-Profile'])) as f:
+                collapsed = f.read()
+
+        self.assertIn('slow_async_view', collapsed)
+        self.assertNotIn('X-Profile', responses[1])
+
+    async def test_query_stats_follow_sync_view(self):
+        response = await AsyncClient().get('/product/7')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.query_stats['view'], 'product.views.ProductDetailView')
+        self.assertGreater(response.query_stats['count'], 0)
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_PIN_SECONDS=5)
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_read_goes_to_replica(self):
+        self.assertEqual(self.router.db_for_read(User), 'replica')
+
+    def test_write_goes_to_primary(self):
+        self.assertEqual(self.router.db_for_write(User), 'default')
+
+    def test_read_in_atomic_block_goes_to_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(User), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_read_without_replicas_goes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_migrate_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'user'))
+        self.assertFalse(self.router.allow_migrate('replica', 'user'))
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_PIN_SECONDS=5)
+class ReplicaPinningMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router  = PrimaryReplicaRouter()
+        self.routed  = []
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_response(self, request):
+        self.routed.append(self.router.db_for_read(User))
+
+        return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+    def test_write_request_reads_from_primary(self):
+        middleware = ReplicaPinningMiddleware(self.get_response)
+
+        middleware(self.factory.post('/order/buy', HTTP_AUTHORIZATION='token'))
+
+        self.assertEqual(self.routed, ['default'])
+        self.assertFalse(is_pinned())
+
+    def test_read_after_write_pinned_to_primary(self):
+        middleware = ReplicaPinningMiddleware(self.get_response)
+
+        middleware(self.factory.get('/order/buy/status', HTTP_AUTHORIZATION='token'))
+        middleware(self.factory.post('/order/buy', HTTP_AUTHORIZATION='token'))
+        middleware(self.factory.get('/order/buy/status', HTTP_AUTHORIZATION='token'))
+        middleware(self.factory.get('/order/buy/status', HTTP_AUTHORIZATION='other'))
+
+        self.assertEqual(self.routed, ['replica', 'default', 'default', 'replica'])
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'replica_2'])
+    def test_one_replica_per_request(self):
+        def get_response(request):
+            self.routed.append({self.router.db_for_read(User) for _ in range(20)})
+
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(get_response)
+
+        with mock.patch('shockx.routers.random.choice', side_effect=['replica', 'replica_2']) as choice:
+            middleware(self.factory.get('/product'))
+            middleware(self.factory.get('/product'))
+
+        self.assertEqual(self.routed, [{'replica'}, {'replica_2'}])
+        self.assertEqual(choice.call_count, 2)
+        self.assertIsNone(state.replica)
+
+    def test_failed_write_not_pinned(self):
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse(status=400))
+
+        middleware(self.factory.post('/order/buy', HTTP_AUTHORIZATION='token'))
+
+        self.assertIsNone(cache.get(pin_key('token')))
+
+class ReplicaRoutingIntegrationTest(TransactionTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        connections.databases['routing_replica'] = dict(
+            connections.databases['default'],
+            ENGINE = 'django.db.backends.sqlite3',
+            NAME   = os.path.join(self.directory.name, 'replica.sqlite3'),
+            TEST   = {}
+        )
+
+        with connections['routing_replica'].schema_editor() as editor:
+            editor.create_model(OrderStatus)
+
+        OrderStatus.objects.using('routing_replica').create(name='routing_replica')
+        OrderStatus.objects.create(name='primary')
+
+    def tearDown(self):
+        connections['routing_replica'].close()
+        del connections['routing_replica']
+        del connections.databases['routing_replica']
+        self.directory.cleanup()
+
+    @override_settings(DATABASE_REPLICAS=['routing_replica'])
+    def test_reads_routed_between_databases(self):
+        self.assertEqual(list(OrderStatus.objects.values_list('name', flat=True)), ['routing_replica'])
+
+        with transaction.atomic():
+            self.assertEqual(list(OrderStatus.objects.values_list('name', flat=True)), ['primary'])
+
+        state.pinned = True
+
+        try:
+            self.assertEqual(list(OrderStatus.objects.values_list('name', flat=True)), ['primary'])
+
+        finally:
+            state.pinned = False
+
+    @override_settings(DATABASE_REPLICAS=['routing_replica'])
+    def test_writes_go_to_primary(self):
+        status = OrderStatus.objects.create(name='written')
+
+        self.assertEqual(status._state.db, 'default')
+        self.assertTrue(OrderStatus.objects.using('default').filter(name='written').exists())
+        self.assertFalse(OrderStatus.objects.using('routing_replica').filter(name='written').exists())
+
+class FakeConnection:
+    def __init__(self):
+        self.healthy = True
+        self.closed  = False
+
+    def close(self):
+        self.closed = True
+
+class ConnectionPoolTest(SimpleTestCase):
+    def setUp(self):
+        connection_stats.clear()
+        self.pool = ConnectionPool('test', FakeConnection, lambda connection: connection.healthy, max_size=2, timeout=0.01)
+
+    def test_released_connection_reused(self):
+        connection = self.pool.acquire()
+        self.pool.release(connection)
+
+        self.assertIs(self.pool.acquire(), connection)
+        self.assertEqual(get_connection_stats()['test']['pool_created'], 1)
+        self.assertEqual(get_connection_stats()['test']['pool_reused'], 1)
+
+    def test_unhealthy_connection_replaced(self):
+        connection = self.pool.acquire()
+        connection.healthy = False
+        self.pool.release(connection)
+
+        self.assertIsNot(self.pool.acquire(), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(get_connection_stats()['test']['pool_discarded'], 1)
+
+    def test_discarded_connection_closed(self):
+        connection = self.pool.acquire()
+        self.pool.release(connection, discard=True)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(len(self.pool.idle), 0)
+
+    def test_pool_bounded(self):
+        self.pool.acquire()
+        self.pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+
+        self.assertEqual(get_connection_stats()['test']['pool_timeouts'], 1)
+        self.assertEqual(get_connection_stats()['test']['pool_waits'], 3)
+
+    def test_pool_stats_exported(self):
+        registry.reset()
+
+        connection = self.pool.acquire()
+        self.pool.release(connection)
+        self.pool.acquire()
+
+        samples = registry.collect()
+
+        self.assertEqual(samples[('db_connection_events_total', (('alias', 'test'), ('event', 'pool_reused')))], 1)
+        self.assertEqual(samples[('db_pool_wait_seconds_count', (('alias', 'test'),))], 2)
+        self.assertEqual(samples[('db_pool_connections', (('alias', 'test'), ('state', 'in_use')))], 1)
+        self.assertEqual(samples[('db_pool_connections', (('alias', 'test'), ('state', 'idle')))], 0)
+        self.assertIn('db_pool_connections{alias="test",state="in_use"} 1', registry.render())
+
+    def test_pool_rejects_persistent_connections(self):
+        with self.assertRaises(ImproperlyConfigured):
+            SQLiteDatabaseWrapper({'NAME':':memory:', 'POOL':{}, 'CONN_MAX_AGE':60}, 'pooled')
+
+    def test_backend_must_check_pooled_connections(self):
+        class UncheckedWrapper(PooledDatabaseWrapperMixin, sqlite3_base.DatabaseWrapper):
+            pass
+
+        with self.assertRaises(TypeError):
+            UncheckedWrapper({'NAME':':memory:'}, 'unchecked')
+
+class BudgetedView:
+    query_budget = 1
+
+class QueryInstrumentationMiddlewareTest(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get_response(self, request):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.execute('SELECT 1')
+            cursor.execute('SELECT 2')
+
+        return HttpResponse()
+
+    def call(self, request):
+        middleware = QueryInstrumentationMiddleware(self.get_response)
+        view       = lambda request: None
+
+        view.view_class = BudgetedView
+        middleware.process_view(request, view, (), {})
+
+        return middleware(request)
+
+    def test_stats_recorded(self):
+        response = self.call(self.factory.get('/'))
+
+        self.assertEqual(response.query_stats['count'], 3)
+        self.assertEqual(response.query_stats['duplicates'], 1)
+        self.assertEqual(response.query_stats['budget'], 1)
+        self.assertEqual(response.query_stats['view'], 'shockx.tests.BudgetedView')
+        self.assertIn(response.query_stats['slowest_sql'], ('SELECT 1', 'SELECT 2'))
+
+    @override_settings(DEBUG=True)
+    def test_debug_headers(self):
+        response = self.call(self.factory.get('/'))
+
+        self.assertEqual(response['X-DB-Query-Count'], '3')
+        self.assertEqual(response['X-DB-Duplicates'], '1')
+        self.assertEqual(response['X-DB-Query-Budget'], '1')
+
+    def test_budget_exceeded_logged(self):
+        with self.assertLogs('shockx.sql', level='WARNING') as logs:
+            response = self.call(self.factory.get('/'))
+
+        self.assertNotIn('X-DB-Query-Count', response)
+        self.assertIn('Query budget exceeded', logs.output[0])
+
+class MetricsTest(SimpleTestCase):
+    def setUp(self):
+        registry.reset()
+
+    def tearDown(self):
+        registry.reset()
+
+    def test_histogram_buckets_cumulative(self):
+        request_latency.observe(0.02, view='test', method='GET')
+        request_latency.observe(0.2, view='test', method='GET')
+
+        text = registry.render()
+
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",view="test",le="0.01"} 0.0', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",view="test",le="0.025"} 1.0', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",view="test",le="0.25"} 2.0', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",view="test",le="+Inf"} 2.0', text)
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="test"} 2.0', text)
+
+    def test_record_cache(self):
+        record_cache('product_detail', hits=3, misses=1)
+
+        text = registry.render()
+
+        self.assertIn('cache_requests_total{cache="product_detail",result="hit"} 3.0', text)
+        self.assertIn('cache_requests_total{cache="product_detail",result="miss"} 1.0', text)
+
+    def test_multiprocess_files_summed(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROC_DIR=directory):
+            with open(f'{directory}/other-worker.json', 'w') as f:
+                f.write('[["cache_requests_total", [["cache", "user"], ["result", "hit"]], 2.0]]')
+
+            cache_requests.inc(cache='user', result='hit')
+
+            text = registry.render()
+
+        self.assertIn('cache_requests_total{cache="user",result="hit"} 3.0', text)
+
+    def test_dead_worker_archived(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROC_DIR=directory):
+            for pid in (101, 102):
+                with open(f'{directory}/{pid}-worker.json', 'w') as f:
+                    f.write('[["cache_requests_total", [["cache", "user"], ["result", "hit"]], 2.0], '
+                            '["db_pool_connections", [["alias", "default"], ["state", "idle"]], 4.0]]')
+
+            registry.archive(101)
+            registry.archive(102)
+
+            text = registry.render()
+
+            self.assertEqual(sorted(os.listdir(directory)), sorted(['archive.json', registry.file]))
+
+        self.assertIn('cache_requests_total{cache="user",result="hit"} 4.0', text)
+        self.assertNotIn('db_pool_connections{alias="default"', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='secret')
+    def test_metrics_endpoint_restricted(self):
+        self.assertEqual(Client().get('/metrics').status_code, 403)
+        self.assertEqual(Client().get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(Client().get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    def test_metrics_endpoint(self):
+        response = Client().get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('# TYPE http_request_duration_seconds histogram', response.content.decode())
+
+def profiled_leaf():
+    return sum(range(1000))
+
+def profiled_view(request, product_id):
+    profiled_leaf()
+
+    return HttpResponse()
+
+class ProfilingTest(SimpleTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.factory   = RequestFactory()
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(PROFILING_DIR=self.directory.name, PROFILING_SAMPLE_RATE=0)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.directory.cleanup()
+
+    def get_response(self, request):
+        request.resolver_match = ResolverMatch(profiled_view, (), {'product_id':7})
+
+        return profiled_view(request, product_id=7)
+
+    def process(self, request):
+        return ProfilingMiddleware(self.get_response)(request)
+
+    def test_collapsed_stacks(self):
+        profiler = StackProfiler()
+        profiler.runcall(profiled_leaf)
+
+        lines = profiler.collapsed().splitlines()
+
+        self.assertTrue(any(line.startswith('tests.py:profiled_leaf:') for line in lines))
+        self.assertTrue(any('profiled_leaf' in line and 'builtins.sum' in line for line in lines))
+
+    def test_not_triggered(self):
+        self.assertNotIn('X-Profile', self.process(self.factory.get('/product/7')))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_invalid_token_ignored(self):
+        self.assertNotIn('X-Profile', self.process(self.factory.get('/product/7', HTTP_X_PROFILE_TOKEN='forged')))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_signed_header_profiles_view(self):
+        response = self.process(self.factory.get('/product/7', HTTP_X_PROFILE_TOKEN=make_profile_token()))
+
+        self.assertEqual(os.listdir(self.directory.name), [response['X-Profile']])
+        self.assertTrue(response['X-Profile'].startswith('shockx.tests.profiled_view-product_id=7-'))
+
+    def test_sampled_request_profiled(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            response = self.process(self.factory.get('/product/7'))
+
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+    def test_profile_covers_later_middleware(self):
+        response = Client().get('/product/7', HTTP_X_PROFILE_TOKEN=make_profile_token())
+
+        with open(os.path.join(self.directory.name, response['X-Profile'])) as f:
+            collapsed = f.read()
+
+        self.assertTrue(response['X-Profile'].startswith('product.views.ProductDetailView-product_id=7-'))
+        self.assertIn('process_view', collapsed)
+
+    @override_settings(PROFILING_MAX_FILES=2)
+    def test_profiles_capped(self):
+        for _ in range(4):
+            self.process(self.factory.get('/product/7', HTTP_X_PROFILE_TOKEN=make_profile_token()))
+
+        self.assertEqual(len(os.listdir(self.directory.name)), 2)
+
+class SlowQueryLogTest(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get_response(self, request):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT %s', [42])
+
+        return HttpResponse()
+
+    def test_fingerprint_ignores_literals(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM users WHERE id IN (%s, %s, %s) AND name = 'a'"),
+            'SELECT * FROM users WHERE id IN (?+) AND name = ?'
+        )
+        self.assertEqual(fingerprint('SELECT 1 FROM a WHERE b = 2'), fingerprint('SELECT 3  FROM a WHERE b = 4'))
+
+    def test_params_redacted(self):
+        self.assertEqual(redact_params(['secret@example.com', 7]), ['<str>', '<int>'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_query_logged_with_explain(self):
+        request = self.factory.get('/product/1')
+        request.view_name = 'product.views.ProductDetailView'
+
+        with self.assertLogs('shockx.slowlog', level='WARNING') as logs:
+            SlowQueryMiddleware(self.get_response)(request)
+
+        entry = json.loads(logs.records[0].getMessage())
+
+        self.assertEqual(entry['view'], 'product.views.ProductDetailView')
+        self.assertEqual(entry['params'], ['<int>'])
+        self.assertNotIn('42', json.dumps(entry['params']))
+        self.assertIsInstance(entry['explain'], list)
+        self.assertEqual(len(logs.records), 1)
+
+    def test_command_ranks_by_total_time(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log = os.path.join(directory, 'slow.jsonl')
+
+            with open(log, 'w') as f:
+                f.write(json.dumps({'fingerprint':'a', 'sql':'SELECT a', 'duration_ms':300, 'view':'v1'}) + '\n')
+                f.write(json.dumps({'fingerprint':'b', 'sql':'SELECT b', 'duration_ms':250, 'view':'v2'}) + '\n')
+
+            with open(log + '.1', 'w') as f:
+                f.write(json.dumps({'fingerprint':'b', 'sql':'SELECT b', 'duration_ms':250, 'view':'v2'}) + '\n')
+
+            out = io.StringIO()
+            call_command('slow_queries', log=log, stdout=out)
+
+        lines = out.getvalue().splitlines()
+
+        self.assertTrue(lines[0].startswith('b total=500.0ms count=2'))
+        self.assertTrue(lines[2].startswith('a total=300.0ms count=1'))
+
+class BenchmarkCompareTest(SimpleTestCase):
+    def setUp(self):
+        self.baseline = {'product_detail_cold': {'p95_ms':10.0, 'queries':6}}
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 99), 3)
+
+    def test_within_threshold(self):
+        results = {'product_detail_cold': {'p95_ms':11.9, 'queries':6}, 'new_endpoint': {'p95_ms':50.0, 'queries':9}}
+
+        self.assertEqual(compare(results, self.baseline, threshold=0.2), [])
+
+    def test_latency_regression(self):
+        results = {'product_detail_cold': {'p95_ms':12.5, 'queries':6}}
+
+        self.assertEqual(len(compare(results, self.baseline, threshold=0.2)), 1)
+        self.assertEqual(compare(results, self.baseline, threshold=0.2, min_delta_ms=5), [])
+
+    def test_query_regression(self):
+        results = {'product_detail_cold': {'p95_ms':10.0, 'queries':7}}
+
+        self.assertIn('queries 7 > 6', compare(results, self.baseline)[0])
+
+class BenchmarkRunTest(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_run_benchmarks(self):
+        seed_market(products=2, users=3, orders=60, seed=1)
+
+        results = run_benchmarks(benchmark_context(), iterations=2, warmup=0)
+
+        self.assertEqual(results['product_detail_cold']['statuses'], [200])
+        self.assertEqual(results['portfolio']['statuses'], [200])
+        self.assertEqual(results['buy_post_bid']['statuses'], [201])
+        self.assertEqual(results['buy_post_instant']['statuses'], [201])
+        self.assertEqual(results['sell_post_instant']['statuses'], [201])
+        self.assertLessEqual(results['buy_post_instant']['queries'], 21)
+        self.assertEqual(results['product_detail_cold']['queries'], 6)
+        self.assertEqual(results['product_detail_warm']['queries'], 0)
+
+    def test_isolated_caches(self):
+        cache.set('shared', 1)
+
+        with isolated_caches():
+            self.assertEqual(cache.get('shared'), None)
+            self.assertEqual(settings.CDN_PURGE_BACKEND, 'product.cdn.NullPurgeBackend')
+
+            cache.set('product_version:1', 5)
+
+        self.assertEqual(cache.get('shared'), 1)
+        self.assertEqual(cache.get('product_version:1'), None)
+
+class TrafficCaptureTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user    = User.objects.create(email='capture@shockx.com', name='capture')
+        self.token   = jwt.encode({'id':self.user.id, 'email':self.user.email}, SECRET_KEY, algorithm=ALGORITHM)
+
+    def get_response(self, request):
+        request.view_name = 'product.views.ProductListView'
+
+        return HttpResponse('[]')
+
+    def capture(self, request):
+        with override_settings(TRAFFIC_CAPTURE_SAMPLE_RATE=1), self.assertLogs('shockx.capture', level='INFO') as logs:
+            TrafficCaptureMiddleware(self.get_response)(request)
+
+        return json.loads(logs.records[0].getMessage())
+
+    def test_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            TrafficCaptureMiddleware(self.get_response)
+
+    def test_entry_sanitized(self):
+        entry = self.capture(self.factory.post(
+            '/order/buy/1?size=2', json.dumps({'price':100}), content_type='application/json', HTTP_AUTHORIZATION=self.token
+        ))
+
+        self.assertEqual(entry['method'], 'POST')
+        self.assertEqual(entry['path'], '/order/buy/1')
+        self.assertEqual(entry['query'], 'size=2')
+        self.assertEqual(entry['subject'], self.user.id)
+        self.assertEqual(entry['view'], 'product.views.ProductListView')
+        self.assertEqual(entry['content_length'], len(json.dumps({'price':100})))
+        self.assertIsNone(entry['body_hash'])
+        self.assertNotIn(self.token, json.dumps(entry))
+        self.assertNotIn('price', json.dumps(entry))
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=10)
+    def test_write_body_left_unread(self):
+        request = self.factory.post('/user/portfolio/import', 'x' * 100, content_type='text/csv')
+
+        entry = self.capture(request)
+
+        self.assertEqual(entry['content_length'], 100)
+        self.assertEqual(request.read(), b'x' * 100)
+
+    def test_invalid_token_has_no_subject(self):
+        entry = self.capture(self.factory.get('/product', HTTP_AUTHORIZATION='garbage'))
+
+        self.assertIsNone(entry['subject'])
+        self.assertIsNone(entry['body_hash'])
+
+    def test_replay_compares_checksums(self):
+        entries = [
+            {'timestamp':1.0, 'method':'GET', 'path':'/order/account/buying', 'query':'', 'subject':self.user.id,
+             'view':'buying', 'status':200, 'duration_ms':5.0, 'checksum':'stale'},
+            {'timestamp':1.1, 'method':'POST', 'path':'/order/buy/1', 'query':'', 'subject':self.user.id,
+             'view':'buy', 'status':201, 'duration_ms':5.0, 'checksum':None},
+            {'timestamp':1.2, 'method':'GET', 'path':'/order/account/buying', 'query':'', 'subject':None,
+             'view':'buying', 'status':200, 'duration_ms':7.0, 'checksum':None},
+        ]
+
+        results = replay(entries, client_sender(Client()), speed=0, concurrency=1)
+        summary = compare_replay(results)
+
+        self.assertEqual([entry['method'] for entry, status, duration_ms, checksum in results], ['GET', 'GET'])
+        self.assertEqual(results[0][1], 200)
+        self.assertEqual(summary['buying']['requests'], 2)
+        self.assertEqual(summary['buying']['checksum_mismatches'], 1)
+        self.assertEqual(summary['buying']['status_mismatches'], 1)
+        self.assertEqual(summary['buying']['captured_p95_ms'], 7.0)
+
+    def test_replay_matches_gzip_and_conditional_responses(self):
+        seed_market(products=3, users=2, orders=100, seed=1)
+
+        with override_settings(TRAFFIC_CAPTURE_SAMPLE_RATE=1), self.assertLogs('shockx.capture', level='INFO') as logs:
+            capture_client = Client()
+            response       = capture_client.get('/product/1', HTTP_ACCEPT_ENCODING='gzip')
+
+            capture_client.get('/product/1', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        results = replay(entries, client_sender(Client()), speed=0, concurrency=1)
+        summary = compare_replay(results)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual([entry['status'] for entry in entries], [200, 304])
+        self.assertEqual([status for entry, status, duration_ms, checksum in results], [200, 304])
+        self.assertEqual(summary['product.views.ProductDetailView']['status_mismatches'], 0)
+        self.assertEqual(summary['product.views.ProductDetailView']['checksum_mismatches'], 0)
+
+    def test_read_capture_orders_rotated_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log = os.path.join(directory, 'traffic.jsonl')
+
+            with open(log, 'w') as f:
+                f.write(json.dumps({'timestamp':2}) + '\n')
+
+            with open(log + '.1', 'w') as f:
+                f.write(json.dumps({'timestamp':1}) + '\nnot json\n')
+
+            self.assertEqual(read_capture(log), [{'timestamp':1}, {'timestamp':2}])
@@ -1,7 +1,10 @@
 from django.urls import path, include
 
+from shockx.metrics import metrics_view
+
 urlpatterns = [
         path('product', include('product.urls')),
         path('order', include('order.urls')),
         path('user', include('user.urls')),
+        path('metrics', metrics_view),
 ]
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from user.models  import Portfolio
+from order.models import Ask
+
+ORDER_STATUS_HISTORY = 'history'
+VOLATILITY_DAYS      = 90
+
+def group_totals(labels, values):
+    names, index = np.unique(labels, return_inverse=True)
+    totals       = np.bincount(index, weights=values, minlength=len(names))
+    total        = totals.sum()
+    weights      = totals / total if total else np.zeros_like(totals)
+
+    return [{
+        'name'   : name,
+        'value'  : value,
+        'weight' : weight,
+        } for name, value, weight in zip(names.tolist(), np.round(totals, 2).tolist(), np.round(weights, 4).tolist())
+    ]
+
+def price_volatility(product_ids):
+    unique_ids, holding_index = np.unique(product_ids, return_inverse=True)
+
+    sales = list(Ask.objects.filter(
+        order_status__name           = ORDER_STATUS_HISTORY,
+        product_size__product_id__in = unique_ids.tolist(),
+        matched_at__gte              = datetime.now() - timedelta(days=VOLATILITY_DAYS)
+    ).values_list('product_size__product_id', 'price'))
+
+    sale_products, sale_prices = (np.array(column) for column in zip(*sales)) if sales else (np.array([]), np.array([]))
+    sale_index  = np.searchsorted(unique_ids, sale_products.astype(np.int64))
+    sale_prices = sale_prices.astype(np.float64)
+
+    counts  = np.bincount(sale_index, minlength=len(unique_ids))
+    sums    = np.bincount(sale_index, weights=sale_prices, minlength=len(unique_ids))
+    squares = np.bincount(sale_index, weights=sale_prices ** 2, minlength=len(unique_ids))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means    = sums / counts
+        std      = np.sqrt(np.maximum(squares / counts - means ** 2, 0))
+        relative = np.where(counts > 1, std / means, 0)
+
+    return np.nan_to_num(relative)[holding_index]
+
+def portfolio_analytics(user):
+    rows = list(Portfolio.objects.filter(user=user).values_list(
+        'product_size__product_id',
+        'product_size__product__name',
+        'product_size__size__name',
+        'purchase_price',
+        'product_size__product__market_value__average_price',
+    ))
+
+    if not rows:
+        return {
+            'total_purchase'     : 0,
+            'total_market_value' : 0,
+            'total_gain'         : 0,
+            'roi'                : 0,
+            'volatility'         : 0,
+            'holdings'           : [],
+            'allocation'         : {'product':[], 'size':[]},
+        }
+
+    product_ids, names, sizes, purchase_prices, market_values = zip(*rows)
+
+    product_ids     = np.array(product_ids, dtype=np.int64)
+    purchase_prices = np.array(purchase_prices, dtype=np.float64)
+    market_values   = np.array([value or 0 for value in market_values], dtype=np.float64)
+    gains           = market_values - purchase_prices
+    volatilities    = price_volatility(product_ids)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rois = np.nan_to_num(gains / purchase_prices * 100)
+
+    total_purchase = purchase_prices.sum()
+    total_market   = market_values.sum()
+
+    holdings = [{
+        'name'           : name,
+        'size'           : size,
+        'purchase_price' : purchase_price,
+        'market_value'   : market_value,
+        'gain'           : gain,
+        'roi'            : roi,
+        'volatility'     : volatility,
+        } for name, size, purchase_price, market_value, gain, roi, volatility in zip(
+            names,
+            sizes,
+            np.round(purchase_prices, 2).tolist(),
+            np.round(market_values, 2).tolist(),
+            np.round(gains, 2).tolist(),
+            np.round(rois, 2).tolist(),
+            np.round(volatilities, 4).tolist(),
+        )
+    ]
+
+    return {
+        'total_purchase'     : round(float(total_purchase), 2),
+        'total_market_value' : round(float(total_market), 2),
+        'total_gain'         : round(float(total_market - total_purchase), 2),
+        'roi'                : round(float((total_market - total_purchase) / total_purchase * 100), 2) if total_purchase else 0,
+        'volatility'         : round(float(np.average(volatilities, weights=market_values)), 4) if total_market else 0,
+        'holdings'           : holdings,
+        'allocation'         : {
+            'product' : group_totals(np.array(names), market_values),
+            'size'    : group_totals(np.array(sizes), market_values),
+        },
+    }
@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf       import settings
+from django.core.cache import cache
+
+from user.models    import User
+from shockx.metrics import record_cache
+
+USER_CACHE_FIELDS = ('id', 'email', 'name')
+
+local_user_cache = OrderedDict()
+local_user_lock  = threading.Lock()
+
+def user_cache_key(user_id):
+    return f'user:{user_id}'
+
+def build_user(fields):
+    return User.from_db('default', USER_CACHE_FIELDS, [fields[field] for field in USER_CACHE_FIELDS])
+
+def store_user(fields):
+    with local_user_lock:
+        local_user_cache[fields['id']] = (time.monotonic() + settings.USER_CACHE_TIMEOUT, fields)
+        local_user_cache.move_to_end(fields['id'])
+
+        while len(local_user_cache) > settings.USER_CACHE_MAX_SIZE:
+            local_user_cache.popitem(last=False)
+
+    if settings.USER_CACHE_SHARED:
+        cache.set(user_cache_key(fields['id']), fields, settings.USER_CACHE_TIMEOUT)
+
+def get_cached_user(user_id):
+    entry = local_user_cache.get(user_id)
+
+    if entry and entry[0] > time.monotonic():
+        record_cache('user', hits=1)
+
+        return build_user(entry[1])
+
+    fields = cache.get(user_cache_key(user_id)) if settings.USER_CACHE_SHARED else None
+
+    if fields is None:
+        record_cache('user', misses=1)
+
+        fields = User.objects.values(*USER_CACHE_FIELDS).get(id=user_id)
+
+    else:
+        record_cache('user', hits=1)
+
+    store_user(fields)
+
+    return build_user(fields)
+
+def get_user_by_email(email):
+    fields = User.objects.values(*USER_CACHE_FIELDS).get(email=email)
+
+    store_user(fields)
+
+    return build_user(fields)
+
+def invalidate_user(user_id):
+    with local_user_lock:
+        local_user_cache.pop(user_id, None)
+
+    if settings.USER_CACHE_SHARED:
+        cache.delete(user_cache_key(user_id))
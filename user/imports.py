@@ -0,0 +1,149 @@
+import calendar
+import codecs
+import csv
+import json
+import re
+from datetime import date
+from decimal  import Decimal, InvalidOperation
+
+from product.models import ProductSize
+
+IMPORT_READ_SIZE    = 64 * 1024
+IMPORT_ROW_MAX_SIZE = 4 * 1024
+IMPORT_FIELDS       = ('product_id', 'size_id', 'month', 'year', 'purchase_price')
+MAX_PRICE           = Decimal('1e8')
+WHITESPACE          = re.compile(r'\s*')
+
+JSON_ARRAY_START = 'array_start'
+JSON_FIRST_ROW   = 'first_row'
+JSON_NEXT_ROW    = 'next_row'
+JSON_SEPARATOR   = 'separator'
+
+class ImportFormatError(Exception):
+    pass
+
+def read_lines(stream):
+    for line in iter(lambda: stream.readline(IMPORT_ROW_MAX_SIZE + 1), b''):
+        if len(line) > IMPORT_ROW_MAX_SIZE:
+            raise ImportFormatError
+
+        yield line
+
+def iter_csv_rows(stream):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+
+    yield from csv.DictReader(decoder.decode(line) for line in read_lines(stream))
+
+def iter_json_rows(stream):
+    decoder = json.JSONDecoder()
+    text    = codecs.getincrementaldecoder('utf-8')()
+    buffer  = ''
+    state   = JSON_ARRAY_START
+
+    for chunk in iter(lambda: stream.read(IMPORT_READ_SIZE), b''):
+        buffer += text.decode(chunk)
+        index   = 0
+
+        while True:
+            index = WHITESPACE.match(buffer, index).end()
+
+            if index == len(buffer):
+                break
+
+            if state == JSON_ARRAY_START:
+                if buffer[index] != '[':
+                    raise ImportFormatError
+
+                state  = JSON_FIRST_ROW
+                index += 1
+                continue
+
+            if state == JSON_SEPARATOR:
+                if buffer[index] == ']':
+                    return
+
+                if buffer[index] != ',':
+                    raise ImportFormatError
+
+                state  = JSON_NEXT_ROW
+                index += 1
+                continue
+
+            if state == JSON_FIRST_ROW and buffer[index] == ']':
+                return
+
+            try:
+                row, end = decoder.raw_decode(buffer, index)
+
+            except ValueError:
+                break
+
+            if end == len(buffer):
+                break
+
+            if end - index > IMPORT_ROW_MAX_SIZE:
+                raise ImportFormatError
+
+            state = JSON_SEPARATOR
+            index = end
+
+            yield row
+
+        buffer = buffer[index:]
+
+        if len(buffer) > IMPORT_ROW_MAX_SIZE:
+            raise ImportFormatError
+
+    raise ImportFormatError
+
+def parse_integer(value):
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise ValueError
+
+    return int(value)
+
+def parse_row(row):
+    if not isinstance(row, dict) or not all(row.get(field) not in (None, '') for field in IMPORT_FIELDS):
+        raise KeyError
+
+    product_id     = parse_integer(row['product_id'])
+    size_id        = parse_integer(row['size_id'])
+    year           = parse_integer(row['year'])
+    month          = parse_integer(row['month'])
+    purchase_price = Decimal(str(row['purchase_price']))
+
+    if not purchase_price.is_finite() or not 0 < purchase_price < MAX_PRICE:
+        raise ValueError
+
+    purchase_date = date(year, month, calendar.monthrange(year, month)[1])
+
+    return (product_id, size_id), purchase_date, purchase_price
+
+def parse_rows(rows, max_rows):
+    parsed = []
+    errors = []
+
+    for number, row in enumerate(rows, start=1):
+        if number > max_rows:
+            raise OverflowError
+
+        try:
+            parsed.append((number,) + parse_row(row))
+
+        except KeyError:
+            errors.append({'row':number, 'message':'KEY_ERROR'})
+
+        except (ValueError, TypeError, InvalidOperation, calendar.IllegalMonthError):
+            errors.append({'row':number, 'message':'INVALID_VALUE'})
+
+    return parsed, errors
+
+def resolve_product_sizes(pairs):
+    product_ids = {product_id for product_id, size_id in pairs}
+    size_ids    = {size_id for product_id, size_id in pairs}
+
+    return {
+        (product_id, size_id) : product_size_id
+        for product_size_id, product_id, size_id in ProductSize.objects.filter(product_id__in=product_ids, size_id__in=size_ids)
+        .values_list('id', 'product_id', 'size_id')
+    }
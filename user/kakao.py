@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from asgiref.sync      import sync_to_async
+from django.conf       import settings
+from django.core.cache import cache
+
+class KakaoUnavailable(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout     = reset_timeout
+        self.lock              = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.failures  = 0
+            self.opened_at = None
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+
+            self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures  = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+def build_session():
+    adapter = HTTPAdapter(
+        pool_connections = 1,
+        pool_maxsize     = settings.KAKAO_POOL_SIZE,
+        max_retries      = Retry(
+            total            = settings.KAKAO_RETRIES,
+            backoff_factor   = 0.1,
+            status_forcelist = (502, 503, 504),
+            raise_on_status  = False
+        )
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+session = build_session()
+breaker = CircuitBreaker(settings.KAKAO_BREAKER_THRESHOLD, settings.KAKAO_BREAKER_RESET)
+
+def profile_cache_key(access_token):
+    return 'kakao_profile:' + hashlib.sha256(access_token.encode()).hexdigest()
+
+def get_cached_profile(access_token):
+    return cache.get(profile_cache_key(access_token))
+
+def cache_profile(access_token, status_code, profile):
+    if status_code == 200:
+        cache.set(profile_cache_key(access_token), profile, settings.KAKAO_PROFILE_CACHE_TIMEOUT)
+
+def record_response(status_code):
+    if status_code >= 500:
+        breaker.record_failure()
+        raise KakaoUnavailable
+
+    breaker.record_success()
+
+def get_kakao_profile(access_token):
+    profile = get_cached_profile(access_token)
+
+    if profile is not None:
+        return profile
+
+    if not breaker.allow():
+        raise KakaoUnavailable
+
+    try:
+        response = session.get(
+            settings.KAKAO_PROFILE_URL,
+            headers = {'Authorization' : f'Bearer {access_token}'},
+            timeout = (settings.KAKAO_CONNECT_TIMEOUT, settings.KAKAO_READ_TIMEOUT)
+        )
+
+    except requests.RequestException:
+        breaker.record_failure()
+        raise KakaoUnavailable
+
+    record_response(response.status_code)
+
+    try:
+        profile = response.json()
+
+    except ValueError:
+        raise KakaoUnavailable
+
+    cache_profile(access_token, response.status_code, profile)
+
+    return profile
+
+async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+
+    if loop not in async_clients:
+        async_clients[loop] = httpx.AsyncClient(
+            transport = httpx.AsyncHTTPTransport(retries=settings.KAKAO_RETRIES),
+            limits    = httpx.Limits(max_connections=settings.KAKAO_ASYNC_POOL_SIZE, max_keepalive_connections=settings.KAKAO_ASYNC_POOL_SIZE),
+            timeout   = httpx.Timeout(settings.KAKAO_READ_TIMEOUT, connect=settings.KAKAO_CONNECT_TIMEOUT)
+        )
+
+    return async_clients[loop]
+
+async def aget_kakao_profile(access_token):
+    profile = await sync_to_async(get_cached_profile)(access_token)
+
+    if profile is not None:
+        return profile
+
+    if not breaker.allow():
+        raise KakaoUnavailable
+
+    try:
+        response = await get_async_client().get(
+            settings.KAKAO_PROFILE_URL,
+            headers = {'Authorization' : f'Bearer {access_token}'}
+        )
+
+    except httpx.HTTPError:
+        breaker.record_failure()
+        raise KakaoUnavailable
+
+    record_response(response.status_code)
+
+    try:
+        profile = response.json()
+
+    except ValueError:
+        raise KakaoUnavailable
+
+    await sync_to_async(cache_profile)(access_token, response.status_code, profile)
+
+    return profile
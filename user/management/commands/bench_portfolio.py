@@ -0,0 +1,124 @@
+import random
+import time
+from datetime import datetime, timedelta
+from decimal  import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db                   import connection
+from django.db.models            import Avg, Case, When
+from django.test.utils           import setup_test_environment, teardown_test_environment
+
+from user.models       import User, ShippingInformation, Portfolio
+from product.models    import Product, Size, ProductSize
+from order.models      import Ask, OrderStatus
+from product.market    import refresh_market_values
+from shockx.benchmarks import isolated_caches
+
+ORDER_STATUS_HISTORY = 'history'
+BULK_SIZE            = 5000
+
+class Command(BaseCommand):
+    help = 'Compare the legacy portfolio Avg annotation with the market value summary join on a seeded test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trades', type=int, default=100000)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--sizes', type=int, default=10)
+        parser.add_argument('--portfolio', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def seed(self, options):
+        rng      = random.Random(options['seed'])
+        user     = User.objects.create(email='bench@shockx.com', name='bench')
+        shipping = ShippingInformation.objects.create(
+            name='bench', country='Korea', primary_address='Gangnam-gu', city='Seoul', postal_code='0', phone_number='0', user=user
+        )
+        status   = OrderStatus.objects.create(name=ORDER_STATUS_HISTORY)
+
+        Product.objects.bulk_create([
+            Product(
+                name          = f'product {index}',
+                model_number  = f'M{index}',
+                ticker_number = f'T{index}',
+                color         = 'black',
+                description   = 'benchmark',
+                retail_price  = 200,
+                release_date  = datetime(2020, 1, 1)
+            ) for index in range(options['products'])
+        ])
+        Size.objects.bulk_create([Size(name=str(220 + index * 5)) for index in range(options['sizes'])])
+        ProductSize.objects.bulk_create([
+            ProductSize(product_id=product_id, size_id=size_id)
+            for product_id in Product.objects.values_list('id', flat=True)
+            for size_id in Size.objects.values_list('id', flat=True)
+        ])
+
+        product_size_ids = list(ProductSize.objects.values_list('id', flat=True))
+        matched_at       = datetime(2021, 1, 1)
+
+        for start in range(0, options['trades'], BULK_SIZE):
+            Ask.objects.bulk_create([
+                Ask(
+                    user                 = user,
+                    product_size_id      = rng.choice(product_size_ids),
+                    price                = Decimal(rng.randint(150, 600)),
+                    order_status         = status,
+                    matched_at           = matched_at + timedelta(minutes=index),
+                    shipping_information = shipping
+                ) for index in range(start, min(start + BULK_SIZE, options['trades']))
+            ])
+
+        Portfolio.objects.bulk_create([
+            Portfolio(user=user, product_size_id=product_size_id, purchase_date=matched_at, purchase_price=200)
+            for product_size_id in rng.sample(product_size_ids, min(options['portfolio'], len(product_size_ids)))
+        ])
+
+        for product_size_id in product_size_ids:
+            refresh_market_values(product_size_id)
+
+        return user
+
+    def legacy_query(self, user):
+        return list(Portfolio.objects.select_related('product_size', 'product_size__product', 'product_size__size')
+            .filter(user=user)
+            .annotate(total_avg=Avg(
+                Case(
+                    When(
+                        product_size__product__productsize__ask__order_status__name=ORDER_STATUS_HISTORY,
+                        then='product_size__product__productsize__ask__price'
+                    )
+                )
+            )))
+
+    def summary_query(self, user):
+        return list(Portfolio.objects.select_related('product_size__product__market_value', 'product_size__size').filter(user=user))
+
+    def measure(self, query, user, repeat):
+        timings = []
+
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query(user)
+            timings.append(time.perf_counter() - started)
+
+        return min(timings)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            with isolated_caches():
+                started = time.perf_counter()
+                user    = self.seed(options)
+                self.stdout.write(f'seeded {options["trades"]} trades in {time.perf_counter() - started:.1f}s')
+
+                for name, query in (('legacy annotate', self.legacy_query), ('summary join', self.summary_query)):
+                    elapsed = self.measure(query, user, options['repeat'])
+                    self.stdout.write(f'{name:<16} {elapsed * 1000:10.2f} ms')
+
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
@@ -0,0 +1,18 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand
+
+from user.snapshots import snapshot_portfolios
+
+class Command(BaseCommand):
+    help = 'Store one portfolio valuation per user for the given day, recomputing only changed users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(), default=None)
+
+    def handle(self, *args, **options):
+        snapshot_date = options['date'] or date.today()
+
+        recomputed, carried = snapshot_portfolios(snapshot_date)
+
+        self.stdout.write(f'{snapshot_date}: recomputed {recomputed} users, carried over {carried} users')
@@ -0,0 +1,35 @@
+# Generated by Django 3.1.6 on 2026-10-19 22:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_auto_20210311_1627'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolio',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('market_value', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('purchase_value', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('item_count', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='user.user')),
+            ],
+            options={
+                'db_table': 'portfolio_snapshots',
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.6 on 2026-10-19 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_portfolio_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='valued_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
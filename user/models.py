@@ -30,6 +30,20 @@ class Portfolio(models.Model):
     product_size   = models.ForeignKey('product.ProductSize', on_delete=models.CASCADE)
     purchase_date  = models.DateField()
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at     = models.DateTimeField(auto_now=True, null=True)
 
     class Meta:
         db_table = 'portfolios'
+
+class PortfolioSnapshot(models.Model):
+    user           = models.ForeignKey('User', on_delete=models.CASCADE)
+    date           = models.DateField()
+    market_value   = models.DecimalField(max_digits=12, decimal_places=2)
+    purchase_value = models.DecimalField(max_digits=12, decimal_places=2)
+    item_count     = models.IntegerField()
+    valued_at      = models.DateTimeField(null=True)
+    created_at     = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table        = 'portfolio_snapshots'
+        unique_together = [('user', 'date')]
@@ -0,0 +1,13 @@
+from django.db                import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch          import receiver
+
+from user.models import User
+from user.cache  import invalidate_user
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    user_id = instance.id
+
+    invalidate_user(user_id)
+    transaction.on_commit(lambda: invalidate_user(user_id))
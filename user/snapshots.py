@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from django.utils               import timezone
+from django.db                  import transaction
+from django.db.models           import Sum, Count, Max, Value, DecimalField
+from django.db.models.functions import Coalesce
+
+from user.models import Portfolio, PortfolioSnapshot
+
+SNAPSHOT_BULK_SIZE = 1000
+
+def changed_user_ids(previous_date):
+    holdings = dict(Portfolio.objects.values_list('user_id').annotate(item_count=Count('id')).order_by())
+
+    if not previous_date:
+        return set(holdings), holdings
+
+    previous_snapshots = PortfolioSnapshot.objects.filter(date=previous_date)
+    last_run_at        = previous_snapshots.aggregate(last_run_at=Coalesce(Max('valued_at'), Max('created_at')))['last_run_at']
+    previous_counts    = dict(previous_snapshots.values_list('user_id', 'item_count'))
+
+    user_ids = {
+        user_id for user_id in holdings.keys() | previous_counts.keys()
+        if holdings.get(user_id, 0) != previous_counts.get(user_id, 0)
+    }
+    user_ids.update(Portfolio.objects.filter(updated_at__gt=last_run_at).values_list('user_id', flat=True))
+    user_ids.update(
+        Portfolio.objects.filter(product_size__product__market_value__updated_at__gt=last_run_at)
+        .values_list('user_id', flat=True)
+    )
+
+    return user_ids, holdings
+
+def value_portfolios(user_ids):
+    zero = Value(Decimal(0), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+    return {
+        row['user_id'] : row for row in Portfolio.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(
+            market_value   = Coalesce(Sum('product_size__product__market_value__average_price'), zero),
+            purchase_value = Sum('purchase_price'),
+            item_count     = Count('id'),
+        ).order_by()
+    }
+
+def snapshot_portfolios(date):
+    valued_at     = timezone.now()
+    previous_date = PortfolioSnapshot.objects.filter(date__lt=date).aggregate(date=Max('date'))['date']
+
+    user_ids, holdings = changed_user_ids(previous_date)
+    valuations         = value_portfolios(user_ids)
+
+    snapshots = [
+        PortfolioSnapshot(
+            user_id        = user_id,
+            date           = date,
+            market_value   = valuations[user_id]['market_value'],
+            purchase_value = valuations[user_id]['purchase_value'],
+            item_count     = valuations[user_id]['item_count'],
+            valued_at      = valued_at,
+        ) for user_id in user_ids if user_id in valuations
+    ]
+
+    snapshots += [
+        PortfolioSnapshot(
+            user_id        = user_id,
+            date           = date,
+            market_value   = 0,
+            purchase_value = 0,
+            item_count     = 0,
+            valued_at      = valued_at,
+        ) for user_id in user_ids if user_id not in valuations
+    ]
+
+    carried = PortfolioSnapshot.objects.filter(date=previous_date, user_id__in=holdings.keys()).exclude(user_id__in=user_ids)
+
+    snapshots += [
+        PortfolioSnapshot(
+            user_id        = snapshot.user_id,
+            date           = date,
+            market_value   = snapshot.market_value,
+            purchase_value = snapshot.purchase_value,
+            item_count     = snapshot.item_count,
+            valued_at      = valued_at,
+        ) for snapshot in carried.iterator()
+    ]
+
+    with transaction.atomic():
+        PortfolioSnapshot.objects.filter(date=date).delete()
+        PortfolioSnapshot.objects.bulk_create(snapshots, batch_size=SNAPSHOT_BULK_SIZE)
+
+    return len(user_ids), len(snapshots) - len(user_ids)
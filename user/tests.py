@@ -1,15 +1,23 @@
 import json
 import jwt
 import bcrypt
-from datetime import datetime
+import threading
+from datetime    import datetime, date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-from django.test   import TestCase, Client
-from unittest.mock import patch, MagicMock
+from django.test       import TestCase, Client, RequestFactory, override_settings
+from django.core.cache import cache
+from unittest.mock     import patch, MagicMock
 
-from user.models    import User, ShippingInformation, Portfolio
+from user.models    import User, ShippingInformation, Portfolio, PortfolioSnapshot
+from user.snapshots import snapshot_portfolios, value_portfolios
+from user.cache     import get_cached_user, local_user_cache
 from product.models import Product, Size, ProductSize, Image
 from order.models   import Bid, Ask, Order, OrderStatus
 from my_settings    import SECRET_KEY, ALGORITHM
+from user           import kakao
+from shockx.testing import QueryBudgetTestMixin
+from utils          import login_decorator
 
 ORDER_STATUS_CURRENT = 'current'
 ORDER_STATUS_PENDING = 'pending' 
@@ -17,7 +25,7 @@ ORDER_STATUS_HISTORY = 'history'
 
 client = Client()
 
-class PortfolioTest(TestCase):
+class PortfolioTest(QueryBudgetTestMixin, TestCase):
     @classmethod
     def setUpTestData(cls):
         user = User.objects.create(
@@ -129,6 +137,276 @@ class PortfolioTest(TestCase):
         )
         self.assertEqual(response.status_code, 200)
 
+    def test_portfolio_get_query_budget(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        response = client.get('/user/portfolio', **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_portfolio_get_cached_user_success(self):
+        user    = User.objects.get(email='shockx@wecode.com')
+        headers = {'HTTP_Authorization':jwt.encode({'id':user.id, 'email':user.email}, SECRET_KEY, algorithm=ALGORITHM)}
+
+        client.get('/user/portfolio', **headers)
+
+        with self.assertNumQueries(1):
+            response = client.get('/user/portfolio', **headers)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_portfolio_get_cached_user_invalidated(self):
+        user    = User.objects.get(email='shockx@wecode.com')
+        headers = {'HTTP_Authorization':jwt.encode({'id':user.id, 'email':user.email}, SECRET_KEY, algorithm=ALGORITHM)}
+
+        client.get('/user/portfolio', **headers)
+
+        user.email = 'changed@wecode.com'
+        user.save()
+
+        response = client.get('/user/portfolio', **headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_USER'})
+
+    @override_settings(USER_CACHE_MAX_SIZE=1)
+    def test_local_user_cache_bounded(self):
+        user  = User.objects.get(email='shockx@wecode.com')
+        other = User.objects.create(email='other@wecode.com', name='other')
+
+        get_cached_user(user.id)
+        get_cached_user(other.id)
+
+        self.assertEqual(list(local_user_cache), [other.id])
+
+    def test_view_key_error_not_invalid_token(self):
+        user    = User.objects.get(email='shockx@wecode.com')
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=jwt.encode({'id':user.id, 'email':user.email}, SECRET_KEY, algorithm=ALGORITHM))
+
+        @login_decorator
+        def view(self, request):
+            raise KeyError('missing')
+
+        with self.assertRaises(KeyError):
+            view(None, request)
+
+    def test_portfolio_get_market_value_follows_sales(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        Ask.objects.create(
+            product_size         = ProductSize.objects.get(product=self.product, size=self.size),
+            price                = 450.00,
+            user                 = User.objects.get(email='shockx@wecode.com'),
+            expiration_date      = '2020-06-15',
+            order_status         = self.order_status_history,
+            shipping_information = ShippingInformation.objects.get(name='shock')
+        )
+
+        with self.assertNumQueries(2):
+            response = client.get('/user/portfolio', **headers)
+
+        self.assertEqual(response.json()['portfolio'][0]['market_value'], 250)
+        self.assertEqual(response.status_code, 200)
+
+    def test_portfolio_history_get_success(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        snapshot_portfolios(date.today())
+
+        response = client.get('/user/portfolio/history', **headers)
+
+        self.assertEqual(response.json(),
+            {
+                'history': [
+                    {
+                        'date'           : date.today().strftime('%Y/%m/%d'),
+                        'market_value'   : 150,
+                        'purchase_value' : 500
+                    }
+                ]
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_portfolio_history_days_clamped(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        snapshot_portfolios(date.today())
+
+        response = client.get('/user/portfolio/history', {'days':'100000000'}, **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['history']), 1)
+
+    def test_portfolio_history_days_invalid_value(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        for days in ('0', '-5', 'abc'):
+            response = client.get('/user/portfolio/history', {'days':days}, **headers)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'message':'INVALID_VALUE'})
+
+    def test_portfolio_snapshot_recomputes_changed_users_only(self):
+        yesterday = date.today() - timedelta(days=1)
+
+        self.assertEqual(snapshot_portfolios(yesterday), (1, 0))
+        self.assertEqual(snapshot_portfolios(date.today()), (0, 1))
+
+        Ask.objects.create(
+            product_size         = ProductSize.objects.get(product=self.product, size=self.size),
+            price                = 450.00,
+            user                 = User.objects.get(email='shockx@wecode.com'),
+            expiration_date      = '2020-06-15',
+            order_status         = self.order_status_history,
+            shipping_information = ShippingInformation.objects.get(name='shock')
+        )
+
+        self.assertEqual(snapshot_portfolios(date.today()), (1, 0))
+        self.assertEqual(PortfolioSnapshot.objects.get(date=date.today()).market_value, 250)
+
+    def test_portfolio_snapshot_zero_when_holdings_removed(self):
+        headers   = {'HTTP_Authorization':self.token}
+        yesterday = date.today() - timedelta(days=1)
+
+        snapshot_portfolios(yesterday)
+        Portfolio.objects.all().delete()
+
+        self.assertEqual(snapshot_portfolios(date.today()), (1, 0))
+
+        history = client.get('/user/portfolio/history', **headers).json()['history']
+
+        self.assertEqual([row['market_value'] for row in history], [150, 0])
+        self.assertEqual(history[-1]['purchase_value'], 0)
+
+    def test_portfolio_snapshot_sees_changes_made_during_run(self):
+        yesterday = date.today() - timedelta(days=1)
+
+        def value_then_change(user_ids):
+            valuations = value_portfolios(user_ids)
+            Portfolio.objects.get().save()
+
+            return valuations
+
+        with patch('user.snapshots.value_portfolios', value_then_change):
+            snapshot_portfolios(yesterday)
+
+        self.assertEqual(snapshot_portfolios(date.today()), (1, 0))
+
+    def test_portfolio_import_csv_success(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        body = (
+            'product_id,size_id,month,year,purchase_price\n'
+            '1,1,10,2020,150\n'
+            '1,1,13,2020,150\n'
+            '1,9,10,2020,150\n'
+            '1,1,,2020,150\n'
+        )
+
+        with self.assertNumQueries(5):
+            response = client.post('/user/portfolio/import', body, content_type='text/csv', **headers)
+
+        self.assertEqual(response.json(),
+            {
+                'created' : 1,
+                'errors'  : [
+                    {'row':2, 'message':'INVALID_VALUE'},
+                    {'row':3, 'message':'PRODUCT_SIZE_DOES_NOT_EXIST'},
+                    {'row':4, 'message':'KEY_ERROR'}
+                ]
+            }
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Portfolio.objects.filter(purchase_date='2020-10-31').count(), 1)
+
+    @patch('user.imports.IMPORT_READ_SIZE', 7)
+    def test_portfolio_import_json_success(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        data = [{
+            'product_id'     : 1,
+            'size_id'        : 1,
+            'month'          : str(month),
+            'year'           : '2019',
+            'purchase_price' : '150'
+            } for month in range(1, 13)
+        ]
+
+        response = client.post('/user/portfolio/import', json.dumps(data), content_type='application/json', **headers)
+
+        self.assertEqual(response.json(), {'created':12, 'errors':[]})
+        self.assertEqual(response.status_code, 201)
+
+    def test_portfolio_import_invalid_format(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        response = client.post('/user/portfolio/import', '{"product_id": 1}', content_type='application/json', **headers)
+
+        self.assertEqual(response.json(), {'message':'INVALID_FORMAT'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_portfolio_import_json_missing_separator(self):
+        headers = {'HTTP_Authorization':self.token}
+        row     = json.dumps({'product_id':1, 'size_id':1, 'month':'1', 'year':'2019', 'purchase_price':'150'})
+
+        response = client.post('/user/portfolio/import', f'[{row} {row}]', content_type='application/json', **headers)
+
+        self.assertEqual(response.json(), {'message':'INVALID_FORMAT'})
+        self.assertEqual(response.status_code, 400)
+
+    @patch('user.imports.IMPORT_READ_SIZE', 16)
+    @patch('user.imports.IMPORT_ROW_MAX_SIZE', 64)
+    def test_portfolio_import_json_row_too_large(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        response = client.post('/user/portfolio/import', '[{"product_id": "' + '1' * 1000, content_type='application/json', **headers)
+
+        self.assertEqual(response.json(), {'message':'INVALID_FORMAT'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_portfolio_import_json_fractional_id(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        data = [
+            {'product_id':1, 'size_id':1, 'month':1, 'year':2019, 'purchase_price':150},
+            {'product_id':1.5, 'size_id':1, 'month':1, 'year':2019, 'purchase_price':150},
+        ]
+
+        response = client.post('/user/portfolio/import', json.dumps(data), content_type='application/json', **headers)
+
+        self.assertEqual(response.json(), {'created':1, 'errors':[{'row':2, 'message':'INVALID_VALUE'}]})
+        self.assertEqual(response.status_code, 201)
+
+    def test_portfolio_analytics_get_success(self):
+        headers = {'HTTP_Authorization':self.token}
+
+        sale_status = self.order_status_history
+        user        = User.objects.get(email='shockx@wecode.com')
+        shipping    = ShippingInformation.objects.get(name='shock')
+
+        for price in (100, 300):
+            Ask.objects.create(
+                product_size         = ProductSize.objects.get(product=self.product, size=self.size),
+                price                = price,
+                user                 = user,
+                matched_at           = datetime.now(),
+                order_status         = sale_status,
+                shipping_information = shipping
+            )
+
+        response  = client.get('/user/portfolio/analytics', **headers)
+        analytics = response.json()['analytics']
+
+        self.assertEqual(analytics['total_purchase'], 500)
+        self.assertEqual(analytics['total_market_value'], 175)
+        self.assertEqual(analytics['total_gain'], -325)
+        self.assertEqual(analytics['roi'], -65)
+        self.assertEqual(analytics['holdings'][0]['volatility'], 0.5)
+        self.assertEqual(analytics['allocation']['size'], [{'name':'1', 'value':175, 'weight':1}])
+        self.assertEqual(response.status_code, 200)
+
     def test_portfolio_post_success(self):
         headers = {'HTTP_Authorization':self.token}
         
@@ -271,8 +549,49 @@ class PortfolioTest(TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json(), {'message':'PRODUCT_SIZE_DOES_NOT_EXIST'})
 
+class KakaoStubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits += 1
+
+        access_token = self.headers.get('Authorization', '')[len('Bearer '):]
+        status, body = self.server.profiles.get(access_token, (401, {'msg':'this access token does not exist', 'code':-401}))
+        content      = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+class KakaoStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), KakaoStubHandler)
+        self.hits     = 0
+        self.profiles = {}
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/v2/user/me'
+
 class SocialLoginTest(TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.kakao = KakaoStubServer()
+        threading.Thread(target=cls.kakao.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.kakao.shutdown()
+        cls.kakao.server_close()
+        super().tearDownClass()
+
     @classmethod
     def setUpTestData(cls):
         User.objects.create(
@@ -280,60 +599,159 @@ class SocialLoginTest(TestCase):
             name = 'binoooo',
         )
 
-    @patch('user.views.requests')
-    def test_signup_post_pass(self, mock_requests):  
+    def setUp(self):
+        cache.clear()
+        kakao.breaker.reset()
+        self.kakao.hits     = 0
+        self.kakao.profiles = {}
+        self.settings_override = override_settings(KAKAO_PROFILE_URL=self.kakao.url)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+
+    def test_signup_post_pass(self):  
         client = Client()
 
-        class MockedResponse:
-            def json(self):
-                return {
-                    'kakao_account' : {
-                        'email' : 'binoooo@gmail.com',
-                        'profile' : {'nickname' : 'binoooo'}
-                    }
-                }
+        self.kakao.profiles['fake_token'] = (200, {
+            'kakao_account' : {
+                'email' : 'binoooo@gmail.com',
+                'profile' : {'nickname' : 'binoooo'}
+            }
+        })
 
-        mock_requests.get = MagicMock(return_value = MockedResponse())
         headers = {'HTTP_Authorization': 'fake_token'}
         response = client.post('/user/kakao', content_type='applications/json', **headers)
 
         self.assertEqual(response.status_code, 200)
 
-    @patch('user.views.requests')
-    def test_signin_post_pass(self, mock_requests):  
+    def test_signin_post_pass(self):  
         client = Client()
 
-        class MockedResponse:
-            def json(self):
-                return {
-                    'kakao_account' : {
-                        'email' : 'binooooo@gmail.com',
-                        'profile' : {'nickname' : 'binooooo'}
-                    }
-                }
+        self.kakao.profiles['fake_token'] = (200, {
+            'kakao_account' : {
+                'email' : 'binooooo@gmail.com',
+                'profile' : {'nickname' : 'binooooo'}
+            }
+        })
 
-        mock_requests.get = MagicMock(return_value = MockedResponse())
         headers = {'HTTP_Authorization': 'fake_token'}
         response = client.post('/user/kakao', content_type='applications/json', **headers)
 
         self.assertEqual(response.status_code, 201)
 
-    @patch('user.views.requests')
-    def test_signup_email_key_error(self, mock_requests):  
+    def test_signin_concurrent_signup_keeps_one_user(self):
         client = Client()
 
-        class MockedResponse:
-            def json(self):
-                return {
-                    'kakao' : {
-                        'email' : 'binoooo@gmail.com',
-                        'profile' : {'nickname' : 'binoooo'}
-                    }
-                }
+        self.kakao.profiles['fake_token'] = (200, {
+            'kakao_account' : {
+                'email' : 'binoooo@gmail.com',
+                'profile' : {'nickname' : 'racer'}
+            }
+        })
+
+        headers = {'HTTP_Authorization': 'fake_token'}
+
+        with patch('django.db.models.query.QuerySet.first', return_value=None):
+            response = client.post('/user/kakao', content_type='applications/json', **headers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['user_name'], 'binoooo')
+        self.assertEqual(User.objects.filter(email='binoooo@gmail.com').count(), 1)
+
+    def test_signup_email_key_error(self):  
+        client = Client()
+
+        self.kakao.profiles['fake_token'] = (200, {
+            'kakao' : {
+                'email' : 'binoooo@gmail.com',
+                'profile' : {'nickname' : 'binoooo'}
+            }
+        })
 
-        mock_requests.get = MagicMock(return_value = MockedResponse())
         headers = {'HTTP_Authorization': 'fake_token'}
         response = client.post('/user/kakao', content_type='applications/json', **headers)
 
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json(), {'message': 'KEY_ERROR'})
+
+    def test_signin_profile_cached(self):
+        client = Client()
+
+        self.kakao.profiles['fake_token'] = (200, {
+            'kakao_account' : {
+                'email' : 'binoooo@gmail.com',
+                'profile' : {'nickname' : 'binoooo'}
+            }
+        })
+
+        headers = {'HTTP_Authorization': 'fake_token'}
+        client.post('/user/kakao', content_type='applications/json', **headers)
+        response = client.post('/user/kakao', content_type='applications/json', **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.kakao.hits, 1)
+
+    def test_signin_circuit_breaker_open(self):
+        client = Client()
+
+        self.kakao.profiles['fake_token'] = (503, {'msg':'unavailable'})
+
+        headers   = {'HTTP_Authorization': 'fake_token'}
+        responses = [client.post('/user/kakao', content_type='applications/json', **headers) for _ in range(kakao.breaker.failure_threshold)]
+        hits      = self.kakao.hits
+        response  = client.post('/user/kakao', content_type='applications/json', **headers)
+
+        self.assertEqual({response.status_code for response in responses}, {503})
+        self.assertEqual(response.json(), {'message': 'KAKAO_UNAVAILABLE'})
+        self.assertEqual(self.kakao.hits, hits)
+
+    def test_async_signup_post_pass(self):
+        client = Client()
+
+        self.kakao.profiles['fake_token'] = (200, {
+            'kakao_account' : {
+                'email' : 'binoooo@gmail.com',
+                'profile' : {'nickname' : 'binoooo'}
+            }
+        })
+
+        headers = {'HTTP_Authorization': 'fake_token'}
+        response = client.post('/user/kakao/async', content_type='applications/json', **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user_name'], 'binoooo')
+
+    def test_async_signin_post_pass(self):
+        client = Client()
+
+        self.kakao.profiles['fake_token'] = (200, {
+            'kakao_account' : {
+                'email' : 'binooooo@gmail.com',
+                'profile' : {'nickname' : 'binooooo'}
+            }
+        })
+
+        headers = {'HTTP_Authorization': 'fake_token'}
+        response = client.post('/user/kakao/async', content_type='applications/json', **headers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(User.objects.filter(email='binooooo@gmail.com').count(), 1)
+
+    def test_async_signin_unavailable(self):
+        client = Client()
+
+        self.kakao.profiles['fake_token'] = (503, {'msg':'unavailable'})
+
+        headers = {'HTTP_Authorization': 'fake_token'}
+        response = client.post('/user/kakao/async', content_type='applications/json', **headers)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'message': 'KAKAO_UNAVAILABLE'})
+
+    def test_async_signin_method_not_allowed(self):
+        client = Client()
+
+        response = client.get('/user/kakao/async')
+
+        self.assertEqual(response.status_code, 405)
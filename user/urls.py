@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import PortfolioView, KakaoSocialLogin
+from .views import PortfolioView, PortfolioAnalyticsView, PortfolioHistoryView, PortfolioImportView, KakaoSocialLogin, kakao_social_login_async
 
 urlpatterns = [
         path('/kakao', KakaoSocialLogin.as_view()),        
+        path('/kakao/async', kakao_social_login_async),
         path('/portfolio', PortfolioView.as_view()),
+        path('/portfolio/history', PortfolioHistoryView.as_view()),
+        path('/portfolio/import', PortfolioImportView.as_view()),
+        path('/portfolio/analytics', PortfolioAnalyticsView.as_view()),
 ]
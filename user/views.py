@@ -1,46 +1,56 @@
+import csv
 import json
 import calendar
 import jwt
-import requests
-from datetime         import datetime
+from datetime         import datetime, date, timedelta
 
-from django.http      import JsonResponse
-from django.views     import View
-from django.db.models import Avg, Case, When
+from asgiref.sync           import sync_to_async
+from django.http            import HttpResponseNotAllowed
+from django.views           import View
+from django.db              import transaction
+from django.core.exceptions import ObjectDoesNotExist
 
 from product.models   import ProductSize
-from .models          import User, ShippingInformation, Portfolio
+from .models          import User, ShippingInformation, Portfolio, PortfolioSnapshot
 from my_settings      import ALGORITHM, SECRET_KEY
-from utils            import login_decorator
+from utils            import login_decorator, FastJsonResponse
+from .analytics       import portfolio_analytics
+from .kakao           import get_kakao_profile, aget_kakao_profile, KakaoUnavailable
+from .imports         import iter_csv_rows, iter_json_rows, parse_rows, resolve_product_sizes, ImportFormatError
 
-ORDER_STATUS_HISTORY = 'history'
+ORDER_STATUS_HISTORY       = 'history'
+PORTFOLIO_HISTORY_DAYS     = 90
+PORTFOLIO_HISTORY_MAX_DAYS = 3650
+PORTFOLIO_IMPORT_ROWS      = 5000
+PORTFOLIO_IMPORT_BATCH     = 500
+
+def market_value(product):
+    try:
+        return int(product.market_value.average_price or 0)
+
+    except ObjectDoesNotExist:
+        return 0
 
 class PortfolioView(View):
+    query_budget = {'GET':2, 'POST':4}
+
     @login_decorator
     def get(self, request):
         user = request.user
 
-        portfolios = Portfolio.objects.select_related('product_size', 'product_size__product', 'product_size__size')\
-            .filter(user=user)\
-            .annotate(total_avg=Avg(
-                Case(
-                    When(
-                        product_size__product__productsize__ask__order_status__name=ORDER_STATUS_HISTORY,
-                        then='product_size__product__productsize__ask__price'
-                    )
-                )
-            ))
+        portfolios = Portfolio.objects.select_related('product_size__product__market_value', 'product_size__size')\
+            .filter(user=user)
 
         portfolio_products = [{
             'name'           : portfolio.product_size.product.name,
             'size'           : portfolio.product_size.size.name,
             'purchase_date'  : portfolio.purchase_date.strftime('%Y/%m/%d'),
             'purchase_price' : int(portfolio.purchase_price),
-            'market_value'   : int(portfolio.total_avg),
+            'market_value'   : market_value(portfolio.product_size.product),
             } for portfolio in portfolios
         ]
 
-        return JsonResponse({'portfolio':portfolio_products}, status=200)
+        return FastJsonResponse({'portfolio':portfolio_products}, status=200)
 
     @login_decorator
     def post(self, request):
@@ -54,10 +64,10 @@ class PortfolioView(View):
         purchase_price = data.get('purchase_price', None)
        
         if not (product_id and size_id and purchase_month and purchase_year and purchase_price):
-            return JsonResponse({'message':'KEY_ERROR'}, status=400)
+            return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
         
         if not ProductSize.objects.filter(product_id=product_id, size_id=size_id).exists():
-            return JsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
+            return FastJsonResponse({'message':'PRODUCT_SIZE_DOES_NOT_EXIST'}, status=404)
 
         product_size = ProductSize.objects.get(product_id=product_id, size_id=size_id)
         last_day     = calendar.monthrange(int(purchase_year), int(purchase_month))[1]
@@ -69,31 +79,133 @@ class PortfolioView(View):
             purchase_price = purchase_price
         )
 
-        return JsonResponse({'message':'SUCCESS'}, status=201)
+        return FastJsonResponse({'message':'SUCCESS'}, status=201)
+
+class PortfolioImportView(View):
+    query_budget = 5
+
+    @login_decorator
+    def post(self, request):
+        user = request.user
+
+        if request.content_type == 'text/csv':
+            rows = iter_csv_rows(request)
+        elif request.content_type == 'application/json':
+            rows = iter_json_rows(request)
+        else:
+            return FastJsonResponse({'message':'UNSUPPORTED_CONTENT_TYPE'}, status=415)
+
+        try:
+            parsed, errors = parse_rows(rows, PORTFOLIO_IMPORT_ROWS)
+
+        except (ImportFormatError, UnicodeDecodeError, csv.Error):
+            return FastJsonResponse({'message':'INVALID_FORMAT'}, status=400)
+
+        except OverflowError:
+            return FastJsonResponse({'message':'TOO_MANY_ROWS'}, status=400)
+
+        product_sizes = resolve_product_sizes({pair for number, pair, purchase_date, purchase_price in parsed})
+        portfolios    = []
+
+        for number, pair, purchase_date, purchase_price in parsed:
+            if pair not in product_sizes:
+                errors.append({'row':number, 'message':'PRODUCT_SIZE_DOES_NOT_EXIST'})
+                continue
+
+            portfolios.append(Portfolio(
+                user            = user,
+                product_size_id = product_sizes[pair],
+                purchase_date   = purchase_date,
+                purchase_price  = purchase_price
+            ))
+
+        with transaction.atomic():
+            Portfolio.objects.bulk_create(portfolios, batch_size=PORTFOLIO_IMPORT_BATCH)
+
+        return FastJsonResponse({
+            'created' : len(portfolios),
+            'errors'  : sorted(errors, key=lambda error: error['row'])
+        }, status=201 if portfolios else 400)
+
+class PortfolioAnalyticsView(View):
+    query_budget = 3
+
+    @login_decorator
+    def get(self, request):
+        return FastJsonResponse({'analytics':portfolio_analytics(request.user)}, status=200)
+
+class PortfolioHistoryView(View):
+    query_budget = 2
+
+    @login_decorator
+    def get(self, request):
+        try:
+            days = int(request.GET.get('days', PORTFOLIO_HISTORY_DAYS))
+
+            if days <= 0:
+                raise ValueError
+
+        except ValueError:
+            return FastJsonResponse({'message':'INVALID_VALUE'}, status=400)
+
+        days = min(days, PORTFOLIO_HISTORY_MAX_DAYS)
+
+        snapshots = PortfolioSnapshot.objects.filter(user=request.user, date__gt=date.today() - timedelta(days=days))\
+            .order_by('date')\
+            .values_list('date', 'market_value', 'purchase_value')
+
+        history = [{
+            'date'           : snapshot_date.strftime('%Y/%m/%d'),
+            'market_value'   : int(market_value),
+            'purchase_value' : int(purchase_value),
+            } for snapshot_date, market_value, purchase_value in snapshots
+        ]
+
+        return FastJsonResponse({'history':history}, status=200)
+
+def provision_user(kakao_account):
+    email     = kakao_account['email']
+    user_info = User.objects.filter(email=email).first()
+    created   = user_info is None
+
+    if created:
+        User.objects.bulk_create([User(email=email, name=kakao_account['profile']['nickname'])], ignore_conflicts=True)
+        user_info = User.objects.get(email=email)
+
+    access_token = jwt.encode({'id':user_info.id, 'email':user_info.email}, SECRET_KEY, algorithm=ALGORITHM)
+
+    return FastJsonResponse({'user_name':user_info.name, 'access_token':access_token}, status=201 if created else 200)
 
 class KakaoSocialLogin(View):
+    query_budget = 4
+
     def post(self, request):
         try:
             access_token = request.headers['Authorization']
-            headers      = ({'Authorization' : f'Bearer {access_token}'})
-            url          = 'https://kapi.kakao.com/v2/user/me'
-            response     = requests.get(url, headers=headers)
-            user         = response.json()
+            user         = get_kakao_profile(access_token)
 
-            if User.objects.filter(email=user['kakao_account']['email']).exists(): 
-                user_info   = User.objects.get(email=user['kakao_account']['email'])
-                encoded_jwt = jwt.encode({'email':user_info.email}, SECRET_KEY, algorithm=ALGORITHM)
+            return provision_user(user['kakao_account'])
 
-                return JsonResponse({'user_name':user_info.name, 'access_token':encoded_jwt}, status=200)            
-            
-            user_info = User.objects.create(
-                email=user['kakao_account']['email'],
-                name  = user['kakao_account']['profile']['nickname']
-            )
+        except KeyError:
+            return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
 
-            encode_jwt = jwt.encode({'email':user_info.email}, SECRET_KEY, algorithm=ALGORITHM)
+        except KakaoUnavailable:
+            return FastJsonResponse({'message':'KAKAO_UNAVAILABLE'}, status=503)
 
-            return JsonResponse({'user_name':user_info.name, 'access_token':encode_jwt}, status=201)            
+async def kakao_social_login_async(request):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
 
-        except KeyError:
-            return JsonResponse({'message':'KEY_ERROR'}, status=400)
+    try:
+        access_token = request.headers['Authorization']
+        user         = await aget_kakao_profile(access_token)
+
+        return await sync_to_async(provision_user, thread_sensitive=True)(user['kakao_account'])
+
+    except KeyError:
+        return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
+
+    except KakaoUnavailable:
+        return FastJsonResponse({'message':'KAKAO_UNAVAILABLE'}, status=503)
+
+kakao_social_login_async.query_budget = 4
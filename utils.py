@@ -1,30 +1,130 @@
+import gzip
 import jwt
+import orjson
+from decimal  import Decimal
 from json     import JSONDecodeError
 
-from django.http import JsonResponse
+from django.http                     import HttpResponse
+from django.core.cache               import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils.cache              import patch_vary_headers
 
 from my_settings import ALGORITHM
 from my_settings import SECRET_KEY
 from user.models import User
+from user.cache  import get_cached_user, get_user_by_email
+
+GZIP_MIN_LENGTH = 1024
 
 def login_decorator(func):
     def wrapper(self, request, *args, **kwargs):
         if 'Authorization' not in request.headers:
-            return JsonResponse({'message':'NEED_LOGIN'}, status=400)
+            return FastJsonResponse({'message':'NEED_LOGIN'}, status=400)
 
         try:
             access_token = request.headers.get('Authorization', None)
             payload      = jwt.decode(access_token, SECRET_KEY, algorithms=ALGORITHM)
-            user         = User.objects.get(email=payload['email'])
-            request.user = user
 
-            return func(self, request, *args, **kwargs)
-        
+            if 'id' in payload:
+                user = get_cached_user(payload['id'])
+
+                if user.email != payload['email']:
+                    raise User.DoesNotExist
+            else:
+                user = get_user_by_email(payload['email'])
 
-        except jwt.exceptions.DecodeError:
-            return JsonResponse({'message': 'INVALID_TOKEN'}, status=400)
+        except (jwt.exceptions.DecodeError, KeyError):
+            return FastJsonResponse({'message': 'INVALID_TOKEN'}, status=400)
 
         except User.DoesNotExist:
-            return JsonResponse({'message': 'INVALID_USER'}, status=400)
+            return FastJsonResponse({'message': 'INVALID_USER'}, status=400)
+
+        request.user = user
+
+        return func(self, request, *args, **kwargs)
 
     return wrapper
+
+def default_json(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+
+    raise TypeError
+
+def encode_json(data):
+    return orjson.dumps(data, default=default_json, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJsonResponse(HttpResponse):
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=encode_json(data), **kwargs)
+
+def accepts_gzip(request):
+    qualities = {}
+
+    for coding in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = coding.partition(';')
+        name            = name.strip().lower()
+
+        if name not in ('gzip', '*'):
+            continue
+
+        quality = params.replace(' ', '').lower()
+
+        try:
+            qualities[name] = float(quality[2:]) if quality.startswith('q=') else 1.0
+        except ValueError:
+            qualities[name] = 0.0
+
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+def representation_etag(request, tag):
+    return f'"{tag}-gzip"' if accepts_gzip(request) else f'"{tag}"'
+
+def encoded_json_response(body, status=200, content_encoding=None):
+    response = HttpResponse(body, content_type='application/json', status=status)
+
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+
+    response['Content-Length'] = len(body)
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    return response
+
+def cache_json_bodies(bodies, timeout=DEFAULT_TIMEOUT):
+    entries = dict(bodies)
+
+    for key, body in bodies.items():
+        if len(body) >= GZIP_MIN_LENGTH:
+            entries[f'{key}:gzip'] = gzip.compress(body)
+
+    cache.set_many(entries, timeout)
+
+    return entries
+
+def cache_json_body(key, body, timeout=DEFAULT_TIMEOUT):
+    return cache_json_bodies({key: body}, timeout).get(f'{key}:gzip')
+
+def cached_json_response(request, key):
+    if accepts_gzip(request):
+        body = cache.get(f'{key}:gzip')
+
+        if body is not None:
+            return encoded_json_response(body, content_encoding='gzip')
+
+    body = cache.get(key)
+
+    if body is None:
+        return None
+
+    return encoded_json_response(body)
+
+def cache_json_response(request, key, data, timeout=DEFAULT_TIMEOUT):
+    body      = encode_json(data)
+    gzip_body = cache_json_body(key, body, timeout)
+
+    if gzip_body is not None and accepts_gzip(request):
+        return encoded_json_response(gzip_body, content_encoding='gzip')
+
+    return encoded_json_response(body)